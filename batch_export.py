@@ -0,0 +1,70 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains the batch driver that renders every policy network
+and a list of simulation scenarios in one run, writing them to files in an output
+directory instead of opening a browser for each figure.
+
+Run this module to export the figures of the real datasets to the output/ folder.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import pickle
+from typing import Optional
+
+from classes import WeightedGraph
+from computations import ALL_POLICIES
+from plot_networks import visualise_all
+from simulations import plot_simulation
+
+
+def export_all(graph: WeightedGraph, scenarios: list[dict[str, int]], output_dir: str,
+               file_format: str = 'html', processes: Optional[int] = None) -> list[str]:
+    """Write the network graph of every policy in ALL_POLICIES, followed by the simulation of
+    every scenario in scenarios, to files in output_dir. Return the paths of the written files
+    in that order.
+
+    The network graphs are drawn across the given number of worker processes (refer to
+    plot_networks.visualise_all).
+
+    Preconditions:
+        - all(0 < len(policies) <= 7 for policies in scenarios)
+        - file_format in export.FILE_FORMATS
+        - processes is None or processes >= 1
+    """
+    paths = visualise_all(graph, ALL_POLICIES, output_dir, file_format, processes=processes)
+
+    for policies in scenarios:
+        paths.append(plot_simulation(graph, policies, output_dir=output_dir,
+                                     file_format=file_format))
+
+    return paths
+
+
+if __name__ == '__main__':
+    with open('datasets/saved_graph', 'rb') as infile:
+        real_graph = pickle.load(infile)
+
+    # Feel free to add scenarios to the list below
+    # (refer to main.py for a list of valid policies and levels)
+    written = export_all(real_graph, [
+        {'public-events-cancellation': 1, 'face-covering-policies': 1,
+         'public-campaigns-covid': 1, 'school-workplace-closures': 1,
+         'stay-at-home': 1, 'testing-policy': 1, 'vaccination-policy': 1},
+        {'public-events-cancellation': 2, 'face-covering-policies': 4,
+         'public-campaigns-covid': 2, 'school-workplace-closures': 3,
+         'stay-at-home': 3, 'testing-policy': 3, 'vaccination-policy': 5}
+    ], 'output')
+
+    for path in written:
+        print(path)
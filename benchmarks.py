@@ -0,0 +1,513 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains the benchmark suite of the project. It times each stage of
+the program, from reading the csv files to building the figures, and records the peak
+memory allocated by each stage with tracemalloc. The stages run on the bundled datasets,
+on synthetic graphs of increasing size built in memory, and on datasets of increasing size
+written by synthetic_data.py.
+
+Run a benchmark and save its results, then compare a later run against it, e.g.
+    python benchmarks.py run --sizes 100 200 400 --generated 1000 --output baseline.json
+    python benchmarks.py run --sizes 100 200 400 --generated 1000 --output current.json
+    python benchmarks.py compare baseline.json current.json
+
+The same benchmark can be run with python cli.py bench.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import argparse
+import datetime
+import json
+import os
+import pickle
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+import init_graph
+import synthetic_data
+from classes import WeightedGraph
+from computations import ALL_POLICIES, get_total_average_case_growth, get_upper_limit
+from ensemble import get_rate_tables
+from plot_networks import convert_policy_to_networkx, get_policy_figure
+from shared_graph import freeze_graph
+from simulations import create_predictions
+
+# The version of the format of the json results, increased whenever the format changes
+RESULTS_VERSION = 1
+
+# The default number of countries of the synthetic graphs
+SYNTHETIC_SIZES = [100, 200, 400, 800]
+
+# The policies simulated by the growth and prediction stages
+BENCHMARK_POLICIES = {policy: 1 for policy in ALL_POLICIES}
+
+# The policy drawn by the network stages
+BENCHMARK_POLICY = 'stay-at-home'
+
+# The folder where the generated datasets are kept between runs
+GENERATED_DIR = 'cache/datasets'
+
+# The number of days of the generated datasets
+GENERATED_DAYS = 365
+
+# The relative change in the median time above which compare reports a stage as changed
+DEFAULT_THRESHOLD = 0.1
+
+
+def measure(func: Callable[[], Any], repeat: int = 5, max_seconds: float = 10.0) \
+        -> dict[str, float]:
+    """Return the timings and memory of calling func: its fastest and median time in
+    milliseconds, the number of timed runs, and the peak memory in kilobytes that it
+    allocates, as traced by tracemalloc.
+
+    func is first called once to warm up any cache or lazy import. If that call takes more
+    than max_seconds, it is kept as the only timed run. Otherwise, there are repeat timed
+    runs, or fewer if they take more than max_seconds in total. Lastly, func is called once
+    more with tracemalloc running, to find its peak memory. The random module is seeded with
+    0 before every call, so every run makes the same random choices.
+
+    Preconditions:
+        - repeat >= 1
+
+    >>> result = measure(lambda: [0] * 100000, 3)
+    >>> result['runs'], result['peak_kb'] >= 781
+    (3, True)
+    >>> result['min_ms'] <= result['median_ms']
+    True
+    """
+    def timed_run() -> float:
+        random.seed(0)
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    times = [timed_run()]
+    if times[0] <= max_seconds:
+        times = [timed_run()]
+        while len(times) < repeat and sum(times) < max_seconds:
+            times.append(timed_run())
+
+    random.seed(0)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {'min_ms': round(min(times) * 1000, 3),
+            'median_ms': round(statistics.median(times) * 1000, 3),
+            'runs': len(times),
+            'peak_kb': round(peak / 1024, 1)}
+
+
+def get_synthetic_graph(num_countries: int, num_days: int = 365, seed: int = 0) \
+        -> WeightedGraph:
+    """Return a graph of num_countries synthetic countries named 'Country <i>', each with
+    num_days of random new cases and deaths, a random population and a random level of every
+    policy (or no level, for about one in twenty policies), with the edges added by
+    find_and_add_edge. The same seed always gives the same graph.
+
+    Preconditions:
+        - num_countries >= 1
+        - num_days >= 1
+
+    >>> g = get_synthetic_graph(20, 30)
+    >>> len(g.get_all_vertices()), len(g.get_all_vertices()['Country 0'].new_cases)
+    (20, 30)
+    >>> graph_summary(g) == graph_summary(get_synthetic_graph(20, 30))
+    True
+    """
+    rng = np.random.default_rng(seed)
+    graph = WeightedGraph()
+
+    for i in range(num_countries):
+        country = 'Country ' + str(i)
+        population = int(rng.integers(100000, 100000000))
+        cases = rng.poisson(population * rng.uniform(1e-5, 1e-3), num_days).astype(float)
+        deaths = rng.binomial(cases.astype(np.int64), rng.uniform(0.005, 0.03)).astype(float)
+        graph.add_vertex(country, cases.tolist(), deaths.tolist(), population)
+
+        for policy in ALL_POLICIES:
+            if rng.random() < 0.05:
+                graph.add_vertex_restrictions(country, policy, '')
+            else:
+                graph.add_vertex_restrictions(country, policy,
+                                              int(rng.integers(get_upper_limit(policy))))
+
+    for country in graph.get_all_vertices():
+        graph.find_and_add_edge(country)
+
+    return graph
+
+
+def graph_summary(graph: WeightedGraph) -> tuple[int, int, float]:
+    """Return the number of vertices, the number of edges and the total weight of graph.
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [0.1], [0.1], 100)
+    >>> graph_summary(g)
+    (1, 0, 0.0)
+    """
+    vertices = graph.get_all_vertices()
+    weights = [weight for country in vertices
+               for weight in vertices[country].similar_policies.values()]
+
+    return (len(vertices), len(weights) // 2, round(sum(weights) / 2, 9))
+
+
+def get_dataset_stages(dataset: str) -> dict[str, Callable[[], Any]]:
+    """Return the stages that read the csv files of a bundled dataset, mapped from their
+    names. The get_policy_restrictions stage reads the level of every policy for the first
+    country of the dataset. For the real dataset, unpickling datasets/saved_graph is timed
+    as well.
+
+    Preconditions:
+        - dataset in ['real', 'test']
+    """
+    if dataset == 'real':
+        filename, prefix, get_graph = 'datasets/main_data.csv', '', init_graph.get_real_graph
+    else:
+        filename, prefix, get_graph = 'datasets/test_data.csv', 'test-', init_graph.get_test_graph
+
+    country = next(iter(init_graph.get_main_data(filename, 'new_cases')))
+
+    stages = {'get_main_data': lambda: init_graph.get_main_data(filename, 'new_cases'),
+              'get_policy_restrictions': lambda: [
+                  init_graph.get_policy_restrictions(prefix + policy, country)
+                  for policy in ALL_POLICIES],
+              get_graph.__name__: get_graph}
+
+    if dataset == 'real':
+        stages['unpickle saved_graph'] = load_saved_graph
+        stages.update(get_directory_stages('datasets'))
+
+    return stages
+
+
+def get_generated_dataset(num_regions: int) -> str:
+    """Return the directory of the generated dataset of num_regions regions with
+    GENERATED_DAYS days each (refer to synthetic_data.generate_dataset), writing it to
+    GENERATED_DIR first if it was not written before.
+
+    Preconditions:
+        - num_regions >= 1
+    """
+    directory = os.path.join(GENERATED_DIR, 'regions-' + str(num_regions) + '-days-'
+                             + str(GENERATED_DAYS))
+
+    if not os.path.exists(os.path.join(directory, 'centroids.csv')):
+        synthetic_data.generate_dataset(directory, num_regions, GENERATED_DAYS)
+
+    return directory
+
+
+def get_directory_stages(directory: str) -> dict[str, Callable[[], Any]]:
+    """Return the stages that read the datasets in a directory laid out like the datasets
+    folder, mapped from their names. get_all_policy_restrictions reads the file of every
+    policy."""
+    filename = os.path.join(directory, 'main_data.csv')
+
+    return {'get_main_data': lambda: init_graph.get_main_data(filename, 'new_cases'),
+            'get_all_policy_restrictions': lambda: [
+                init_graph.get_all_policy_restrictions(os.path.join(directory, policy + '.csv'))
+                for policy in ALL_POLICIES],
+            'get_directory_graph': lambda: init_graph.get_directory_graph(directory)}
+
+
+def load_saved_graph() -> WeightedGraph:
+    """Return the graph pickled in datasets/saved_graph."""
+    with open('datasets/saved_graph', 'rb') as file:
+        return pickle.load(file)
+
+
+def get_graph_stages(graph: WeightedGraph) -> dict[str, Callable[[], Any]]:
+    """Return the stages that run on a graph that is already built, mapped from their names.
+    find_and_add_edge adds the edges of every country again, which recomputes every weight.
+
+    Since the vertices refer to each other, pickle recurses deeper the more vertices the graph
+    has, so the recursion limit is raised to fit the graph.
+    """
+    vertices = graph.get_all_vertices()
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20 * len(vertices) + 1000))
+    pickled = []
+    upper_limit = get_upper_limit(BENCHMARK_POLICY)
+
+    def unpickle() -> WeightedGraph:
+        # The graph is pickled by the first (untimed) call, and only if this stage is run
+        if pickled == []:
+            pickled.append(pickle.dumps(graph))
+        return pickle.loads(pickled[0])
+
+    def freeze() -> None:
+        shared = freeze_graph(graph)
+        shared.close()
+        shared.unlink()
+
+    return {'find_and_add_edge': lambda: [graph.find_and_add_edge(country)
+                                          for country in vertices],
+            'unpickle graph': unpickle,
+            'freeze_graph': freeze,
+            'get_rate_tables': lambda: get_rate_tables(
+                graph, [(BENCHMARK_POLICY, level) for level in range(upper_limit)], 1),
+            'get_total_average_case_growth':
+                lambda: get_total_average_case_growth(graph, BENCHMARK_POLICIES),
+            'create_predictions': lambda: create_predictions(graph, BENCHMARK_POLICIES, 365),
+            'convert_policy_to_networkx': lambda: [
+                convert_policy_to_networkx(graph, BENCHMARK_POLICY, level)
+                for level in range(upper_limit)],
+            'get_policy_figure': lambda: get_policy_figure(graph, BENCHMARK_POLICY)}
+
+
+def run_benchmarks(datasets: list[str], sizes: list[int], repeat: int = 5,
+                   max_seconds: float = 10.0, stages: Optional[list[str]] = None,
+                   generated: Optional[list[int]] = None) -> dict[str, Any]:
+    """Return the results of running every stage on the bundled datasets, on synthetic
+    graphs with each number of countries in sizes, and on the generated datasets with each
+    number of regions in generated (refer to get_generated_dataset). Refer to measure for the
+    meaning of repeat and max_seconds. If stages is not None, only the stages with those
+    names are run.
+
+    The synthetic graphs are built in memory, so only the stages on a built graph run on
+    them. The generated datasets are written as csv files, so the stages reading the files
+    run on them as well.
+
+    The results hold a description of the machine, and one record for each stage on each
+    graph, holding the name of the graph, its number of countries and the measurements.
+
+    Preconditions:
+        - all(dataset in ['real', 'test'] for dataset in datasets)
+        - all(size >= 1 for size in sizes)
+        - generated is None or all(size >= 1 for size in generated)
+        - repeat >= 1
+
+    >>> results = run_benchmarks([], [10], 1, stages=['unpickle graph'])
+    >>> [(record['graph'], record['stage']) for record in results['results']]
+    [('synthetic-10', 'unpickle graph')]
+    """
+    records = []
+
+    def run(graph_name: str, num_countries: int, graph_stages: dict) -> None:
+        for stage in graph_stages:
+            if stages is None or stage in stages:
+                records.append({'graph': graph_name, 'countries': num_countries, 'stage': stage,
+                                **measure(graph_stages[stage], repeat, max_seconds)})
+
+    for dataset in datasets:
+        graph = load_saved_graph() if dataset == 'real' else init_graph.get_test_graph()
+        run(dataset, len(graph.get_all_vertices()), get_dataset_stages(dataset))
+        run(dataset, len(graph.get_all_vertices()), get_graph_stages(graph))
+
+    for size in sizes:
+        run('synthetic-' + str(size), size, get_graph_stages(get_synthetic_graph(size)))
+
+    for size in generated or []:
+        directory = get_generated_dataset(size)
+        run('generated-' + str(size), size, get_directory_stages(directory))
+        run('generated-' + str(size), size,
+            get_graph_stages(init_graph.get_directory_graph(directory)))
+
+    return {'version': RESULTS_VERSION,
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'machine': {'python': platform.python_version(),
+                        'platform': platform.platform(),
+                        'processor': platform.processor(),
+                        'cpus': os.cpu_count(),
+                        'numpy': np.__version__},
+            'repeat': repeat,
+            'results': records}
+
+
+def write_results(results: dict[str, Any], filename: str) -> None:
+    """Write the results of run_benchmarks to a json file."""
+    with open(filename, 'w') as file:
+        json.dump(results, file, indent=1)
+
+
+def read_results(filename: str) -> dict[str, Any]:
+    """Return the results of run_benchmarks written to a json file by write_results. If the
+    file was written in a different format, raise a ValueError."""
+    with open(filename) as file:
+        results = json.load(file)
+
+    if results.get('version') != RESULTS_VERSION:
+        raise ValueError(filename + ' holds results of version ' + str(results.get('version'))
+                         + ', expected version ' + str(RESULTS_VERSION))
+
+    return results
+
+
+def compare_results(baseline: dict[str, Any], current: dict[str, Any],
+                    threshold: float = DEFAULT_THRESHOLD) -> list[dict[str, Any]]:
+    """Return one row for each stage and graph in the baseline or current results, comparing
+    the median times and memory peaks. The status of a row is 'slower' or 'faster' when the
+    median time changed by more than threshold (relative to the baseline), 'same' otherwise,
+    and 'added' or 'removed' when the stage only appears in one of the results.
+
+    >>> baseline = {'results': [{'graph': 'test', 'stage': 'a', 'median_ms': 10.0,
+    ...                          'peak_kb': 5.0},
+    ...                         {'graph': 'test', 'stage': 'b', 'median_ms': 1.0,
+    ...                          'peak_kb': 1.0}]}
+    >>> current = {'results': [{'graph': 'test', 'stage': 'a', 'median_ms': 20.0,
+    ...                         'peak_kb': 5.0}]}
+    >>> [(row['stage'], row['status'], row['ratio']) for row in
+    ...  compare_results(baseline, current)]
+    [('a', 'slower', 2.0), ('b', 'removed', None)]
+    """
+    before = {(record['graph'], record['stage']): record for record in baseline['results']}
+    after = {(record['graph'], record['stage']): record for record in current['results']}
+    rows = []
+
+    for key in list(before) + [key for key in after if key not in before]:
+        row = {'graph': key[0], 'stage': key[1],
+               'baseline_ms': before[key]['median_ms'] if key in before else None,
+               'current_ms': after[key]['median_ms'] if key in after else None,
+               'baseline_kb': before[key]['peak_kb'] if key in before else None,
+               'current_kb': after[key]['peak_kb'] if key in after else None,
+               'ratio': None}
+
+        if key not in after:
+            row['status'] = 'removed'
+        elif key not in before:
+            row['status'] = 'added'
+        else:
+            row['ratio'] = round(row['current_ms'] / max(row['baseline_ms'], 0.001), 3)
+            if row['ratio'] > 1 + threshold:
+                row['status'] = 'slower'
+            elif row['ratio'] < 1 - threshold:
+                row['status'] = 'faster'
+            else:
+                row['status'] = 'same'
+
+        rows.append(row)
+
+    return rows
+
+
+def format_results(results: dict[str, Any]) -> str:
+    """Return the results of run_benchmarks as a table with one line for each stage.
+
+    >>> print(format_results({'results': [{'graph': 'test', 'countries': 7, 'stage': 'a',
+    ...                                    'min_ms': 1.0, 'median_ms': 1.5, 'runs': 5,
+    ...                                    'peak_kb': 2.0}]}))
+    graph          countries  stage                               min ms   median ms  runs  \
+  peak KB
+    test                   7  a                                    1.000       1.500     5  \
+      2.0
+    """
+    lines = ['graph'.ljust(15) + 'countries'.rjust(9) + '  ' + 'stage'.ljust(30)
+             + 'min ms'.rjust(12) + 'median ms'.rjust(12) + 'runs'.rjust(6) + 'peak KB'.rjust(11)]
+
+    for record in results['results']:
+        lines.append(record['graph'].ljust(15) + str(record['countries']).rjust(9) + '  '
+                     + record['stage'].ljust(30) + format(record['min_ms'], '12.3f')
+                     + format(record['median_ms'], '12.3f') + str(record['runs']).rjust(6)
+                     + format(record['peak_kb'], '11.1f'))
+
+    return '\n'.join(lines)
+
+
+def format_comparison(rows: list[dict[str, Any]]) -> str:
+    """Return the rows of compare_results as a table with one line for each stage.
+
+    >>> rows = [{'graph': 'test', 'stage': 'a', 'baseline_ms': 10.0, 'current_ms': 20.0,
+    ...          'baseline_kb': 5.0, 'current_kb': 6.0, 'ratio': 2.0, 'status': 'slower'}]
+    >>> print(format_comparison(rows))
+    graph          stage                          baseline ms  current ms   ratio  \
+baseline KB  current KB  status
+    test           a                                   10.000      20.000   2.00x  \
+        5.0         6.0  slower
+    """
+    lines = ['graph'.ljust(15) + 'stage'.ljust(30) + 'baseline ms'.rjust(12)
+             + 'current ms'.rjust(12) + 'ratio'.rjust(8) + 'baseline KB'.rjust(13)
+             + 'current KB'.rjust(12) + '  status']
+
+    def cell(value: Optional[float], form: str, width: int) -> str:
+        return ('-' if value is None else format(value, form)).rjust(width)
+
+    for row in rows:
+        lines.append(row['graph'].ljust(15) + row['stage'].ljust(30)
+                     + cell(row['baseline_ms'], '.3f', 12) + cell(row['current_ms'], '.3f', 12)
+                     + cell(row['ratio'], '.2f', 7) + ('x' if row['ratio'] is not None else ' ')
+                     + cell(row['baseline_kb'], '.1f', 13) + cell(row['current_kb'], '.1f', 12)
+                     + '  ' + row['status'])
+
+    return '\n'.join(lines)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Return the parser of the command-line arguments of this module."""
+    parser = argparse.ArgumentParser(description='Benchmark each stage of the program.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add_run_arguments(commands.add_parser('run', help='run the benchmarks'))
+
+    compare = commands.add_parser('compare', help='compare two saved runs')
+    compare.add_argument('baseline', help='the json results of the baseline run')
+    compare.add_argument('current', help='the json results of the run to compare')
+    compare.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                         help='the relative change reported as slower or faster')
+
+    return parser
+
+
+def add_run_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options of running the benchmarks to parser (shared with cli.py bench)."""
+    parser.add_argument('--dataset', choices=['real', 'test'], nargs='*', default=['test'],
+                        help='the bundled datasets to run the benchmarks on')
+    parser.add_argument('--sizes', type=int, nargs='*', default=SYNTHETIC_SIZES,
+                        help='the numbers of countries of the synthetic graphs')
+    parser.add_argument('--generated', type=int, nargs='*', default=[],
+                        help='the numbers of regions of the generated datasets (refer to '
+                             'synthetic_data.py)')
+    parser.add_argument('--repeat', type=int, default=5, help='the number of timed runs')
+    parser.add_argument('--max-seconds', type=float, default=10.0,
+                        help='stop repeating a stage after this many seconds')
+    parser.add_argument('--stages', nargs='*', default=None, help='only run these stages')
+    parser.add_argument('--output', default=None, help='write the results to this json file')
+    parser.add_argument('--baseline', default=None,
+                        help='compare the results with the json results of an earlier run')
+
+
+def run_from_arguments(arguments: argparse.Namespace) -> None:
+    """Run the benchmarks with the options added by add_run_arguments, print the results, and
+    write or compare them if asked."""
+    results = run_benchmarks(arguments.dataset, arguments.sizes, arguments.repeat,
+                             arguments.max_seconds, arguments.stages, arguments.generated)
+    print(format_results(results))
+
+    if arguments.output is not None:
+        write_results(results, arguments.output)
+
+    if arguments.baseline is not None:
+        print()
+        print(format_comparison(compare_results(read_results(arguments.baseline), results)))
+
+
+if __name__ == '__main__':
+    main_arguments = get_parser().parse_args()
+
+    if main_arguments.command == 'run':
+        run_from_arguments(main_arguments)
+    else:
+        print(format_comparison(compare_results(read_results(main_arguments.baseline),
+                                                read_results(main_arguments.current),
+                                                main_arguments.threshold)))
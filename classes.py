@@ -22,6 +22,8 @@ from __future__ import annotations
 from typing import Union
 import statistics
 
+import instrumentation
+
 
 class _WeightedVertex:
     """A vertex in a graph representing a country.
@@ -224,11 +226,16 @@ class WeightedGraph:
     #     - _vertices:
     #         A collection of the vertices contained in this graph.
     #         Maps a country to its corresponding _WeightedVertex object.
+    #     - _levels:
+    #         An index of the countries with each level of each policy.
+    #         Maps (policy, level) to the list of countries, in the order their level was added.
     _vertices: dict[str, _WeightedVertex]
+    _levels: dict[tuple[str, Union[int, str]], list[str]]
 
     def __init__(self) -> None:
         """Initialize an empty graph (no vertices or edges)."""
         self._vertices = {}
+        self._levels = {}
 
     def add_vertex(self, country: str, cases: list[Union[float, str]],
                    deaths: list[Union[float, str]], population: int) -> None:
@@ -249,6 +256,7 @@ class WeightedGraph:
         """
         if country not in self._vertices:
             self._vertices[country] = _WeightedVertex(country, cases, deaths, population)
+            instrumentation.count('classes.vertices_created')
 
     def add_vertex_restrictions(self, country: str, policy: str, level: Union[int, str]) -> None:
         """Add the restriction level of a policy to the restrictions_level dict of the vertex.
@@ -270,10 +278,47 @@ class WeightedGraph:
         3
         """
         if country in self._vertices:
-            self._vertices[country].add_restrictions(policy, level)
+            vertex = self._vertices[country]
+            if policy not in vertex.restrictions_level:
+                vertex.add_restrictions(policy, level)
+                self._get_level_index().setdefault((policy, level), []).append(country)
         else:
             raise CountryNotInGraphError(country)
 
+    def get_countries_at_level(self, policy: str, level: Union[int, str]) -> list[str]:
+        """Return the list of countries with the given level of the policy, in the order their
+        level was added to the graph.
+
+        Only levels added with add_vertex_restrictions are indexed.
+
+        >>> s = WeightedGraph()
+        >>> s.add_vertex('Country1', [0.1], [0.1], 100000)
+        >>> s.add_vertex('Country2', [0.1], [0.1], 100000)
+        >>> s.add_vertex_restrictions('Country2', 'stay-at-home', 1)
+        >>> s.add_vertex_restrictions('Country1', 'stay-at-home', 1)
+        >>> s.get_countries_at_level('stay-at-home', 1)
+        ['Country2', 'Country1']
+        >>> s.get_countries_at_level('stay-at-home', 2)
+        []
+        """
+        return list(self._get_level_index().get((policy, level), []))
+
+    def _get_level_index(self) -> dict[tuple[str, Union[int, str]], list[str]]:
+        """Return the (policy, level) index of the graph.
+
+        Graphs pickled before the index existed do not have it, so it is built from the
+        restriction levels of every vertex the first time it is needed.
+        """
+        if '_levels' not in self.__dict__:
+            self._levels = {}
+            for country in self._vertices:
+                restrictions = self._vertices[country].restrictions_level
+                for policy in restrictions:
+                    self._levels.setdefault((policy, restrictions[policy]), []).append(country)
+
+        return self._levels
+
+    @instrumentation.timed
     def find_and_add_edge(self, country: str) -> None:
         """Find and add possible edges between the country and all other countries in the graph.
         A edge can be formed when both countries have similar policy (has at least one same policy
@@ -297,11 +342,15 @@ class WeightedGraph:
         """
         if country in self._vertices:
             v1 = self._vertices[country]
+            num_edges = len(v1.similar_policies)
 
             for country2 in self._vertices:
                 v2 = self._vertices[country2]
                 if v1 != v2:
                     self.add_edge(v1.country_name, v2.country_name)
+
+            instrumentation.count('classes.pairs_compared', len(self._vertices) - 1)
+            instrumentation.count('classes.edges_created', len(v1.similar_policies) - num_edges)
         else:
             raise CountryNotInGraphError(country)
 
@@ -369,5 +418,5 @@ if __name__ == '__main__':
     python_ta.check_all(config={
         'max-line-length': 100,
         'disable': ['E1136'],
-        'extra-imports': ['statistics']
+        'extra-imports': ['statistics', 'instrumentation']
     })
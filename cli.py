@@ -0,0 +1,479 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains the command-line interface of the project, as an
+alternative to editing and running main.py. For example:
+
+    python cli.py build-graph --dataset test --output datasets/test_graph
+    python cli.py visualise stay-at-home testing-policy --output-dir output
+    python cli.py simulate --policy stay-at-home=1 --policy testing-policy=2 --seed 0
+    python cli.py sweep --top 5 --objective deaths
+    python cli.py bench --dataset test --sizes 100 200 --output results.json
+    python cli.py memory --dataset real --horizons 365 3650
+    python cli.py generate cache/datasets/regions-2000 --regions 2000 --days 120
+    python cli.py simulate --dataset cache/datasets/regions-2000 --policy stay-at-home=1
+
+Run python cli.py <command> --help for the options of each command.
+
+Run python cli.py --instrument <command> ... to print where the time of the command went
+(refer to instrumentation.py).
+
+Each command only imports the modules it needs, so that pandas, plotly and networkx are
+not imported by the commands that do not use them (such as --help, or simulate without
+--output-dir). When a seed is given, simulate caches the daily counts of the simulation
+in cache/simulations, so the same simulation does not even load the graph again.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import random
+import sys
+from typing import Optional
+
+import instrumentation
+from classes import WeightedGraph
+from computations import ALL_POLICIES, get_upper_limit
+
+# The datasets that the graph can be built from
+DATASETS = ['real', 'test']
+
+# The file that the graph of the real datasets is pickled to
+SAVED_GRAPH = 'datasets/saved_graph'
+
+# The files that the graph of the test datasets is built from
+TEST_DATASET_FILES = ['datasets/test_data.csv'] + ['datasets/test-' + policy + '.csv'
+                                                   for policy in ALL_POLICIES]
+
+# The csv file of the central locations of the countries in the real datasets
+CENTROIDS_FILE = 'datasets/centroids.csv'
+
+# The folder where simulate caches the daily counts of the simulations with a seed
+SIMULATION_CACHE_DIR = 'cache/simulations'
+
+
+def load_graph(dataset: str) -> WeightedGraph:
+    """Return the graph of the dataset: the pickled graph of the real datasets, the graph
+    built from the test datasets, or the graph built from the datasets in the directory
+    dataset (refer to init_graph.get_directory_graph).
+
+    Preconditions:
+        - dataset in DATASETS or os.path.isdir(dataset)
+    """
+    if dataset == 'real':
+        with open(SAVED_GRAPH, 'rb') as infile:
+            return pickle.load(infile)
+    elif dataset == 'test':
+        from init_graph import get_test_graph
+        return get_test_graph()
+    else:
+        from init_graph import get_directory_graph
+        return get_directory_graph(dataset)
+
+
+def get_dataset_version(dataset: str) -> str:
+    """Return a string that changes whenever a file that the graph of the dataset is read from
+    changes, based on the size and modification time of the files.
+
+    Preconditions:
+        - dataset in DATASETS or os.path.isdir(dataset)
+    """
+    if dataset == 'real':
+        files = [SAVED_GRAPH]
+    elif dataset == 'test':
+        files = TEST_DATASET_FILES
+    else:
+        files = [os.path.join(dataset, name + '.csv') for name in ['main_data'] + ALL_POLICIES]
+
+    return repr([(os.stat(file).st_size, os.stat(file).st_mtime_ns) for file in files])
+
+
+def get_centroids_file(dataset: str) -> str:
+    """Return the csv file of the central locations of the countries of the dataset: the
+    centroids.csv file in the directory dataset if it has one, or the one of the real
+    datasets otherwise.
+
+    Preconditions:
+        - dataset in DATASETS or os.path.isdir(dataset)
+
+    >>> get_centroids_file('test')
+    'datasets/centroids.csv'
+    """
+    if dataset not in DATASETS and os.path.exists(os.path.join(dataset, 'centroids.csv')):
+        return os.path.join(dataset, 'centroids.csv')
+    else:
+        return CENTROIDS_FILE
+
+
+def parse_dataset(text: str) -> str:
+    """Return text if it is one of DATASETS or a directory with a main_data.csv file.
+
+    >>> parse_dataset('test')
+    'test'
+    >>> parse_dataset('datasets')
+    'datasets'
+    >>> parse_dataset('nowhere')
+    Traceback (most recent call last):
+    argparse.ArgumentTypeError: nowhere is not real, test or a directory of datasets
+    """
+    if text not in DATASETS and not os.path.isfile(os.path.join(text, 'main_data.csv')):
+        raise argparse.ArgumentTypeError(text + ' is not real, test or a directory of datasets')
+
+    return text
+
+
+def parse_policy_name(text: str) -> str:
+    """Return text if it is one of ALL_POLICIES.
+
+    >>> parse_policy_name('testing-policy')
+    'testing-policy'
+    >>> parse_policy_name('curfew')
+    Traceback (most recent call last):
+    argparse.ArgumentTypeError: unknown policy curfew, choose from face-covering-policies, \
+public-campaigns-covid, public-events-cancellation, school-workplace-closures, stay-at-home, \
+testing-policy, vaccination-policy
+    """
+    if text not in ALL_POLICIES:
+        raise argparse.ArgumentTypeError('unknown policy ' + text + ', choose from '
+                                         + ', '.join(ALL_POLICIES))
+
+    return text
+
+
+def parse_policy(text: str) -> tuple[str, int]:
+    """Return the (policy, level) given in text in the form of policy=level.
+
+    >>> parse_policy('stay-at-home=2')
+    ('stay-at-home', 2)
+    >>> parse_policy('stay-at-home=4')
+    Traceback (most recent call last):
+    argparse.ArgumentTypeError: the level of stay-at-home must be between 0 and 3
+    """
+    policy = parse_policy_name(text.partition('=')[0])
+    level = text.partition('=')[2]
+
+    if not level.isdigit() or int(level) >= get_upper_limit(policy):
+        raise argparse.ArgumentTypeError('the level of ' + policy + ' must be between 0 and '
+                                         + str(get_upper_limit(policy) - 1))
+
+    return (policy, int(level))
+
+
+def parse_horizon(text: str) -> int:
+    """Return the number of days given in text, which must be at least 1.
+
+    >>> parse_horizon('30')
+    30
+    >>> parse_horizon('0')
+    Traceback (most recent call last):
+    argparse.ArgumentTypeError: the horizon must be a whole number of days of at least 1, not 0
+    """
+    if not text.isdigit() or int(text) < 1:
+        raise argparse.ArgumentTypeError('the horizon must be a whole number of days of at '
+                                         'least 1, not ' + text)
+
+    return int(text)
+
+
+def parse_edge_budget(text: str) -> int:
+    """Return the number of edges given in text, which must be at least 0.
+
+    >>> parse_edge_budget('0')
+    0
+    >>> parse_edge_budget('-1')
+    Traceback (most recent call last):
+    argparse.ArgumentTypeError: the edge budget must be a whole number of edges of at least 0, \
+not -1
+    """
+    if not text.isdigit():
+        raise argparse.ArgumentTypeError('the edge budget must be a whole number of edges of at '
+                                         'least 0, not ' + text)
+
+    return int(text)
+
+
+def parse_top(text: str) -> int:
+    """Return the number of results given in text, which must be at least 1.
+
+    >>> parse_top('5')
+    5
+    >>> parse_top('0')
+    Traceback (most recent call last):
+    argparse.ArgumentTypeError: the number of results must be a whole number of at least 1, not 0
+    """
+    if not text.isdigit() or int(text) < 1:
+        raise argparse.ArgumentTypeError('the number of results must be a whole number of at '
+                                         'least 1, not ' + text)
+
+    return int(text)
+
+
+def get_simulation_counts(dataset: str, policies: dict[str, int], seed: Optional[int],
+                          cache_dir: Optional[str] = SIMULATION_CACHE_DIR) -> tuple[int, int]:
+    """Return the number of new cases and deaths every day of the simulation of the policies
+    on the graph of the dataset (refer to predictions.get_daily_counts), with the random start
+    vertices chosen after seeding the random module with seed.
+
+    If seed and cache_dir are not None, the counts are read from cache_dir when the same
+    simulation was run before on the same version of the dataset, and are written there
+    otherwise. Without a seed the counts are random, so they are never cached.
+
+    Preconditions:
+        - dataset in DATASETS or os.path.isdir(dataset)
+        - 0 < len(policies) <= 7
+    """
+    if seed is None or cache_dir is None:
+        path = None
+    else:
+        key = repr((dataset, get_dataset_version(dataset), sorted(policies.items()), seed))
+        path = os.path.join(cache_dir, hashlib.sha256(key.encode()).hexdigest()[:16] + '.json')
+
+        if os.path.exists(path):
+            with open(path) as file:
+                counts = json.load(file)
+            return (counts[0], counts[1])
+
+    from predictions import get_daily_counts
+
+    random.seed(seed)
+    counts = get_daily_counts(load_graph(dataset), policies)
+
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(counts, file)
+
+    return counts
+
+
+def build_graph(arguments: argparse.Namespace) -> None:
+    """Build the graph of a dataset from its csv files and pickle it."""
+    import init_graph
+
+    if arguments.dataset == 'real':
+        graph = init_graph.get_real_graph()
+    elif arguments.dataset == 'test':
+        graph = init_graph.get_test_graph()
+    else:
+        graph = init_graph.get_directory_graph(arguments.dataset)
+
+    with open(arguments.output, 'wb') as outfile:
+        pickle.dump(graph, outfile)
+
+    print('Wrote the graph of ' + str(len(graph.get_all_vertices())) + ' countries to '
+          + arguments.output)
+
+
+def visualise(arguments: argparse.Namespace) -> None:
+    """Plot the network graphs of the policies."""
+    from plot_networks import visualise_all
+
+    paths = visualise_all(load_graph(arguments.dataset), arguments.policies or ALL_POLICIES,
+                          arguments.output_dir, arguments.format, arguments.cache_dir,
+                          arguments.processes, arguments.edge_budget,
+                          get_centroids_file(arguments.dataset))
+
+    for path in paths:
+        if path is not None:
+            print(path)
+
+
+def simulate(arguments: argparse.Namespace) -> None:
+    """Run the simulation of the policies, print the totals at the end of the horizon, and
+    plot it if an output folder is given.
+
+    >>> import contextlib
+    >>> import io
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+    ...     main(['simulate', '--dataset', 'test', '--policy', 'stay-at-home=0', '--seed', '1',
+    ...           '--horizon', '30', '--cache-dir', directory])
+    ...     first = len(os.listdir(directory))
+    ...     main(['simulate', '--dataset', 'test', '--policy', 'stay-at-home=0', '--seed', '1',
+    ...           '--horizon', '30', '--cache-dir', directory])
+    ...     second = len(os.listdir(directory))
+    >>> first, second
+    (1, 1)
+    """
+    from predictions import prediction_columns
+
+    policies = dict(arguments.policy)
+    daily_cases, daily_deaths = get_simulation_counts(arguments.dataset, policies, arguments.seed,
+                                                      arguments.cache_dir)
+    columns = prediction_columns(daily_cases, daily_deaths, arguments.horizon)
+
+    print('Daily new cases: ' + str(daily_cases))
+    print('Daily new deaths: ' + str(daily_deaths))
+    print('Total cases after day ' + str(int(columns['Day'][-1])) + ': '
+          + str(int(columns['Total_Cases'][-1])))
+    print('Total deaths after day ' + str(int(columns['Day'][-1])) + ': '
+          + str(int(columns['Total_Deaths'][-1])))
+
+    if arguments.output_dir is not None:
+        import pandas as pd
+        from export import get_scenario_name, output_figure
+        from simulations import get_simulation_figure
+
+        fig = get_simulation_figure(pd.DataFrame(columns), policies, arguments.horizon)
+        print(output_figure(fig, get_scenario_name(policies), arguments.output_dir,
+                            arguments.format))
+
+
+def sweep(arguments: argparse.Namespace) -> None:
+    """Print the combinations of policies with the fewest projected cases or deaths."""
+    from optimizer import find_best_policies
+
+    best = find_best_policies(load_graph(arguments.dataset), arguments.top, arguments.objective,
+                              processes=arguments.processes)
+
+    for rank, result in enumerate(best, 1):
+        levels = ', '.join(policy + '=' + str(level)
+                           for policy, level in result['policies'].items())
+        print(str(rank) + '. ' + levels + ': ' + str(result['cases']) + ' cases, '
+              + str(result['deaths']) + ' deaths')
+
+
+def bench(arguments: argparse.Namespace) -> None:
+    """Run the benchmark suite of benchmarks.py with the options left over after the command,
+    e.g. python cli.py bench --dataset real test --sizes 100 200 --output results.json"""
+    from benchmarks import add_run_arguments, run_from_arguments
+
+    parser = argparse.ArgumentParser(prog='cli.py bench',
+                                     description='Time each stage of the program.')
+    add_run_arguments(parser)
+    run_from_arguments(parser.parse_args(arguments.options))
+
+
+def memory(arguments: argparse.Namespace) -> None:
+    """Print the memory report of memory_report.py with the options left over after the
+    command, e.g. python cli.py memory --dataset test --horizons 365 3650"""
+    from memory_report import add_report_arguments, report_from_arguments
+
+    parser = argparse.ArgumentParser(prog='cli.py memory',
+                                     description='Report the memory of the graph and the '
+                                                 'prediction DataFrame.')
+    add_report_arguments(parser)
+    report_from_arguments(parser.parse_args(arguments.options))
+
+
+def generate(arguments: argparse.Namespace) -> None:
+    """Write a synthetic dataset with synthetic_data.py, with the options left over after the
+    command, e.g. python cli.py generate cache/datasets/regions-10000 --regions 10000"""
+    from synthetic_data import add_generator_arguments, generate_from_arguments
+
+    parser = argparse.ArgumentParser(prog='cli.py generate',
+                                     description='Write a synthetic dataset.')
+    add_generator_arguments(parser)
+    generate_from_arguments(parser.parse_args(arguments.options))
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Return the parser of the command-line arguments."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--dataset', type=parse_dataset, default='real',
+                        help='real, test, or a directory of datasets such as those written by '
+                             'the generate command (default: real)')
+    common.add_argument('--seed', type=int, default=None,
+                        help='the seed of the random start vertices of the traversals')
+
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument('--output-dir', default=None,
+                        help='write figures to this folder instead of opening a browser')
+    output.add_argument('--format', choices=['html', 'json'], default='html',
+                        help='the file format of the figures written to --output-dir')
+
+    parser = argparse.ArgumentParser(prog='cli.py', description='Picturing the Power of Policy '
+                                                                'in a Pandemic')
+    parser.add_argument('--instrument', action='store_true',
+                        help='print the counters and timers of the command to stderr at the end')
+    parser.add_argument('--instrument-json', default=None, metavar='FILE',
+                        help='write the counters and timers of the command to a json file')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('build-graph', parents=[common],
+                                  help='build the graph from the csv files and pickle it')
+    command.add_argument('--output', default=SAVED_GRAPH, help='the file to pickle the graph to')
+    command.set_defaults(run=build_graph)
+
+    command = commands.add_parser('visualise', parents=[common, output],
+                                  help='plot the network graphs of the policies')
+    command.add_argument('policies', nargs='*', type=parse_policy_name, metavar='POLICY',
+                         help='the policies to plot (default: all)')
+    command.add_argument('--cache-dir', default='cache', help='the folder of cached figures')
+    command.add_argument('--edge-budget', type=parse_edge_budget, default=None,
+                         help='draw at most this many edges of the graph of each level')
+    command.add_argument('--processes', type=int, default=None)
+    command.set_defaults(run=visualise)
+
+    command = commands.add_parser('simulate', parents=[common, output],
+                                  help='run the simulation of a set of policies')
+    command.add_argument('--policy', type=parse_policy, action='append', required=True,
+                         metavar='POLICY=LEVEL', help='a policy and its level (repeatable)')
+    command.add_argument('--horizon', type=parse_horizon, default=365,
+                         help='the number of days')
+    command.add_argument('--cache-dir', default=SIMULATION_CACHE_DIR,
+                         help='the folder of cached simulations')
+    command.set_defaults(run=simulate)
+
+    command = commands.add_parser('sweep', parents=[common],
+                                  help='find the policies with the fewest projected deaths')
+    command.add_argument('--top', type=parse_top, default=10, help='the number of results')
+    command.add_argument('--objective', choices=['cases', 'deaths'], default='deaths')
+    command.add_argument('--processes', type=int, default=None)
+    command.set_defaults(run=sweep)
+
+    command = commands.add_parser('bench', add_help=False,
+                                  help='time each stage of the program (refer to benchmarks.py)')
+    command.set_defaults(run=bench)
+
+    command = commands.add_parser('memory', add_help=False,
+                                  help='report the memory of the graph and the predictions '
+                                       '(refer to memory_report.py)')
+    command.set_defaults(run=memory)
+
+    command = commands.add_parser('generate', add_help=False,
+                                  help='write a synthetic dataset (refer to synthetic_data.py)')
+    command.set_defaults(run=generate)
+
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Run the command given in argv (the command-line arguments if argv is None) and return
+    the exit status."""
+    parser = get_parser()
+    arguments, options = parser.parse_known_args(argv)
+
+    if arguments.command in ['bench', 'memory', 'generate']:
+        arguments.options = options
+    elif options != []:
+        parser.error('unrecognized arguments: ' + ' '.join(options))
+
+    if arguments.instrument or arguments.instrument_json is not None:
+        instrumentation.enable()
+
+    arguments.run(arguments)
+
+    if arguments.instrument:
+        print(instrumentation.format_report(instrumentation.get_report()), file=sys.stderr)
+    if arguments.instrument_json is not None:
+        instrumentation.write_report(arguments.instrument_json)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains functions that produces a compartmental (SEIR)
+simulation of how the cases and deaths change overtime in a pandemic when
+different level of restrictions/policies are implemented.
+
+Unlike the linear simulation in simulations.py, the number of new cases every day
+depends on how many people are still susceptible and how many are infectious.
+Many scenarios can be integrated at once, each scenario being one entry in the
+parameter arrays.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import numpy as np
+import pandas as pd
+
+from classes import WeightedGraph
+from computations import get_exact_case_average, get_total_average_case_growth, \
+    get_total_average_deaths_growth
+from predictions import DAYS_TO_DEATH, WORLD_POPULATION
+
+# The average number of days between being infected and becoming infectious
+INCUBATION_DAYS = 5.2
+
+# The average number of days an infected person stays infectious
+INFECTIOUS_DAYS = 10.0
+
+# The basic reproduction number of coronavirus when a country's policies are average
+BASE_REPRODUCTION_NUMBER = 2.5
+
+
+def get_reference_case_rate(graph: WeightedGraph) -> float:
+    """Return the average daily new cases rate over every country in the graph, regardless of
+    their policies. This is the rate at which the reproduction number is
+    BASE_REPRODUCTION_NUMBER.
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [0.1], [0.1], 10000)
+    >>> g.add_vertex('c2', [0.3], [0.1], 10000)
+    >>> round(get_reference_case_rate(g), 10)
+    2e-05
+    """
+    return get_exact_case_average(graph, list(graph.get_all_vertices()))
+
+
+def seir_parameters_from_rates(case_rates: np.ndarray, death_rates: np.ndarray,
+                               reference_rate: float) -> tuple[np.ndarray, np.ndarray]:
+    """Return the transmission rates and fatality ratios of the scenarios in the form of
+    (transmission rates, fatality ratios), given the average daily new cases and deaths rates
+    of each scenario.
+
+    The reproduction number of a scenario is BASE_REPRODUCTION_NUMBER scaled by how its daily
+    new cases rate compares to reference_rate, and the transmission rate is the reproduction
+    number divided by INFECTIOUS_DAYS. The fatality ratio is the daily new deaths rate divided
+    by the daily new cases rate (0 if there are no new cases).
+
+    Preconditions:
+        - case_rates.shape == death_rates.shape
+        - reference_rate > 0
+
+    >>> transmission, fatality = seir_parameters_from_rates(np.array([0.002, 0.0]),
+    ...                                                     np.array([0.0001, 0.0]), 0.001)
+    >>> transmission.tolist()
+    [0.5, 0.0]
+    >>> fatality.tolist()
+    [0.05, 0.0]
+    """
+    reproduction_numbers = BASE_REPRODUCTION_NUMBER * case_rates / reference_rate
+    transmission = reproduction_numbers / INFECTIOUS_DAYS
+
+    fatality = np.divide(death_rates, case_rates, out=np.zeros(len(case_rates)),
+                         where=case_rates > 0)
+
+    return (transmission, np.minimum(fatality, 1.0))
+
+
+def get_seir_parameters(graph: WeightedGraph, policies: dict[str, int]) \
+        -> tuple[float, float, float]:
+    """Return the parameters of a SEIR simulation based on the given policies, in the form of
+    (transmission rate, fatality ratio, initial number of infectious people).
+
+    The rates are taken from get_total_average_case_growth and get_total_average_deaths_growth.
+    Refer to seir_parameters_from_rates for how they are converted. The simulation starts with
+    as many infectious people as the linear simulation has new cases every day.
+
+    Preconditions:
+        - 0 < len(policies) <= 7
+    """
+    case_rate = get_total_average_case_growth(graph, policies)
+    death_rate = get_total_average_deaths_growth(graph, policies)
+
+    transmission, fatality = seir_parameters_from_rates(np.array([case_rate]),
+                                                        np.array([death_rate]),
+                                                        get_reference_case_rate(graph))
+
+    return (float(transmission[0]), float(fatality[0]), round(WORLD_POPULATION * case_rate))
+
+
+def integrate_seir(transmission: np.ndarray, fatality: np.ndarray,
+                   initial_infectious: np.ndarray, days: int = 365,
+                   population: float = WORLD_POPULATION) -> tuple[np.ndarray, np.ndarray]:
+    """Integrate a SEIR model for every scenario at once, one day at a time, and return the
+    cumulative cases and deaths in the form of (total cases, total deaths). Each returned array
+    has one row per day and one column per scenario.
+
+    Every day, susceptible people are exposed at the transmission rate, exposed people become
+    infectious after INCUBATION_DAYS on average and infectious people are removed after
+    INFECTIOUS_DAYS on average. A case is counted when a person becomes infectious. The total
+    deaths on a day is the fatality ratio of the total cases DAYS_TO_DEATH - 1 days before,
+    so that the first deaths happen on day DAYS_TO_DEATH like in the linear simulation.
+
+    Preconditions:
+        - transmission.shape == fatality.shape == initial_infectious.shape
+        - transmission.ndim == 1
+        - all(0 <= f <= 1 for f in fatality)
+        - all(0 <= n <= population for n in initial_infectious)
+        - days >= 0
+
+    >>> cases, deaths = integrate_seir(np.array([0.0, 0.5]), np.array([0.1, 0.1]),
+    ...                                np.array([100.0, 100.0]), 30, 10000.0)
+    >>> cases.shape
+    (30, 2)
+    >>> round(float(cases[-1, 0]), 2)
+    100.0
+    >>> bool(cases[-1, 1] > cases[-1, 0])
+    True
+    >>> float(deaths[17, 0]), round(float(deaths[18, 0]), 2)
+    (0.0, 10.0)
+    """
+    incubation_rate = 1 / INCUBATION_DAYS
+    removal_rate = 1 / INFECTIOUS_DAYS
+
+    susceptible = np.full(len(transmission), population, dtype=np.float64) - initial_infectious
+    exposed = np.zeros(len(transmission))
+    infectious = initial_infectious.astype(np.float64)
+    total_cases = np.zeros((days, len(transmission)))
+
+    cumulative = infectious.copy()
+    for day in range(days):
+        new_exposed = np.minimum(transmission * susceptible * infectious / population, susceptible)
+        new_infectious = incubation_rate * exposed
+        new_removed = removal_rate * infectious
+
+        susceptible -= new_exposed
+        exposed += new_exposed - new_infectious
+        infectious += new_infectious - new_removed
+
+        cumulative += new_infectious
+        total_cases[day] = cumulative
+
+    total_deaths = np.zeros((days, len(transmission)))
+    lag = DAYS_TO_DEATH - 1
+    total_deaths[lag:] = fatality * total_cases[:max(days - lag, 0)]
+
+    return (total_cases, total_deaths)
+
+
+def seir_predictions(graph: WeightedGraph, policies: dict[str, int],
+                     horizon: int = 365) -> pd.DataFrame:
+    """Create predictions of the total number of daily cases and deaths based on
+    the given policies using the SEIR model. The result is returned in the form of a pandas
+    dataframe with the same columns as simulations.create_predictions:
+
+    Day | Total Cases | Total Deaths
+    ----------------------------------
+    1   | 1000        | 0
+    2   | 2000        | 0
+
+    Refer to integrate_seir for details of the model.
+
+    Preconditions:
+        - 0 < len(policies) <= 7
+        - horizon >= 0
+    """
+    transmission, fatality, initial_infectious = get_seir_parameters(graph, policies)
+    total_cases, total_deaths = integrate_seir(np.array([transmission]), np.array([fatality]),
+                                               np.array([float(initial_infectious)]), horizon)
+
+    prediction = {'Day': np.arange(1, horizon + 1, dtype=np.int64),
+                  'Total_Cases': np.rint(total_cases[:, 0]).astype(np.int64),
+                  'Total_Deaths': np.rint(total_deaths[:, 0]).astype(np.int64)}
+
+    return pd.DataFrame(prediction, columns=['Day', 'Total_Cases', 'Total_Deaths'])
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['numpy', 'pandas', 'classes', 'computations', 'predictions']
+    })
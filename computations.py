@@ -22,8 +22,14 @@ import random
 import statistics
 from typing import Optional
 
+import instrumentation
 from classes import _WeightedVertex, WeightedGraph
 
+# Every policy in the program
+ALL_POLICIES = ['face-covering-policies', 'public-campaigns-covid', 'public-events-cancellation',
+                'school-workplace-closures', 'stay-at-home', 'testing-policy',
+                'vaccination-policy']
+
 
 def get_new_cases_growth_rate(graph: WeightedGraph, start: Optional[_WeightedVertex],
                               policy: str, level: int, visited: set[_WeightedVertex]) -> float:
@@ -67,7 +73,9 @@ def get_new_cases_growth_rate(graph: WeightedGraph, start: Optional[_WeightedVer
     if start is None:
         return _get_new_cases_special(graph, policy, level)
 
-    lst = start.get_neighbour_averages_cases(policy, level, set())
+    traversed = set()
+    lst = start.get_neighbour_averages_cases(policy, level, traversed)
+    instrumentation.observe('computations.vertices_visited_per_traversal', len(traversed))
     lst.append(get_average(start.new_cases) / start.population)
 
     return get_average(lst)
@@ -100,6 +108,7 @@ def _get_new_cases_special(graph: WeightedGraph, policy: str, level: int) -> flo
     True
     """
     vertices = graph.get_all_vertices()
+    instrumentation.count('computations.fallback_level_searches')
 
     lower = level
     while lower >= 0:
@@ -131,6 +140,7 @@ def _get_new_cases_special(graph: WeightedGraph, policy: str, level: int) -> flo
         return get_average([upper_bound, lower_bound])
 
 
+@instrumentation.timed
 def get_final_case_average(graph: WeightedGraph, policy: str, level: int) -> float:
     """This function make use of get_new_cases_growth_rate between 5 to 10 times (chosen randomly)
     to get a final average of the number of new cases based on the given policy level.
@@ -146,6 +156,7 @@ def get_final_case_average(graph: WeightedGraph, policy: str, level: int) -> flo
         - 0 <= level <= 6
     """
     num_times = random.randint(5, 10)
+    instrumentation.count('computations.monte_carlo_restarts', num_times)
     choices = [graph.get_all_vertices()[country] for country in graph.get_all_vertices() if
                graph.get_all_vertices()[country].restrictions_level[policy] == level]
 
@@ -204,7 +215,9 @@ def get_new_deaths_growth_rate(graph: WeightedGraph, start: Optional[_WeightedVe
     if start is None:
         return _get_new_deaths_special(graph, policy, level)
 
-    lst = start.get_neighbour_averages_deaths(policy, level, set())
+    traversed = set()
+    lst = start.get_neighbour_averages_deaths(policy, level, traversed)
+    instrumentation.observe('computations.vertices_visited_per_traversal', len(traversed))
     lst.append(get_average(start.new_deaths) / start.population)
 
     return get_average(lst)
@@ -237,6 +250,7 @@ def _get_new_deaths_special(graph: WeightedGraph, policy: str, level: int) -> fl
     True
     """
     vertices = graph.get_all_vertices()
+    instrumentation.count('computations.fallback_level_searches')
 
     lower = level
     while lower >= 0:
@@ -268,6 +282,7 @@ def _get_new_deaths_special(graph: WeightedGraph, policy: str, level: int) -> fl
         return get_average([upper_bound, lower_bound])
 
 
+@instrumentation.timed
 def get_final_deaths_average(graph: WeightedGraph, policy: str, level: int) -> float:
     """This function make use of get_new_cases_growth_rate between 5 to 10 times (chosen randomly)
     to get a final average of the number of new cases based on the given policy level.
@@ -283,6 +298,7 @@ def get_final_deaths_average(graph: WeightedGraph, policy: str, level: int) -> f
         - 0 <= level <= 6
     """
     num_times = random.randint(5, 10)
+    instrumentation.count('computations.monte_carlo_restarts', num_times)
     choices = [graph.get_all_vertices()[country] for country in graph.get_all_vertices() if
                graph.get_all_vertices()[country].restrictions_level[policy] == level]
 
@@ -299,6 +315,60 @@ def get_final_deaths_average(graph: WeightedGraph, policy: str, level: int) -> f
     return get_average(averages)
 
 
+def get_start_countries(graph: WeightedGraph, policy: str, level: int) -> list[str]:
+    """Return the countries that get_final_case_average and get_final_deaths_average randomly
+    choose the start vertex from, i.e. every country with the specific level of the policy.
+
+    Preconditions:
+        - policy in ['face-covering-policies', 'public-campaigns-covid',
+            'public-events-cancellation','school-workplace-closures', 'stay-at-home',
+            'testing-policy', 'vaccination-policy']
+        - 0 <= level <= 6
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [0.1], [0.1], 10000)
+    >>> g.add_vertex('c2', [0.1], [0.1], 10000)
+    >>> g.add_vertex_restrictions('c1', 'face-covering-policies', 2)
+    >>> g.add_vertex_restrictions('c2', 'face-covering-policies', 1)
+    >>> get_start_countries(g, 'face-covering-policies', 2)
+    ['c1']
+    """
+    vertices = graph.get_all_vertices()
+
+    return [country for country in vertices
+            if vertices[country].restrictions_level[policy] == level]
+
+
+def get_start_growth_rate(graph: WeightedGraph, category: str, policy: str, level: int,
+                          country: Optional[str]) -> float:
+    """Return the average daily new cases or deaths rate (specified by the category argument)
+    for the specific level of the policy, traversing the graph from the vertex of country.
+    If country is None, no start vertex is given.
+
+    The traversal from a given start vertex always returns the same rate, so this is the
+    rate that get_final_case_average and get_final_deaths_average average over.
+
+    Preconditions:
+        - category in ['cases', 'deaths']
+        - country is None or country in graph.get_all_vertices()
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [0.1], [0.2], 10000)
+    >>> g.add_vertex_restrictions('c1', 'face-covering-policies', 2)
+    >>> get_start_growth_rate(g, 'deaths', 'face-covering-policies', 2, 'c1') == 0.2 / 10000
+    True
+    """
+    if country is None:
+        start = None
+    else:
+        start = graph.get_all_vertices()[country]
+
+    if category == 'cases':
+        return get_new_cases_growth_rate(graph, start, policy, level, set())
+    else:
+        return get_new_deaths_growth_rate(graph, start, policy, level, set())
+
+
 def get_average(lst: list[float]) -> float:
     """Return the average given a list of floating numbers.
 
@@ -355,6 +425,55 @@ def exact_policies(graph: WeightedGraph, policies: dict[str, int]) -> list[str]:
     return returned
 
 
+def get_policy_bitmaps(graph: WeightedGraph) -> tuple[list[str], dict[tuple[str, int], int]]:
+    """Return the countries of the graph and a mapping of every (policy, level) in the graph
+    to a bitmap of the countries with that level of the policy, in the form of
+    (countries, bitmaps). Bit i of a bitmap is set if the i-th country has the level.
+
+    The bitmaps let exact_policies_from_bitmaps find the countries with many different
+    combinations of policies without going through every vertex each time.
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [0.1], [0.1], 10000)
+    >>> g.add_vertex('c2', [0.1], [0.1], 10000)
+    >>> g.add_vertex_restrictions('c1', 'stay-at-home', 2)
+    >>> g.add_vertex_restrictions('c2', 'stay-at-home', 2)
+    >>> countries, bitmaps = get_policy_bitmaps(g)
+    >>> bin(bitmaps[('stay-at-home', 2)])
+    '0b11'
+    """
+    vertices = graph.get_all_vertices()
+    countries = list(vertices)
+    bitmaps = {}
+
+    for i, country in enumerate(countries):
+        restrictions = vertices[country].restrictions_level
+        for policy in restrictions:
+            key = (policy, restrictions[policy])
+            bitmaps[key] = bitmaps.get(key, 0) | (1 << i)
+
+    return (countries, bitmaps)
+
+
+def exact_policies_from_bitmaps(countries: list[str], bitmaps: dict[tuple[str, int], int],
+                                policies: dict[str, int]) -> list[str]:
+    """Return the same list as exact_policies, given the countries and bitmaps returned by
+    get_policy_bitmaps for the graph.
+
+    >>> import init_graph
+    >>> g = init_graph.get_test_graph()
+    >>> countries, bitmaps = get_policy_bitmaps(g)
+    >>> policies = {'testing-policy': 0, 'vaccination-policy': 1, 'stay-at-home': 0}
+    >>> exact_policies_from_bitmaps(countries, bitmaps, policies)
+    ['Afghanistan']
+    """
+    matches = (1 << len(countries)) - 1
+    for policy in policies:
+        matches &= bitmaps.get((policy, policies[policy]), 0)
+
+    return [country for i, country in enumerate(countries) if matches >> i & 1]
+
+
 def get_exact_case_average(graph: WeightedGraph, lst: list[str]) -> float:
     """Return the exact average daily case count from the list of countries.
 
@@ -395,6 +514,7 @@ def get_exact_deaths_average(graph: WeightedGraph, lst: list[str]) -> float:
     return get_average(averages)
 
 
+@instrumentation.timed
 def get_total_average_case_growth(graph: WeightedGraph, policies: dict[str, int]) -> float:
     """Return the total average new cases every day given a range of policies and their
     respective level in the dict of the form of {policies: level}. The returned
@@ -431,6 +551,7 @@ def get_total_average_case_growth(graph: WeightedGraph, policies: dict[str, int]
         return get_average(growths)
 
 
+@instrumentation.timed
 def get_total_average_deaths_growth(graph: WeightedGraph, policies: dict[str, int]) -> float:
     """Return the total average new deaths every day given a range of policies and their
     respective level in the dict of the form of {policies: level}. The returned
@@ -481,5 +602,5 @@ if __name__ == '__main__':
     python_ta.check_all(config={
         'max-line-length': 100,
         'disable': ['E1136'],
-        'extra-imports': ['statistics', 'random', 'classes']
+        'extra-imports': ['statistics', 'random', 'classes', 'instrumentation']
     })
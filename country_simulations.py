@@ -0,0 +1,231 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains functions that produces a simulation for every
+country in the graph at once, each with its own population and its own daily
+cases and deaths rates, instead of one simulation for the whole world population.
+
+The results are matrices with one row per country and one column per day, which can
+be summed into global or regional totals.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import os
+import statistics
+from typing import Optional
+
+import numpy as np
+
+from classes import WeightedGraph
+from computations import get_total_average_case_growth, get_total_average_deaths_growth
+from predictions import DAYS_TO_DEATH, cumulative_totals
+
+# The number of days computed at once when filling the matrices
+BLOCK_DAYS = 256
+
+# The most bytes of the region by country indicator matrix that get_regional_totals builds.
+# Above it, the rows are added to their region one by one instead.
+MAX_INDICATOR_BYTES = 2 ** 25
+
+
+def get_country_rates(graph: WeightedGraph, policies: Optional[dict[str, int]] = None) \
+        -> tuple[list[str], np.ndarray, np.ndarray]:
+    """Return the daily new cases and deaths rates of every country in the graph in the form of
+    (countries, case rates, death rates), where the i-th rates belong to the i-th country.
+
+    If policies is None, the rates of a country are the averages of its own daily new cases
+    and deaths, divided by its population.
+
+    Otherwise, the rates of each country are adjusted to the given policies: they are multiplied
+    by the rate of the given policies (refer to get_total_average_case_growth) divided by the
+    average rate of the countries with the same levels of those policies as the country itself.
+
+    Preconditions:
+        - policies is None or 0 < len(policies) <= 7
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [10.0], [1.0], 1000)
+    >>> g.add_vertex('c2', [30.0], [1.0], 1000)
+    >>> g.add_vertex_restrictions('c1', 'stay-at-home', 0)
+    >>> g.add_vertex_restrictions('c2', 'stay-at-home', 1)
+    >>> countries, cases, deaths = get_country_rates(g)
+    >>> countries, cases.tolist()
+    (['c1', 'c2'], [0.01, 0.03])
+    >>> countries, cases, deaths = get_country_rates(g, {'stay-at-home': 1})
+    >>> [round(rate, 6) for rate in cases.tolist()]
+    [0.03, 0.03]
+    """
+    vertices = graph.get_all_vertices()
+    countries = list(vertices)
+
+    case_rates = np.array([statistics.mean(vertices[country].new_cases)
+                           / vertices[country].population for country in countries])
+    death_rates = np.array([statistics.mean(vertices[country].new_deaths)
+                            / vertices[country].population for country in countries])
+
+    if policies is None:
+        return (countries, case_rates, death_rates)
+
+    keys = [tuple(vertices[country].restrictions_level[policy] for policy in policies)
+            for country in countries]
+    groups = {key: i for i, key in enumerate(dict.fromkeys(keys))}
+    group_of_country = np.array([groups[key] for key in keys], dtype=np.int64)
+    group_sizes = np.bincount(group_of_country)
+
+    adjusted = []
+    for rates, scenario_rate in [(case_rates, get_total_average_case_growth(graph, policies)),
+                                 (death_rates, get_total_average_deaths_growth(graph, policies))]:
+        current_rates = (np.bincount(group_of_country, weights=rates)
+                         / group_sizes)[group_of_country]
+        adjusted.append(np.divide(rates * scenario_rate, current_rates,
+                                  out=np.zeros(len(rates)), where=current_rates > 0))
+
+    return (countries, adjusted[0], adjusted[1])
+
+
+def simulate_countries(graph: WeightedGraph, policies: Optional[dict[str, int]] = None,
+                       days: int = 365, dtype: type = np.float64,
+                       directory: Optional[str] = None) \
+        -> tuple[list[str], np.ndarray, np.ndarray]:
+    """Simulate every country in the graph at once, and return the result in the form of
+    (countries, total cases, total deaths). The i-th row of each matrix is the cumulative
+    count of the i-th country, and the j-th column is day j + 1.
+
+    Each country follows the linear simulation of simulations.create_predictions, but with
+    its own population and its own rates (refer to get_country_rates), and the counts are
+    capped at its population.
+
+    If directory is given, the matrices are memory-mapped to the files cases.npy and
+    deaths.npy in that directory, so they never need to fit in memory. The matrices are
+    filled BLOCK_DAYS days at a time.
+
+    Preconditions:
+        - policies is None or 0 < len(policies) <= 7
+        - days >= 0
+        - dtype in [np.float32, np.float64]
+        - directory is None or os.path.isdir(directory)
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [10.0], [1.0], 1000)
+    >>> g.add_vertex('c2', [30.0], [1.0], 1000)
+    >>> g.add_vertex_restrictions('c1', 'stay-at-home', 0)
+    >>> g.add_vertex_restrictions('c2', 'stay-at-home', 1)
+    >>> countries, cases, deaths = simulate_countries(g, days=50)
+    >>> cases.shape
+    (2, 50)
+    >>> cases[:, -1].tolist(), deaths[:, 19].tolist()
+    ([500.0, 1000.0], [2.0, 2.0])
+    """
+    countries, case_rates, death_rates = get_country_rates(graph, policies)
+    vertices = graph.get_all_vertices()
+
+    populations = np.array([vertices[country].population for country in countries],
+                           dtype=np.int64)[:, None]
+    daily_cases = np.rint(populations[:, 0] * case_rates).astype(np.int64)[:, None]
+    daily_deaths = np.rint(populations[:, 0] * death_rates).astype(np.int64)[:, None]
+
+    shape = (len(countries), days)
+    if directory is None:
+        total_cases = np.empty(shape, dtype=dtype)
+        total_deaths = np.empty(shape, dtype=dtype)
+    else:
+        total_cases = np.lib.format.open_memmap(os.path.join(directory, 'cases.npy'), 'w+',
+                                                dtype, shape)
+        total_deaths = np.lib.format.open_memmap(os.path.join(directory, 'deaths.npy'), 'w+',
+                                                 dtype, shape)
+
+    for first_day in range(1, days + 1, BLOCK_DAYS):
+        block = np.arange(first_day, min(first_day + BLOCK_DAYS, days + 1), dtype=np.int64)
+        columns = slice(first_day - 1, first_day - 1 + len(block))
+        death_days = np.maximum(block - (DAYS_TO_DEATH - 1), 0)
+
+        total_cases[:, columns] = cumulative_totals(block[None, :], daily_cases, populations)
+        total_deaths[:, columns] = cumulative_totals(death_days[None, :], daily_deaths,
+                                                     populations)
+
+    return (countries, total_cases, total_deaths)
+
+
+def get_global_totals(matrix: np.ndarray) -> np.ndarray:
+    """Return the total over every country on each day, given a matrix returned by
+    simulate_countries.
+
+    >>> get_global_totals(np.array([[1.0, 2.0], [3.0, 4.0]])).tolist()
+    [4.0, 6.0]
+    """
+    return matrix.sum(axis=0, dtype=np.float64)
+
+
+def get_regional_totals(countries: list[str], matrix: np.ndarray, regions: dict[str, str],
+                        other: str = 'Other', max_indicator_bytes: int = MAX_INDICATOR_BYTES) \
+        -> dict[str, np.ndarray]:
+    """Return a mapping of each region to its total on each day, given the countries and a
+    matrix returned by simulate_countries, and a mapping of countries to their region.
+    Countries that are not in regions are counted in the region named by other.
+
+    The matrix is summed BLOCK_DAYS columns at a time, so only one block of a memory-mapped
+    matrix is read in at once. When the float64 matrix indicating the region of each country
+    fits in max_indicator_bytes, as for countries grouped into a few regions, each block is
+    multiplied by it. Otherwise, the rows are added to the total of their region with
+    np.add.at, which is slower for a few regions but builds no matrix that grows with them.
+
+    Preconditions:
+        - max_indicator_bytes >= 0
+
+    >>> matrix = np.array([[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]])
+    >>> totals = get_regional_totals(['a', 'b', 'c'], matrix, {'a': 'X', 'c': 'X'})
+    >>> {region: totals[region].tolist() for region in totals}
+    {'X': [6.0, 8.0], 'Other': [3.0, 4.0]}
+    >>> totals = get_regional_totals(['a', 'b', 'c'], matrix, {'a': 'X', 'c': 'X'},
+    ...                              max_indicator_bytes=0)
+    >>> {region: totals[region].tolist() for region in totals}
+    {'X': [6.0, 8.0], 'Other': [3.0, 4.0]}
+    >>> get_regional_totals([], np.zeros((0, 2)), {})
+    {}
+    """
+    names = [regions.get(country, other) for country in countries]
+    region_index = {region: i for i, region in enumerate(dict.fromkeys(names))}
+    region_of_country = np.array([region_index[name] for name in names], dtype=np.int64)
+
+    totals = np.zeros((len(region_index), matrix.shape[1]), dtype=np.float64)
+
+    if len(region_index) * len(countries) * 8 <= max_indicator_bytes:
+        indicator = np.zeros((len(region_index), len(countries)))
+        indicator[region_of_country, np.arange(len(countries))] = 1.0
+        for first in range(0, matrix.shape[1], BLOCK_DAYS):
+            columns = slice(first, first + BLOCK_DAYS)
+            totals[:, columns] = indicator @ matrix[:, columns]
+    else:
+        for first in range(0, matrix.shape[1], BLOCK_DAYS):
+            columns = slice(first, first + BLOCK_DAYS)
+            np.add.at(totals[:, columns], region_of_country, matrix[:, columns])
+
+    return {region: totals[region_index[region]] for region in region_index}
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['os', 'statistics', 'numpy', 'classes', 'computations', 'predictions']
+    })
@@ -0,0 +1,413 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains a small local web server to explore the networks and
+simulations interactively, instead of editing main.py and running it again.
+
+The graph is loaded once when the server starts, and the most recently used network
+figures and simulation results are kept in memory after they are first computed, so asking
+for the same policies again is answered from the cache. Run this module and open
+http://127.0.0.1:8050 in a browser.
+
+The server answers the following requests:
+    - /                      the dashboard page
+    - /plotly.min.js         the plotly.js bundle used by the page
+    - /api/policies          the levels and their descriptions for every policy
+    - /api/network/<policy>  the network figure of a policy (edge_budget is optional)
+    - /api/networks/stream   every network figure, streamed as server-sent events
+    - /api/simulation        the total cases and deaths for the policies in the query,
+                             e.g. /api/simulation?stay-at-home=1&testing-policy=2&horizon=365
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import functools
+import json
+import pickle
+import threading
+import traceback
+import urllib.parse
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Hashable, Optional
+
+import plotly.offline
+
+from classes import WeightedGraph
+from computations import ALL_POLICIES
+from plot_networks import get_cached_figure, get_level_descriptions, get_policy_figure
+from queries import MAX_HORIZON, parse_policies
+from simulations import create_predictions
+
+# The most network figures and simulations that the server keeps in memory. The least
+# recently used ones are dropped first.
+MAX_NETWORKS = 64
+MAX_SIMULATIONS = 256
+
+# The dashboard page. The network figures are streamed in as soon as they are ready, and the
+# simulation is fetched again whenever a policy level is changed.
+DASHBOARD_PAGE = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Picturing the Power of Policy in a Pandemic</title>
+<script src="/plotly.min.js"></script>
+<style>
+body { font-family: sans-serif; margin: 20px; }
+#controls label { display: inline-block; margin: 0 16px 8px 0; }
+</style>
+</head>
+<body>
+<h2>Picturing the Power of Policy in a Pandemic</h2>
+<div id="controls"></div>
+<p id="status"></p>
+<div id="simulation" style="height: 500px;"></div>
+<select id="network-policy"></select>
+<div id="network" style="height: 700px;"></div>
+<script>
+const networks = {};
+
+function showNetwork() {
+  const policy = document.getElementById('network-policy').value;
+  if (policy in networks) {
+    Plotly.react('network', networks[policy].data, networks[policy].layout);
+  }
+}
+
+function simulate() {
+  const query = new URLSearchParams();
+  for (const select of document.querySelectorAll('#controls select')) {
+    if (select.value !== '') {
+      query.set(select.name, select.value);
+    }
+  }
+  if ([...query.keys()].length === 0) {
+    return;
+  }
+  const start = performance.now();
+  fetch('/api/simulation?' + query).then(response => response.json()).then(result => {
+    Plotly.react('simulation', [
+      {x: result.Day, y: result.Total_Cases, mode: 'lines', name: 'Total Cases'},
+      {x: result.Day, y: result.Total_Deaths, mode: 'lines', name: 'Total Deaths'}
+    ], {title: 'COVID-19 Simulation Based on Given Policies', xaxis: {title: 'Day'},
+        yaxis: {title: 'Total Number of Cases/Deaths'}});
+    document.getElementById('status').textContent =
+      'Simulation answered in ' + Math.round(performance.now() - start) + ' ms';
+  });
+}
+
+fetch('/api/policies').then(response => response.json()).then(policies => {
+  const controls = document.getElementById('controls');
+  const networkPolicy = document.getElementById('network-policy');
+  for (const policy in policies) {
+    const label = document.createElement('label');
+    const select = document.createElement('select');
+    select.name = policy;
+    select.add(new Option('(not specified)', ''));
+    for (const level in policies[policy]) {
+      select.add(new Option(level + ': ' + policies[policy][level], level));
+    }
+    select.value = '1';
+    select.onchange = simulate;
+    label.append(policy + ' ', select);
+    controls.append(label);
+    networkPolicy.add(new Option(policy, policy));
+  }
+  networkPolicy.onchange = showNetwork;
+  simulate();
+});
+
+const stream = new EventSource('/api/networks/stream');
+stream.addEventListener('network', event => {
+  const network = JSON.parse(event.data);
+  networks[network.policy] = network.figure;
+  if (network.policy === document.getElementById('network-policy').value) {
+    showNetwork();
+  }
+});
+stream.addEventListener('done', () => stream.close());
+</script>
+</body>
+</html>
+'''
+
+
+class DashboardState:
+    """The graph and the results shared by every request to the dashboard server.
+
+    The requests are answered in threads of their own, so each result is computed while
+    holding a lock of its own: a request for a result that is being computed waits for it
+    instead of computing it again.
+
+    Instance Attributes:
+        - graph: The graph that every network and simulation is computed from
+        - cache_dir: The folder where network figures are cached on disk, or None
+        - networks: The json of the network figures computed most recently, mapped from
+                    (policy, edge budget), from the least to the most recently used
+        - simulations: The json of the simulations computed most recently, mapped from
+                       (policies as sorted (policy, level) pairs, horizon), from the least to
+                       the most recently used
+
+    Representation Invariants:
+        - all(key[0] in ALL_POLICIES for key in self.networks)
+        - len(self.networks) <= MAX_NETWORKS
+        - len(self.simulations) <= MAX_SIMULATIONS
+    """
+    graph: WeightedGraph
+    cache_dir: Optional[str]
+    networks: OrderedDict[tuple[str, Optional[int]], str]
+    simulations: OrderedDict[tuple[tuple[tuple[str, int], ...], int], bytes]
+
+    # Private Instance Attributes:
+    #     - _lock: The lock held while reading or changing the caches and _key_locks
+    #     - _key_locks: The lock of each result being computed, mapped from the name of its
+    #                   cache and its key
+    _lock: threading.Lock
+    _key_locks: dict[tuple[str, Hashable], threading.Lock]
+
+    def __init__(self, graph: WeightedGraph, cache_dir: Optional[str] = None) -> None:
+        """Initialise the state of a dashboard server for graph, with empty caches."""
+        self.graph = graph
+        self.cache_dir = cache_dir
+        self.networks = OrderedDict()
+        self.simulations = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _get_cached(self, name: str, key: Hashable, max_size: int,
+                    compute: Callable[[], Any]) -> Any:
+        """Return the value of key in the cache called name (an attribute of this state),
+        computing it with compute() and adding it to the cache if it is not there. The least
+        recently used value is dropped if the cache holds more than max_size values.
+
+        Only one thread computes the value of a key at a time. The others wait for it, and then
+        read the value from the cache.
+
+        >>> state = DashboardState(WeightedGraph())
+        >>> for n in range(3):
+        ...     _ = state._get_cached('networks', ('stay-at-home', n), 2, lambda: '{}')
+        >>> list(state.networks)
+        [('stay-at-home', 1), ('stay-at-home', 2)]
+        """
+        cache = getattr(self, name)
+
+        with self._lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+            key_lock = self._key_locks.setdefault((name, key), threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in cache:
+                    cache.move_to_end(key)
+                    return cache[key]
+
+            try:
+                value = compute()
+
+                with self._lock:
+                    cache[key] = value
+                    while len(cache) > max_size:
+                        cache.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._key_locks.pop((name, key), None)
+
+        return value
+
+    def get_network(self, policy: str, edge_budget: Optional[int] = None) -> str:
+        """Return the json of the network figure of the policy (refer to
+        plot_networks.get_policy_figure), computing it only the first time it is asked for
+        since it was last dropped from the cache.
+
+        Preconditions:
+            - policy in ALL_POLICIES
+            - edge_budget is None or edge_budget >= 0
+        """
+        def compute() -> str:
+            if self.cache_dir is None:
+                fig = get_policy_figure(self.graph, policy, edge_budget)
+            else:
+                fig = get_cached_figure(self.graph, policy, self.cache_dir, edge_budget)
+            return fig.to_json()
+
+        return self._get_cached('networks', (policy, edge_budget), MAX_NETWORKS, compute)
+
+    def get_simulation(self, policies: dict[str, int], horizon: int = 365) -> bytes:
+        """Return the json of the simulation of the policies for horizon days, computing it only
+        the first time it is asked for since it was last dropped from the cache. The json holds
+        the policies, the horizon and the Day, Total_Cases and Total_Deaths columns of
+        simulations.create_predictions.
+
+        As the daily rates are drawn from random traversals, caching also means that the same
+        policies always give the same simulation while it is in the cache.
+
+        Preconditions:
+            - 0 < len(policies) <= 7
+            - 2 <= horizon <= MAX_HORIZON
+
+        >>> g = WeightedGraph()
+        >>> g.add_vertex('c1', [100.0], [10.0], 1000000)
+        >>> g.add_vertex_restrictions('c1', 'stay-at-home', 1)
+        >>> state = DashboardState(g)
+        >>> result = json.loads(state.get_simulation({'stay-at-home': 1}, 20))
+        >>> result['Total_Deaths'][-1], len(state.simulations)
+        (156000, 1)
+        """
+        def compute() -> bytes:
+            dataframe = create_predictions(self.graph, policies, horizon)
+            return json.dumps({
+                'policies': policies,
+                'horizon': horizon,
+                'Day': dataframe['Day'].tolist(),
+                'Total_Cases': dataframe['Total_Cases'].tolist(),
+                'Total_Deaths': dataframe['Total_Deaths'].tolist()
+            }).encode()
+
+        return self._get_cached('simulations', (tuple(sorted(policies.items())), horizon),
+                                MAX_SIMULATIONS, compute)
+
+
+class DashboardRequestHandler(BaseHTTPRequestHandler):
+    """The handler of the requests to a dashboard server (refer to make_server).
+
+    Every handler reads the graph and the caches from the DashboardState of its server.
+    """
+
+    def do_GET(self) -> None:
+        """Answer a GET request."""
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        state = self.server.state
+
+        try:
+            if url.path == '/':
+                self.send_body(DASHBOARD_PAGE.encode(), 'text/html; charset=utf-8')
+            elif url.path == '/plotly.min.js':
+                self.send_body(get_plotlyjs_bundle(), 'application/javascript')
+            elif url.path == '/api/policies':
+                self.send_body(json.dumps({policy: get_level_descriptions(policy)
+                                           for policy in ALL_POLICIES}).encode())
+            elif url.path.startswith('/api/network/'):
+                policy = url.path[len('/api/network/'):]
+                if policy not in ALL_POLICIES:
+                    raise ValueError('unknown policy ' + policy)
+                edge_budget = parse_edge_budget(query)
+                self.send_body(state.get_network(policy, edge_budget).encode())
+            elif url.path == '/api/networks/stream':
+                self.stream_networks(state, parse_edge_budget(query))
+            elif url.path == '/api/simulation':
+                horizon = int(query.get('horizon', ['365'])[0])
+                if not 2 <= horizon <= MAX_HORIZON:
+                    raise ValueError('horizon must be between 2 and ' + str(MAX_HORIZON))
+                self.send_body(state.get_simulation(parse_policies(query), horizon))
+            else:
+                self.send_error(404)
+        except ValueError as error:
+            self.send_error(400, str(error))
+        except ConnectionError:
+            # The client is gone, so there is no one to answer
+            pass
+        except Exception as error:
+            traceback.print_exc()
+            self.send_error(500, type(error).__name__ + ': ' + str(error))
+
+    def send_body(self, body: bytes, content_type: str = 'application/json') -> None:
+        """Send a successful response with the given body."""
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_networks(self, state: DashboardState, edge_budget: Optional[int]) -> None:
+        """Send the network figure of every policy in ALL_POLICIES as a server-sent 'network'
+        event as soon as it is ready, followed by a 'done' event."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        for policy in ALL_POLICIES:
+            figure = state.get_network(policy, edge_budget)
+            self.wfile.write(('event: network\ndata: {"policy": ' + json.dumps(policy)
+                              + ', "figure": ' + figure + '}\n\n').encode())
+            self.wfile.flush()
+
+        self.wfile.write(b'event: done\ndata: {}\n\n')
+        self.wfile.flush()
+
+    def log_message(self, message_format: str, *args: object) -> None:
+        """Do not log every request."""
+
+
+def parse_edge_budget(query: dict[str, list[str]]) -> Optional[int]:
+    """Return the edge budget given in a parsed query string, or None if it is not given.
+
+    >>> parse_edge_budget({'edge_budget': ['200']})
+    200
+    >>> parse_edge_budget({}) is None
+    True
+    """
+    if 'edge_budget' not in query:
+        return None
+
+    edge_budget = int(query['edge_budget'][0])
+    if edge_budget < 0:
+        raise ValueError('edge_budget must not be negative')
+
+    return edge_budget
+
+
+@functools.lru_cache(maxsize=None)
+def get_plotlyjs_bundle() -> bytes:
+    """Return the plotly.js bundle that the dashboard page loads. It is only read once."""
+    return plotly.offline.get_plotlyjs().encode()
+
+
+def make_server(graph: WeightedGraph, host: str = '127.0.0.1', port: int = 8050,
+                cache_dir: Optional[str] = None) -> ThreadingHTTPServer:
+    """Return a dashboard server for graph listening on host and port, which answers every
+    request in its own thread. Call serve_forever on it to start answering requests.
+
+    If cache_dir is given, the network figures are also cached on disk in cache_dir (refer to
+    plot_networks.get_cached_figure).
+
+    >>> import threading
+    >>> import urllib.request
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [100.0], [10.0], 1000000)
+    >>> g.add_vertex_restrictions('c1', 'stay-at-home', 1)
+    >>> server = make_server(g, port=0)
+    >>> threading.Thread(target=server.serve_forever, daemon=True).start()
+    >>> url = 'http://127.0.0.1:' + str(server.server_address[1])
+    >>> with urllib.request.urlopen(url + '/api/simulation?stay-at-home=1&horizon=20') as reply:
+    ...     json.loads(reply.read())['Total_Cases'][-1]
+    15600000
+    >>> server.shutdown()
+    >>> server.server_close()
+    """
+    server = ThreadingHTTPServer((host, port), DashboardRequestHandler)
+    server.daemon_threads = True
+    server.state = DashboardState(graph, cache_dir)
+
+    return server
+
+
+if __name__ == '__main__':
+    with open('datasets/saved_graph', 'rb') as infile:
+        real_graph = pickle.load(infile)
+
+    dashboard = make_server(real_graph, cache_dir='cache')
+    print('Serving the dashboard on http://127.0.0.1:' + str(dashboard.server_address[1]))
+    dashboard.serve_forever()
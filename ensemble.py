@@ -0,0 +1,255 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains functions that produces an ensemble of simulations
+to visualise how uncertain the predicted cases and deaths are.
+
+get_total_average_case_growth and get_total_average_deaths_growth average over
+randomly chosen start vertices, so they return a different rate on each run. Here, many
+such rates are drawn at once, every simulation is run in one batch, and the spread of the
+results is summarised by percentiles for every day.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from classes import WeightedGraph
+from computations import exact_policies, get_exact_case_average, get_exact_deaths_average, \
+    get_start_countries
+from export import get_scenario_name, output_figure
+from predictions import WORLD_POPULATION, batch_prediction_columns
+from simulations import get_annotations
+from shared_graph import SharedGraph
+from workers import map_with_shared_graph
+
+# The fewest and most number of times get_final_case_average and get_final_deaths_average
+# traverse the graph before taking the average
+MIN_TRAVERSALS = 5
+MAX_TRAVERSALS = 10
+
+
+def get_rate_tables(graph: WeightedGraph, levels: list[tuple[str, int]],
+                    processes: Optional[int] = None) -> dict[tuple[str, str, int], np.ndarray]:
+    """Return a mapping of (category, policy, level) to the array of rates that a single
+    traversal can return, one entry for each possible start vertex, for both the 'cases' and
+    'deaths' categories of every (policy, level) in levels.
+
+    If no country has the level of the policy, the array holds the single rate that
+    the traversal falls back to (refer to computations._get_new_cases_special).
+
+    Every traversal is only done once, even if the same (policy, level) appears many times,
+    and the traversals are spread across the given number of worker processes. They run on a
+    snapshot of graph in shared memory (refer to workers.map_with_shared_graph), and return
+    the same rates as computations.get_start_growth_rate.
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [0.1], [0.2], 10000)
+    >>> g.add_vertex('c2', [0.3], [0.2], 10000)
+    >>> g.add_vertex_restrictions('c1', 'face-covering-policies', 2)
+    >>> g.add_vertex_restrictions('c2', 'face-covering-policies', 2)
+    >>> g.find_and_add_edge('c1')
+    >>> tables = get_rate_tables(g, [('face-covering-policies', 2)], 1)
+    >>> len(tables[('cases', 'face-covering-policies', 2)])
+    2
+    """
+    tasks = []
+    for category in ['cases', 'deaths']:
+        for policy, level in dict.fromkeys(levels):
+            countries = get_start_countries(graph, policy, level)
+            if countries == []:
+                tasks.append((category, policy, level, None))
+            else:
+                tasks.extend((category, policy, level, country) for country in countries)
+
+    rates = map_with_shared_graph(graph, _traverse_from_start, tasks, processes)
+
+    tables = {}
+    for task, rate in zip(tasks, rates):
+        tables.setdefault(task[:3], []).append(rate)
+
+    return {key: np.array(tables[key]) for key in tables}
+
+
+def _traverse_from_start(shared: SharedGraph, task: tuple[str, str, int, Optional[str]]) \
+        -> float:
+    """Return the rate of a single traversal of the snapshot shared, where task is in the form
+    of (category, policy, level, start country)."""
+    category, policy, level, country = task
+    return shared.get_start_growth_rate(category, policy, level, country)
+
+
+def sample_growth_rates(graph: WeightedGraph, policies: dict[str, int], num_samples: int,
+                        seed: Optional[int] = None, processes: Optional[int] = None) \
+        -> tuple[np.ndarray, np.ndarray]:
+    """Return num_samples draws of the rates returned by get_total_average_case_growth and
+    get_total_average_deaths_growth in the form of (case rates, death rates).
+
+    Each draw follows get_final_case_average: between MIN_TRAVERSALS and MAX_TRAVERSALS start
+    vertices are chosen randomly for each policy, and the rates of the traversals are averaged.
+    Instead of traversing the graph again for every draw, the rates of all the start vertices
+    are computed once by get_rate_tables and then sampled. If a country has exactly the given
+    policies, every draw is the same exact average.
+
+    Preconditions:
+        - 0 < len(policies) <= 7
+        - num_samples > 0
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [0.1], [0.2], 10000)
+    >>> g.add_vertex_restrictions('c1', 'face-covering-policies', 2)
+    >>> cases, deaths = sample_growth_rates(g, {'face-covering-policies': 2}, 3, 0, 1)
+    >>> cases.tolist() == [0.1 / 10000] * 3
+    True
+    """
+    exact = exact_policies(graph, policies)
+    if exact != []:
+        return (np.full(num_samples, get_exact_case_average(graph, exact)),
+                np.full(num_samples, get_exact_deaths_average(graph, exact)))
+
+    tables = get_rate_tables(graph, list(policies.items()), processes)
+    rng = np.random.default_rng(seed)
+
+    samples = []
+    for category in ['cases', 'deaths']:
+        total = np.zeros(num_samples)
+        for policy in policies:
+            table = tables[(category, policy, policies[policy])]
+            num_times = rng.integers(MIN_TRAVERSALS, MAX_TRAVERSALS + 1, size=num_samples)
+            chosen = table[rng.integers(0, len(table), size=(num_samples, MAX_TRAVERSALS))]
+            chosen[np.arange(MAX_TRAVERSALS) >= num_times[:, None]] = 0.0
+            total += chosen.sum(axis=1) / num_times
+        samples.append(total / len(policies))
+
+    return (samples[0], samples[1])
+
+
+def ensemble_predictions(graph: WeightedGraph, policies: dict[str, int],
+                         num_samples: int = 100, horizon: int = 365,
+                         percentiles: tuple[float, ...] = (5, 50, 95),
+                         seed: Optional[int] = None,
+                         processes: Optional[int] = None) -> pd.DataFrame:
+    """Run num_samples simulations based on the given policies, each with its own draw of the
+    daily cases and deaths rates (refer to sample_growth_rates), and return the given
+    percentiles of the total cases and deaths on every day in the form of a pandas dataframe:
+
+    Day | Total_Cases_p5 | Total_Cases_p50 | ... | Total_Deaths_p95
+    ----------------------------------------------------------------
+    1   | 900            | 1000            | ... | 0
+
+    Preconditions:
+        - 0 < len(policies) <= 7
+        - num_samples > 0
+        - horizon >= 0
+        - all(0 <= p <= 100 for p in percentiles)
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [100.0], [10.0], 1000000)
+    >>> g.add_vertex_restrictions('c1', 'face-covering-policies', 2)
+    >>> bands = ensemble_predictions(g, {'face-covering-policies': 2}, 4, 20, (5, 95), 0, 1)
+    >>> list(bands.columns)
+    ['Day', 'Total_Cases_p5', 'Total_Cases_p95', 'Total_Deaths_p5', 'Total_Deaths_p95']
+    >>> int(bands['Total_Deaths_p95'].iloc[-1])
+    156000
+    """
+    case_rates, death_rates = sample_growth_rates(graph, policies, num_samples, seed, processes)
+    daily_cases = np.rint(WORLD_POPULATION * case_rates).astype(np.int64)
+    daily_deaths = np.rint(WORLD_POPULATION * death_rates).astype(np.int64)
+
+    columns = batch_prediction_columns(daily_cases, daily_deaths, horizon)
+
+    bands = {'Day': columns['Day']}
+    for column in ['Total_Cases', 'Total_Deaths']:
+        values = np.percentile(columns[column], percentiles, axis=1)
+        for percentile, row in zip(percentiles, values):
+            bands[column + '_p' + format(percentile, 'g')] = row
+
+    return pd.DataFrame(bands)
+
+
+def plot_ensemble(graph: WeightedGraph, policies: dict[str, int], num_samples: int = 100,
+                  percentiles: tuple[float, float, float] = (5, 50, 95),
+                  seed: Optional[int] = None, processes: Optional[int] = None,
+                  output_dir: Optional[str] = None, file_format: str = 'html') -> Optional[str]:
+    """Plot the simulation ensemble for a year to a line graph, where the median total cases
+    and deaths are drawn as lines surrounded by a shaded band between the lower and upper
+    percentiles.
+
+    If output_dir is given, write the graph to a file in output_dir instead of showing it, and
+    return its path (refer to export.output_figure).
+
+    Preconditions:
+        - 0 < len(policies) <= 7
+        - num_samples > 0
+        - percentiles[0] <= percentiles[1] <= percentiles[2]
+        - file_format in export.FILE_FORMATS
+    """
+    dataframe = ensemble_predictions(graph, policies, num_samples, 365, percentiles, seed,
+                                     processes)
+    lower, median, upper = ['_p' + format(percentile, 'g') for percentile in percentiles]
+
+    fig = go.Figure()
+
+    for column, name, colour in [('Total_Cases', 'Total Cases', '99, 110, 250'),
+                                 ('Total_Deaths', 'Total Deaths', '239, 85, 59')]:
+        fig.add_trace(go.Scatter(x=dataframe.Day, y=dataframe[column + upper],
+                                 mode='lines', line=dict(width=0), showlegend=False,
+                                 hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=dataframe.Day, y=dataframe[column + lower],
+                                 mode='lines', line=dict(width=0), fill='tonexty',
+                                 fillcolor='rgba(' + colour + ', 0.2)',
+                                 name=name + ' (' + lower[2:] + '-' + upper[2:] + ' percentile)'))
+        fig.add_trace(go.Scatter(x=dataframe.Day, y=dataframe[column + median],
+                                 mode='lines', line=dict(color='rgb(' + colour + ')'),
+                                 name=name + ' (median)'))
+
+    fig.update_layout(title='COVID-19 Simulation Ensemble for a Year Based on Given Policies ('
+                            + str(num_samples) + ' Simulations)',
+                      xaxis_title='Day',
+                      yaxis_title='Total Number of Cases/Deaths')
+
+    fig.update_layout(annotations=[
+        dict(text=get_annotations(policies, policy), x=x, xref="paper", y=y, yref="paper",
+             align="left", showarrow=False)
+        for policy, x, y in [('face-covering-policies', 0, 1.075),
+                             ('public-campaigns-covid', 0, 1.045),
+                             ('public-events-cancellation', 0.22, 1.075),
+                             ('school-workplace-closures', 0.22, 1.045),
+                             ('stay-at-home', 0.52, 1.075),
+                             ('testing-policy', 0.52, 1.045),
+                             ('vaccination-policy', 0.8, 1.075)]
+    ])
+
+    return output_figure(fig, get_scenario_name(policies, 'ensemble'), output_dir, file_format)
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['numpy', 'pandas', 'plotly.graph_objects', 'classes', 'computations',
+                          'export', 'predictions', 'shared_graph', 'simulations', 'workers']
+    })
@@ -0,0 +1,97 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains the function that every plotting function calls
+at the end, to either show the figure in a browser or write it to a file.
+
+Written html files all refer to one plotly.min.js bundle in their directory, instead
+of each containing their own copy of plotly.js.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import os
+from typing import Optional
+
+import plotly.graph_objects as go
+
+from computations import ALL_POLICIES
+
+# The file formats that figures can be written to
+FILE_FORMATS = ['html', 'json']
+
+
+def output_figure(fig: go.Figure, name: str, output_dir: Optional[str] = None,
+                  file_format: str = 'html') -> Optional[str]:
+    """Show fig in a browser if output_dir is None. Otherwise, write fig to the file
+    name.<file_format> in output_dir (created if it does not exist) and return its path.
+
+    An html file refers to the plotly.min.js bundle in output_dir, which is written along
+    with the first html file. A json file holds the figure specification, which can be read
+    back with plotly.io.read_json.
+
+    Preconditions:
+        - file_format in FILE_FORMATS
+        - name != ''
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     path = output_figure(go.Figure(), 'empty', directory)
+    ...     sorted(os.listdir(directory)), path == os.path.join(directory, 'empty.html')
+    (['empty.html', 'plotly.min.js'], True)
+    """
+    if output_dir is None:
+        fig.show()
+        return None
+
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, name + '.' + file_format)
+
+    if file_format == 'html':
+        fig.write_html(path, include_plotlyjs='directory')
+    else:
+        fig.write_json(path)
+
+    return path
+
+
+def get_scenario_name(policies: dict[str, int], prefix: str = 'simulation') -> str:
+    """Return a file name for a simulation of the given policies. The name starts with prefix
+    and lists the level of every policy in alphabetical order, with 'x' for policies that are
+    not specified.
+
+    >>> get_scenario_name({'stay-at-home': 2, 'face-covering-policies': 1})
+    'simulation-1-x-x-x-2-x-x'
+    >>> get_scenario_name({}, 'ensemble')
+    'ensemble-x-x-x-x-x-x-x'
+    """
+    levels = [str(policies[policy]) if policy in policies else 'x' for policy in ALL_POLICIES]
+
+    return prefix + '-' + '-'.join(levels)
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['os', 'plotly.graph_objects', 'computations']
+    })
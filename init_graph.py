@@ -24,11 +24,14 @@ are expressly prohibited.
 This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
 """
 import csv
+import datetime
 import math
 import statistics
 from typing import Union
 
+import instrumentation
 from classes import CountryNotInGraphError, WeightedGraph
+from computations import ALL_POLICIES
 
 
 def convert_data_type(data: str) -> Union[str, float]:
@@ -44,6 +47,7 @@ def convert_data_type(data: str) -> Union[str, float]:
         return float(data)
 
 
+@instrumentation.timed
 def get_main_data(filename: str, data: str) -> dict[str, list[Union[str, float]]]:
     """Return a mapping of a country to a list of numbers corresponding to the
     data argument from the csv file. Each number either represent the daily new cases
@@ -83,9 +87,12 @@ def get_main_data(filename: str, data: str) -> dict[str, list[Union[str, float]]
                 else:
                     pass
 
+        instrumentation.count_file_read(filename, reader.line_num - 1)
+
         return return_dict
 
 
+@instrumentation.timed
 def get_population(filename: str, country: str) -> int:
     """Get the population of a country from the given file. If country not in filename, raise
     an CountryNotFound error.
@@ -104,11 +111,14 @@ def get_population(filename: str, country: str) -> int:
 
         for row in reader:
             if row[1] == country:
+                instrumentation.count_file_read(filename, reader.line_num - 1)
                 return int(float(row[5]))
 
+        instrumentation.count_file_read(filename, reader.line_num - 1)
         raise CountryNotFound(country)
 
 
+@instrumentation.timed
 def get_policy_restrictions(policy: str, country: str) -> Union[int, str]:
     """Get the average level of restrictions for a specific policy for the country.
 
@@ -141,6 +151,22 @@ def get_policy_restrictions(policy: str, country: str) -> Union[int, str]:
             if row[0] == country:
                 levels.append(int(row[3]))
 
+        instrumentation.count_file_read(filename, reader.line_num - 1)
+
+    return get_average_level(levels)
+
+
+def get_average_level(levels: list[int]) -> Union[int, str]:
+    """Return the average of the levels of a policy, rounded to the nearest level (rounding
+    halves down), or '' if there are no levels.
+
+    >>> get_average_level([1, 2])
+    1
+    >>> get_average_level([1, 2, 2])
+    2
+    >>> get_average_level([])
+    ''
+    """
     filtered_levels = []
 
     for level in levels:
@@ -150,12 +176,153 @@ def get_policy_restrictions(policy: str, country: str) -> Union[int, str]:
     if filtered_levels == []:
         return ''
     else:
-        if math.ceil(statistics.mean(filtered_levels)) - statistics.mean(filtered_levels) < 0.5:
-            return math.ceil(statistics.mean(filtered_levels))
-        else:
-            return math.floor(statistics.mean(filtered_levels))
+        return round_level(statistics.mean(filtered_levels))
+
+
+def round_level(mean: float) -> int:
+    """Return the average level mean rounded to the nearest level, rounding halves down.
+
+    >>> round_level(1.5)
+    1
+    >>> round_level(1.6)
+    2
+    """
+    if math.ceil(mean) - mean < 0.5:
+        return math.ceil(mean)
+    else:
+        return math.floor(mean)
+
+
+@instrumentation.timed
+def get_all_policy_restrictions(filename: str) -> dict[str, Union[int, str]]:
+    """Return a mapping of every country in the csv file of a policy to its average level of
+    restrictions, computed like get_policy_restrictions. The file is read once for every
+    country, instead of once per country.
+
+    Preconditions:
+        - filename.endswith('.csv')
+
+    >>> levels = get_all_policy_restrictions('datasets/stay-at-home.csv')
+    >>> levels['Canada'] == get_policy_restrictions('stay-at-home', 'Canada')
+    True
+    """
+    levels = {}
+    with open(filename) as policy_levels:
+        reader = csv.reader(policy_levels)
+
+        next(reader)
+
+        for row in reader:
+            if row[0] in levels:
+                levels[row[0]].append(int(row[3]))
+            else:
+                levels[row[0]] = [int(row[3])]
+
+        instrumentation.count_file_read(filename, reader.line_num - 1)
+
+    return {country: get_average_level(levels[country]) for country in levels}
+
+
+@instrumentation.timed
+def get_policy_runs(filename: str) -> dict[str, list[tuple[str, Union[int, str]]]]:
+    """Return a mapping of every country in the csv file of a policy to its levels over time in
+    run-length-encoded form: a list of (date, level) for each date its level changes, in
+    order. The level of a country on a date is the level of the last change on or before it.
+
+    A date missing from the file between two rows of a country starts a run of level '', as
+    does the day after the last row of a country, since its level is not known then.
+
+    Preconditions:
+        - filename.endswith('.csv')
+        - the rows of each country are next to each other, in order of date
+
+    >>> get_policy_runs('datasets/test-stay-at-home.csv')['Canada']
+    [('2020-02-24', 0), ('2020-02-26', '')]
+    >>> get_policy_runs('datasets/stay-at-home.csv')['Canada']
+    [('2020-01-01', 0), ('2020-03-14', 1), ('2021-01-09', 2), ('2021-03-13', '')]
+    """
+    runs = {}
+    # The last row of the country being read, in the form of (country, day, level)
+    last = None
+    # Maps each date in the file to its proleptic Gregorian ordinal, to compare dates quickly
+    ordinals = {}
+
+    with open(filename) as policy_levels:
+        reader = csv.reader(policy_levels)
+
+        next(reader)
+
+        for row in reader:
+            country, date, level = row[0], row[2], int(row[3])
+            if date not in ordinals:
+                ordinals[date] = get_ordinal(date)
+            day = ordinals[date]
+
+            if last is None or last[0] != country:
+                if last is not None:
+                    runs[last[0]].append((get_date(last[1] + 1), ''))
+                runs[country] = [(date, level)]
+            elif day != last[1] + 1:
+                runs[country].append((get_date(last[1] + 1), ''))
+                runs[country].append((date, level))
+            elif level != last[2]:
+                runs[country].append((date, level))
 
+            last = (country, day, level)
 
+        if last is not None:
+            runs[last[0]].append((get_date(last[1] + 1), ''))
+
+        instrumentation.count_file_read(filename, reader.line_num - 1)
+
+    return runs
+
+
+def get_ordinal(date: str) -> int:
+    """Return the proleptic Gregorian ordinal of date, in the form of YYYY-MM-DD.
+
+    >>> get_ordinal('2021-01-01')
+    737791
+    """
+    return datetime.date.fromisoformat(date).toordinal()
+
+
+def get_date(ordinal: int) -> str:
+    """Return the date of the proleptic Gregorian ordinal in the form of YYYY-MM-DD.
+
+    >>> get_date(737791)
+    '2021-01-01'
+    """
+    return datetime.date.fromordinal(ordinal).isoformat()
+
+
+@instrumentation.timed
+def get_all_populations(filename: str) -> dict[str, int]:
+    """Return a mapping of every country in the given file to its population, read like
+    get_population. The file is read once for every country, instead of once per country.
+
+    Preconditions:
+        - filename.endswith('.csv')
+
+    >>> get_all_populations('datasets/main_data.csv')['Afghanistan']
+    38928341
+    """
+    populations = {}
+    with open(filename) as data_file:
+        reader = csv.reader(data_file)
+
+        next(reader)
+
+        for row in reader:
+            if row[1] not in populations:
+                populations[row[1]] = int(float(row[5]))
+
+        instrumentation.count_file_read(filename, reader.line_num - 1)
+
+    return populations
+
+
+@instrumentation.timed
 def get_real_graph() -> WeightedGraph:
     """Initialise a WeightedGraph based on real world datasets."""
     countries_cases = get_main_data('datasets/main_data.csv', 'new_cases')
@@ -190,6 +357,48 @@ def get_real_graph() -> WeightedGraph:
     return graph
 
 
+@instrumentation.timed
+def get_directory_graph(directory: str) -> WeightedGraph:
+    """Initialise a WeightedGraph based on the datasets in a directory, laid out like the
+    real datasets: a main_data.csv file and a csv file for each policy named after the policy
+    (such as the datasets written by synthetic_data.generate_dataset).
+
+    Unlike get_real_graph, each file is only read once, so the time to read the files grows
+    linearly with the number of countries. Adding the edges still compares every pair of
+    countries. For the datasets folder, the graph is the same as the one of get_real_graph.
+
+    Preconditions:
+        - os.path.exists(directory + '/main_data.csv')
+        - all(os.path.exists(directory + '/' + policy + '.csv') for policy in ALL_POLICIES)
+
+    >>> g = get_directory_graph('datasets')
+    >>> g.get_all_vertices()['Canada'].restrictions_level['stay-at-home']
+    1
+    """
+    filename = directory + '/main_data.csv'
+    countries_cases = get_main_data(filename, 'new_cases')
+    countries_deaths = get_main_data(filename, 'new_deaths')
+    populations = get_all_populations(filename)
+    levels = {policy: get_all_policy_restrictions(directory + '/' + policy + '.csv')
+              for policy in ALL_POLICIES}
+    graph = WeightedGraph()
+
+    for country in countries_cases:
+        graph.add_vertex(country, countries_cases[country], countries_deaths[country],
+                         populations[country])
+
+        for policy in ALL_POLICIES:
+            graph.add_vertex_restrictions(country, policy, levels[policy].get(country, ''))
+
+    all_vertices = graph.get_all_vertices()
+
+    for country in all_vertices:
+        graph.find_and_add_edge(country)
+
+    return graph
+
+
+@instrumentation.timed
 def get_test_graph() -> WeightedGraph:
     """Initialise a WeightedGraph based on a modified, smaller test datasets.
     Run this function instead of get_real_graph for quicker run time."""
@@ -250,7 +459,10 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 100,
-        'allowed-io': ['get_main_data', 'get_population', 'get_policy_restrictions'],
-        'extra-imports': ['classes', 'csv', 'math', 'statistics'],
+        'allowed-io': ['get_main_data', 'get_population', 'get_policy_restrictions',
+                       'get_all_policy_restrictions', 'get_policy_runs',
+                       'get_all_populations'],
+        'extra-imports': ['classes', 'computations', 'csv', 'datetime', 'instrumentation', 'math',
+                          'statistics'],
         'disable': ['E1136'],
     })
@@ -0,0 +1,246 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains an opt-in instrumentation layer, which records where the time
+of a run goes. It keeps three kinds of measurements, each under a name of the form of
+module.measurement:
+    - counters, such as the rows parsed from each csv file or the edges created,
+    - timers, holding the number of calls and the total time of instrumented functions
+      (the time of a function includes the time of the instrumented functions it calls),
+    - values, holding the count, total, minimum and maximum of an observed quantity, such
+      as the number of vertices visited by each traversal.
+
+Nothing is recorded until enable() is called. Every instrumented function checks ENABLED
+before doing anything else, so the instrumentation costs next to nothing when it is
+disabled. The measurements are kept per process: work done in worker processes is not
+counted.
+
+For example:
+    >>> enable()
+    >>> count('example.rows', 3)
+    >>> get_report()['counters']
+    {'example.rows': 3}
+    >>> disable()
+    >>> reset()
+
+Run python cli.py --instrument ... to print a summary at the end of a command, or
+--instrument-json FILE to write the measurements to a json file.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import functools
+import json
+import time
+from typing import Any, Callable
+
+# Whether the measurements are recorded
+ENABLED = False
+
+# Maps the name of each counter to its count
+_counters = {}
+
+# Maps the name of each timer to [number of calls, total seconds, longest call in seconds]
+_timers = {}
+
+# Maps the name of each observed value to [count, total, minimum, maximum]
+_values = {}
+
+
+def enable() -> None:
+    """Start recording measurements."""
+    global ENABLED
+    ENABLED = True
+
+
+def disable() -> None:
+    """Stop recording measurements. The measurements so far are kept."""
+    global ENABLED
+    ENABLED = False
+
+
+def reset() -> None:
+    """Forget every measurement recorded so far."""
+    _counters.clear()
+    _timers.clear()
+    _values.clear()
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Add amount to the counter called name, if the instrumentation is enabled.
+
+    >>> count('example.rows')
+    >>> 'example.rows' in get_report()['counters']
+    False
+    """
+    if ENABLED:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def count_file_read(filename: str, rows: int) -> None:
+    """Count one opening of filename, and rows more rows parsed from it.
+
+    >>> enable()
+    >>> count_file_read('datasets/test_data.csv', 10)
+    >>> count_file_read('datasets/test_data.csv', 5)
+    >>> get_report()['counters']
+    {'files.opens[datasets/test_data.csv]': 2, 'files.rows_parsed[datasets/test_data.csv]': 15}
+    >>> disable()
+    >>> reset()
+    """
+    if ENABLED:
+        count('files.opens[' + filename + ']')
+        count('files.rows_parsed[' + filename + ']', rows)
+
+
+def observe(name: str, value: float) -> None:
+    """Record one observation of the value called name, if the instrumentation is enabled.
+
+    >>> enable()
+    >>> for value in [3, 1, 2]:
+    ...     observe('example.visited', value)
+    >>> get_report()['values']['example.visited']
+    {'count': 3, 'total': 6, 'min': 1, 'max': 3, 'mean': 2.0}
+    >>> disable()
+    >>> reset()
+    """
+    if ENABLED:
+        if name in _values:
+            record = _values[name]
+            record[0] += 1
+            record[1] += value
+            record[2] = min(record[2], value)
+            record[3] = max(record[3], value)
+        else:
+            _values[name] = [1, value, value, value]
+
+
+def add_time(name: str, seconds: float) -> None:
+    """Record one call taking the given number of seconds to the timer called name."""
+    if name in _timers:
+        record = _timers[name]
+        record[0] += 1
+        record[1] += seconds
+        record[2] = max(record[2], seconds)
+    else:
+        _timers[name] = [1, seconds, seconds]
+
+
+def timed(func: Callable) -> Callable:
+    """Return func wrapped so that, when the instrumentation is enabled, every call is timed
+    by the timer named after the module and the qualified name of func. Used as a decorator.
+
+    >>> @timed
+    ... def double(n: int) -> int:
+    ...     return 2 * n
+    >>> enable()
+    >>> double(2)
+    4
+    >>> get_report()['timers']['instrumentation.double']['calls']
+    1
+    >>> disable()
+    >>> reset()
+    """
+    name = func.__module__ + '.' + func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not ENABLED:
+            return func(*args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            add_time(name, time.perf_counter() - start)
+
+    return wrapper
+
+
+def get_report() -> dict[str, dict]:
+    """Return every measurement recorded so far, in the form of
+    {'counters': {name: count}, 'timers': {name: {'calls', 'total_ms', 'mean_ms', 'max_ms'}},
+     'values': {name: {'count', 'total', 'min', 'max', 'mean'}}}, sorted by name.
+    """
+    return {'counters': {name: _counters[name] for name in sorted(_counters)},
+            'timers': {name: {'calls': record[0],
+                              'total_ms': round(record[1] * 1000, 3),
+                              'mean_ms': round(record[1] * 1000 / record[0], 3),
+                              'max_ms': round(record[2] * 1000, 3)}
+                       for name, record in sorted(_timers.items())},
+            'values': {name: {'count': record[0], 'total': record[1], 'min': record[2],
+                              'max': record[3], 'mean': round(record[1] / record[0], 3)}
+                       for name, record in sorted(_values.items())}}
+
+
+def format_report(report: dict[str, dict]) -> str:
+    """Return a text summary of a report returned by get_report, with the timers sorted from
+    the longest total time.
+
+    >>> print(format_report({'counters': {'classes.vertices_created': 7},
+    ...                      'timers': {'init_graph.get_test_graph': {
+    ...                          'calls': 1, 'total_ms': 3.5, 'mean_ms': 3.5, 'max_ms': 3.5}},
+    ...                      'values': {}}))
+    Timers                                                              calls   total ms    mean ms
+      init_graph.get_test_graph                                             1      3.500      3.500
+    Counters
+      classes.vertices_created                                              7
+    """
+    lines = []
+
+    if report['timers'] != {}:
+        lines.append('Timers'.ljust(66) + 'calls'.rjust(7) + 'total ms'.rjust(11)
+                     + 'mean ms'.rjust(11))
+        for name, timer in sorted(report['timers'].items(), key=lambda item: -item[1]['total_ms']):
+            lines.append('  ' + name.ljust(64) + str(timer['calls']).rjust(7)
+                         + format(timer['total_ms'], '11.3f') + format(timer['mean_ms'], '11.3f'))
+
+    if report['counters'] != {}:
+        lines.append('Counters')
+        for name, number in report['counters'].items():
+            lines.append('  ' + name.ljust(64) + str(number).rjust(7))
+
+    if report['values'] != {}:
+        lines.append('Values'.ljust(66) + 'count'.rjust(7) + 'mean'.rjust(11) + 'min'.rjust(8)
+                     + 'max'.rjust(8))
+        for name, value in report['values'].items():
+            lines.append('  ' + name.ljust(64) + str(value['count']).rjust(7)
+                         + format(value['mean'], '11.3f') + str(value['min']).rjust(8)
+                         + str(value['max']).rjust(8))
+
+    return '\n'.join(lines)
+
+
+def write_report(filename: str) -> None:
+    """Write every measurement recorded so far to a json file, in the form returned by
+    get_report."""
+    with open(filename, 'w') as file:
+        json.dump(get_report(), file, indent=1)
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136', 'W0603'],
+        'extra-imports': ['functools', 'json', 'time'],
+        'allowed-io': ['write_report']
+    })
@@ -0,0 +1,144 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains a load generator for the projection service in
+query_service.py. It sends many concurrent queries for random sets of policies and
+reports the median (p50) and 99th percentile (p99) latency and the throughput.
+
+Start the service first (python query_service.py), then run this module, e.g.
+    python load_generator.py --requests 2000 --concurrency 50 --scenarios 100
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import urllib.parse
+from typing import Any, Optional
+
+import numpy as np
+
+from computations import ALL_POLICIES, get_upper_limit
+
+
+def get_random_queries(num_scenarios: int, horizon: int = 365,
+                       seed: Optional[int] = None) -> list[str]:
+    """Return the paths of num_scenarios queries to /project, each for a random subset of
+    ALL_POLICIES with random levels.
+
+    >>> queries = get_random_queries(2, 30, 0)
+    >>> len(queries), all(path.startswith('/project?') for path in queries)
+    (2, True)
+    >>> 'horizon=30' in queries[0]
+    True
+    """
+    rng = random.Random(seed)
+    queries = []
+
+    for _ in range(num_scenarios):
+        policies = rng.sample(ALL_POLICIES, rng.randint(1, len(ALL_POLICIES)))
+        query = {policy: rng.randrange(get_upper_limit(policy)) for policy in sorted(policies)}
+        query['horizon'] = horizon
+        queries.append('/project?' + urllib.parse.urlencode(query))
+
+    return queries
+
+
+async def send_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                       host: str, path: str) -> tuple[int, bytes]:
+    """Send a GET request for path on an open connection and return the status code and
+    the body of the response."""
+    writer.write(('GET ' + path + ' HTTP/1.1\r\nHost: ' + host + '\r\n\r\n').encode())
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    line = await reader.readline()
+    while line not in [b'\r\n', b'\n', b'']:
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+        line = await reader.readline()
+
+    return (status, await reader.readexactly(length))
+
+
+async def run_load(host: str, port: int, queries: list[str], num_requests: int,
+                   concurrency: int, seed: Optional[int] = None) -> dict[str, Any]:
+    """Send num_requests queries, each chosen randomly from queries, from concurrency clients
+    that each keep one connection open, and return a summary of the run: the number of
+    requests and errors, the seconds taken, the throughput in requests per second, the p50
+    and p99 latency in milliseconds, and the /stats of the service afterwards.
+
+    Preconditions:
+        - queries != []
+        - num_requests >= 1
+        - concurrency >= 1
+    """
+    rng = random.Random(seed)
+    paths = [rng.choice(queries) for _ in range(num_requests)]
+    latencies = []
+    errors = 0
+
+    async def client() -> None:
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        while paths != []:
+            path = paths.pop()
+            start = time.perf_counter()
+            status, _ = await send_request(reader, writer, host, path)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors += 1
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    seconds = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, stats = await send_request(reader, writer, host, '/stats')
+    writer.close()
+
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+
+    return {'requests': num_requests,
+            'errors': errors,
+            'seconds': round(seconds, 3),
+            'throughput': round(num_requests / seconds, 1),
+            'p50_ms': round(float(p50), 2),
+            'p99_ms': round(float(p99), 2),
+            'service': json.loads(stats)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the projection service.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8060)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--scenarios', type=int, default=100,
+                        help='the number of distinct sets of policies to choose from')
+    parser.add_argument('--horizon', type=int, default=365)
+    parser.add_argument('--seed', type=int, default=None)
+    arguments = parser.parse_args()
+
+    summary = asyncio.run(run_load(arguments.host, arguments.port,
+                                   get_random_queries(arguments.scenarios, arguments.horizon,
+                                                      arguments.seed),
+                                   arguments.requests, arguments.concurrency, arguments.seed))
+
+    for key in summary:
+        print(key + ': ' + str(summary[key]))
@@ -23,7 +23,7 @@ This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
 import pickle
 
 from init_graph import get_test_graph
-from plot_networks import visualise
+from plot_networks import visualise_all
 from simulations import plot_simulation
 
 
@@ -48,15 +48,14 @@ if __name__ == '__main__':
 
     real_graph = pickle.load(infile)
 
-    # Visualise networks - feel free to uncomment any of the function call below if you
+    # Visualise networks - feel free to take out any policy from the list below if you
     # do not wish to view the network graph for certain policy.
-    visualise('public-events-cancellation', real_graph)
-    visualise('face-covering-policies', real_graph)
-    visualise('public-campaigns-covid', real_graph)
-    visualise('school-workplace-closures', real_graph)
-    visualise('stay-at-home', real_graph)
-    visualise('testing-policy', real_graph)
-    visualise('vaccination-policy', real_graph)
+    # The figures are drawn in parallel and cached in the cache/ folder, so later runs do not
+    # draw them again.
+    visualise_all(real_graph, ['public-events-cancellation', 'face-covering-policies',
+                               'public-campaigns-covid', 'school-workplace-closures',
+                               'stay-at-home', 'testing-policy', 'vaccination-policy'],
+                  cache_dir='cache')
 
     # Visualise simulation graph - feel free to change the function argument below
     # 1) You can take out any policies from the dict
@@ -73,15 +72,11 @@ if __name__ == '__main__':
     # Test graph - run this part for shorter run time to generate the complete graph
     # test_graph = get_test_graph()
 
-    # Visualise networks - feel free to uncomment any of the function call below if you
+    # Visualise networks - feel free to take out any policy from the list below if you
     # do not wish to view the network graph for certain policy.
-    # visualise('public-events-cancellation', test_graph)
-    # visualise('face-covering-policies', test_graph)
-    # visualise('public-campaigns-covid', test_graph)
-    # visualise('school-workplace-closures', test_graph)
-    # visualise('stay-at-home', test_graph)
-    # visualise('testing-policy', test_graph)
-    # visualise('vaccination-policy', test_graph)
+    # visualise_all(test_graph, ['public-events-cancellation', 'face-covering-policies',
+    #                            'public-campaigns-covid', 'school-workplace-closures',
+    #                            'stay-at-home', 'testing-policy', 'vaccination-policy'])
 
     # Visualise simulation graph - feel free to change the function argument below
     # 1) You can take out any policies from the dict
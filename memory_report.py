@@ -0,0 +1,490 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains the memory report of the project. For each backend that the
+graph can be loaded with (see BACKENDS), it reports:
+    - the memory allocated by each stage of loading the graph, from tracemalloc snapshots
+      taken around the stage,
+    - the bytes per vertex, the bytes per edge and the bytes of the time series of new
+      cases and deaths,
+    - the interpreter overhead, i.e. the bytes allocated beyond the raw data (8 bytes per
+      number of the time series, 16 bytes per edge for its two ends and weight, and so on),
+    - the projected memory of a graph with more countries, at the same edge density.
+It reports the memory of the prediction DataFrame at several horizons as well, and the memory
+of the levels of the policies over time, as the daily rows of the csv files and as
+run-length-encoded timelines (refer to timelines.py).
+
+Run python memory_report.py or python cli.py memory with the options of the report, e.g.
+    python memory_report.py --dataset test --horizons 365 3650 36500 --output memory.json
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import argparse
+import csv
+import json
+import pickle
+import sys
+import tracemalloc
+from typing import Any, Callable
+
+import pandas as pd
+
+import init_graph
+from classes import WeightedGraph
+from computations import ALL_POLICIES
+from predictions import prediction_columns
+from shared_graph import SharedGraph, attach_graph, freeze_graph
+from timelines import get_policy_timelines
+
+# The default horizons of the prediction DataFrames, in days
+HORIZONS = [365, 3650, 36500, 365000]
+
+# The default numbers of countries that the memory of the graph is projected to
+PROJECTED_SIZES = [1000, 10000]
+
+# The bytes of the raw data: a number of a time series, an edge (the indices of its two ends
+# and its weight), and a vertex besides its name (its population and a byte per policy level)
+RAW_VALUE_BYTES = 8
+RAW_EDGE_BYTES = 16
+RAW_VERTEX_BYTES = 8 + len(ALL_POLICIES)
+
+
+def measure_stage(name: str, func: Callable[[], Any]) -> tuple[Any, dict[str, Any]]:
+    """Return the result of func() and the memory of the stage called name, i.e. the bytes
+    still allocated after func() returns (those of its result, and of anything else it keeps)
+    and the peak bytes allocated while it runs, as traced by tracemalloc. The lines that
+    allocated the most of the bytes kept are listed as well, from tracemalloc snapshots taken
+    before and after func() is called.
+
+    >>> result, stage = measure_stage('list', lambda: [0] * 100000)
+    >>> len(result), stage['stage'], stage['allocated_bytes'] >= 800000
+    (100000, 'list', True)
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    start_bytes = tracemalloc.get_traced_memory()[0]
+
+    result = func()
+
+    end_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    differences = tracemalloc.take_snapshot().compare_to(before, 'lineno')
+
+    if not was_tracing:
+        tracemalloc.stop()
+
+    top = [str(difference.traceback[0]) + ': ' + str(difference.size_diff)
+           for difference in differences[:3] if difference.size_diff > 0]
+
+    return (result, {'stage': name,
+                     'allocated_bytes': end_bytes - start_bytes,
+                     'peak_bytes': peak_bytes - start_bytes,
+                     'top_lines': top})
+
+
+def load_objects_graph(dataset: str) -> tuple[WeightedGraph, list[dict[str, Any]]]:
+    """Return the WeightedGraph of the dataset, loaded the same way as the rest of the
+    program, and the memory of each stage of loading it (refer to measure_stage).
+
+    The real graph is unpickled from datasets/saved_graph, and its level index (refer to
+    WeightedGraph.get_countries_at_level) is built afterwards. The test graph is built from
+    its csv files. The time series parsed from the csv file are measured on their own too.
+
+    Preconditions:
+        - dataset in ['real', 'test']
+    """
+    filename = 'datasets/main_data.csv' if dataset == 'real' else 'datasets/test_data.csv'
+    _, parse = measure_stage('get_main_data (cases and deaths)',
+                             lambda: (init_graph.get_main_data(filename, 'new_cases'),
+                                      init_graph.get_main_data(filename, 'new_deaths')))
+
+    if dataset == 'real':
+        def unpickle() -> WeightedGraph:
+            with open('datasets/saved_graph', 'rb') as file:
+                return pickle.load(file)
+
+        graph, load = measure_stage('unpickle saved_graph', unpickle)
+    else:
+        graph, load = measure_stage('get_test_graph', init_graph.get_test_graph)
+
+    _, index = measure_stage('level index',
+                             lambda: graph.get_countries_at_level(ALL_POLICIES[0], 0))
+
+    return (graph, [parse, load, index])
+
+
+def get_objects_breakdown(graph: WeightedGraph) -> dict[str, int]:
+    """Return the number of vertices, edges, numbers in the time series and bytes of the names
+    of the countries of graph, and the bytes of its Python objects in each part of the graph:
+        - 'vertex_bytes': the vertex objects, their attributes other than the time series and
+          edges, and their restriction levels,
+        - 'edge_bytes': the dicts of neighbours and the weights of the edges,
+        - 'time_series_bytes': the lists of new cases and deaths and the numbers in them,
+        - 'graph_bytes': the graph object, its dict of vertices and its level index.
+    An object shared between parts (such as a weight, which both ends of an edge refer to) is
+    only counted once.
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [1.0, 2.0], [0.0, 0.0], 100)
+    >>> g.add_vertex('c2', [1.0, 2.0], [0.0, 0.0], 100)
+    >>> g.add_vertex_restrictions('c1', 'stay-at-home', 1)
+    >>> g.add_vertex_restrictions('c2', 'stay-at-home', 1)
+    >>> g.find_and_add_edge('c1')
+    >>> breakdown = get_objects_breakdown(g)
+    >>> breakdown['vertices'], breakdown['edges'], breakdown['values']
+    (2, 1, 8)
+    """
+    seen = set()
+
+    def size(obj: Any) -> int:
+        """Return the size of obj, or 0 if it was counted before."""
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        return sys.getsizeof(obj)
+
+    breakdown = {'vertices': 0, 'edges': 0, 'values': 0, 'name_bytes': 0, 'vertex_bytes': 0,
+                 'edge_bytes': 0, 'time_series_bytes': 0,
+                 'graph_bytes': size(graph) + size(graph.__dict__)}
+
+    vertices = graph.get_all_vertices()
+    breakdown['graph_bytes'] += size(vertices)
+
+    for key, countries in graph._get_level_index().items():
+        breakdown['graph_bytes'] += size(key) + size(countries)
+
+    for vertex in vertices.values():
+        breakdown['vertices'] += 1
+        breakdown['name_bytes'] += len(vertex.country_name.encode())
+        breakdown['vertex_bytes'] += size(vertex) + size(vertex.__dict__) \
+            + size(vertex.country_name) + size(vertex.population) \
+            + size(vertex.restrictions_level) \
+            + sum(size(level) for level in vertex.restrictions_level.values())
+
+        breakdown['edges'] += len(vertex.similar_policies)
+        breakdown['edge_bytes'] += size(vertex.similar_policies) \
+            + sum(size(weight) for weight in vertex.similar_policies.values())
+
+        for series in [vertex.new_cases, vertex.new_deaths]:
+            breakdown['values'] += len(series)
+            breakdown['time_series_bytes'] += size(series) + sum(size(value) for value in series)
+
+    breakdown['edges'] //= 2
+
+    return breakdown
+
+
+def load_shared_graph(dataset: str) -> tuple[SharedGraph, list[dict[str, Any]]]:
+    """Return a snapshot in shared memory of the WeightedGraph of the dataset (refer to
+    shared_graph.freeze_graph), and the memory of freezing the graph and of attaching to the
+    snapshot from another process (refer to measure_stage).
+
+    tracemalloc does not trace the shared memory itself, so these stages only show the Python
+    objects of the snapshot, such as the names of the countries that every process decodes.
+    The shared memory is unlinked before returning, and freed when the snapshot is no longer
+    used.
+
+    Preconditions:
+        - dataset in ['real', 'test']
+
+    >>> shared, stages = load_shared_graph('test')
+    >>> len(shared.countries), [stage['stage'] for stage in stages]
+    (7, ['freeze_graph', 'attach_graph'])
+    """
+    graph, _ = load_objects_graph(dataset)
+    shared, freeze = measure_stage('freeze_graph', lambda: freeze_graph(graph))
+    attached, attach = measure_stage('attach_graph', lambda: attach_graph(shared.name))
+
+    attached.close()
+    shared.unlink()
+
+    return (shared, [freeze, attach])
+
+
+def get_shared_breakdown(shared: SharedGraph) -> dict[str, int]:
+    """Return the same breakdown as get_objects_breakdown for a snapshot in shared memory,
+    where each part holds the bytes of its arrays:
+        - 'vertex_bytes': the populations, policy levels, average rates and names,
+        - 'edge_bytes': the CSR offsets, neighbours and weights of the edges,
+        - 'time_series_bytes': the new cases and deaths and their offsets,
+        - 'graph_bytes': the header and padding of the block, and the names of the countries
+          and their index that every process attached to the snapshot keeps.
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [1.0, 2.0], [0.0, 0.0], 100)
+    >>> g.add_vertex('c2', [1.0, 2.0], [0.0, 0.0], 100)
+    >>> g.add_vertex_restrictions('c1', 'stay-at-home', 1)
+    >>> g.add_vertex_restrictions('c2', 'stay-at-home', 1)
+    >>> g.find_and_add_edge('c1')
+    >>> shared = freeze_graph(g)
+    >>> shared.unlink()
+    >>> breakdown = get_shared_breakdown(shared)
+    >>> breakdown['vertices'], breakdown['edges'], breakdown['values'], breakdown['edge_bytes']
+    (2, 1, 8, 48)
+    """
+    vertex_arrays = [shared.populations, shared.levels, shared.case_rates, shared.death_rates]
+    edge_arrays = [shared.indptr, shared.indices, shared.weights]
+    series_arrays = [shared.case_offsets, shared.new_cases, shared.death_offsets,
+                     shared.new_deaths]
+
+    name_bytes = sum(len(country.encode()) for country in shared.countries)
+    breakdown = {'vertices': len(shared.countries),
+                 'edges': len(shared.indices) // 2,
+                 'values': len(shared.new_cases) + len(shared.new_deaths),
+                 'name_bytes': name_bytes,
+                 # The names are stored once, and their offsets once more per vertex
+                 'vertex_bytes': sum(array.nbytes for array in vertex_arrays) + name_bytes
+                 + 8 * (len(shared.countries) + 1),
+                 'edge_bytes': sum(array.nbytes for array in edge_arrays),
+                 'time_series_bytes': sum(array.nbytes for array in series_arrays)}
+
+    padding = shared.get_nbytes() - breakdown['vertex_bytes'] - breakdown['edge_bytes'] \
+        - breakdown['time_series_bytes']
+    breakdown['graph_bytes'] = padding + sys.getsizeof(shared.countries) \
+        + sum(sys.getsizeof(country) for country in shared.countries) \
+        + sys.getsizeof(shared._index)
+
+    return breakdown
+
+
+# Maps the name of each backend to the function loading the graph of a dataset with it and
+# the function returning the breakdown of the graph (refer to get_objects_breakdown)
+BACKENDS = {'objects': (load_objects_graph, get_objects_breakdown),
+            'shared-arrays': (load_shared_graph, get_shared_breakdown)}
+
+
+def get_graph_report(backend: str, dataset: str, sizes: list[int]) -> dict[str, Any]:
+    """Return the memory report of the graph of the dataset loaded with the backend: the
+    memory of each stage of loading it, its breakdown, the bytes per vertex, edge and number of
+    the time series, the interpreter overhead, and the projected bytes of a graph with each
+    number of countries in sizes.
+
+    The overhead is the bytes of the loaded graph beyond its raw data (refer to
+    RAW_VALUE_BYTES). The projection assumes the same edge density and the same length of the
+    time series, so the edges grow with the square of the number of countries.
+
+    Preconditions:
+        - backend in BACKENDS
+        - dataset in ['real', 'test']
+    """
+    load, get_breakdown = BACKENDS[backend]
+    graph, stages = load(dataset)
+    breakdown = get_breakdown(graph)
+
+    num_vertices, num_edges, num_values = (breakdown['vertices'], breakdown['edges'],
+                                           breakdown['values'])
+    total = breakdown['vertex_bytes'] + breakdown['edge_bytes'] \
+        + breakdown['time_series_bytes'] + breakdown['graph_bytes']
+    raw = num_values * RAW_VALUE_BYTES + num_edges * RAW_EDGE_BYTES \
+        + num_vertices * RAW_VERTEX_BYTES + breakdown['name_bytes']
+
+    per_vertex = (breakdown['vertex_bytes'] + breakdown['graph_bytes']) / num_vertices
+    per_edge = breakdown['edge_bytes'] / max(num_edges, 1)
+    per_value = breakdown['time_series_bytes'] / max(num_values, 1)
+    density = num_edges / max(num_vertices * (num_vertices - 1) / 2, 1)
+
+    projections = {}
+    for size in sizes:
+        projections[str(size)] = round(size * per_vertex
+                                       + size * (size - 1) / 2 * density * per_edge
+                                       + size * num_values / num_vertices * per_value)
+
+    return {'backend': backend,
+            'dataset': dataset,
+            'stages': stages,
+            'breakdown': breakdown,
+            'total_bytes': total,
+            'raw_bytes': raw,
+            'overhead_bytes': total - raw,
+            'overhead_ratio': round(total / raw, 2),
+            'bytes_per_vertex': round(per_vertex, 1),
+            'bytes_per_edge': round(per_edge, 1),
+            'bytes_per_value': round(per_value, 1),
+            'edge_density': round(density, 4),
+            'projected_bytes': projections}
+
+
+def get_prediction_report(horizons: list[int]) -> list[dict[str, Any]]:
+    """Return the memory of the prediction DataFrame (refer to simulations.create_predictions)
+    for each horizon: the bytes allocated by its columns and by the DataFrame, its size
+    reported by pandas, and the bytes per row. The daily counts are small enough that the
+    simulation lasts the whole horizon.
+
+    Preconditions:
+        - all(horizon >= 1 for horizon in horizons)
+
+    >>> [report['rows'] for report in get_prediction_report([10, 100])]
+    [10, 100]
+    """
+    reports = []
+
+    for horizon in horizons:
+        columns, column_stage = measure_stage('prediction_columns',
+                                              lambda: prediction_columns(1000, 10, horizon))
+        dataframe, dataframe_stage = measure_stage(
+            'DataFrame', lambda: pd.DataFrame(columns, columns=['Day', 'Total_Cases',
+                                                                'Total_Deaths']))
+        pandas_bytes = int(dataframe.memory_usage(deep=True).sum())
+
+        reports.append({'horizon': horizon,
+                        'rows': len(dataframe),
+                        'stages': [column_stage, dataframe_stage],
+                        'pandas_bytes': pandas_bytes,
+                        'bytes_per_row': round(pandas_bytes / len(dataframe), 1)})
+
+    return reports
+
+
+def get_timeline_report(dataset: str) -> dict[str, Any]:
+    """Return the memory of the levels of every policy of the dataset over time, kept as the
+    rows of the csv files of the policies (one for every country on every day) and as the
+    run-length-encoded timelines of timelines.get_policy_timelines.
+
+    Preconditions:
+        - dataset in ['real', 'test']
+
+    >>> report = get_timeline_report('test')
+    >>> report['daily_rows'], report['changes']
+    (98, 98)
+    """
+    prefix = '' if dataset == 'real' else 'test-'
+
+    def read_rows() -> list[list[str]]:
+        rows = []
+        for policy in ALL_POLICIES:
+            with open('datasets/' + prefix + policy + '.csv') as file:
+                reader = csv.reader(file)
+                next(reader)
+                rows.extend(reader)
+        return rows
+
+    rows, rows_stage = measure_stage('daily rows', read_rows)
+    timelines, timelines_stage = measure_stage(
+        'run-length-encoded timelines', lambda: get_policy_timelines('datasets', prefix))
+
+    return {'stages': [rows_stage, timelines_stage],
+            'daily_rows': len(rows),
+            'changes': timelines.get_num_changes(),
+            'array_bytes': timelines.get_nbytes()}
+
+
+def get_memory_report(dataset: str, backends: list[str], horizons: list[int],
+                      sizes: list[int]) -> dict[str, Any]:
+    """Return the memory report of the graph of the dataset for each backend (refer to
+    get_graph_report), of the prediction DataFrame at each horizon and of the timelines of the
+    policies of the dataset (refer to get_timeline_report).
+
+    Preconditions:
+        - dataset in ['real', 'test']
+        - all(backend in BACKENDS for backend in backends)
+    """
+    return {'python': sys.version.split()[0],
+            'graphs': [get_graph_report(backend, dataset, sizes) for backend in backends],
+            'predictions': get_prediction_report(horizons),
+            'timelines': get_timeline_report(dataset)}
+
+
+def format_bytes(num_bytes: float) -> str:
+    """Return num_bytes in a readable unit.
+
+    >>> format_bytes(512), format_bytes(2048), format_bytes(3 * 1024 ** 3)
+    ('512 B', '2.0 KiB', '3.0 GiB')
+    """
+    for unit in ['B', 'KiB', 'MiB']:
+        if abs(num_bytes) < 1024:
+            return (str(int(num_bytes)) if unit == 'B' else format(num_bytes, '.1f')) + ' ' + unit
+        num_bytes /= 1024
+
+    return format(num_bytes, '.1f') + ' GiB'
+
+
+def format_memory_report(report: dict[str, Any]) -> str:
+    """Return a text summary of a report returned by get_memory_report."""
+    lines = []
+
+    for graph in report['graphs']:
+        breakdown = graph['breakdown']
+        lines.append('Backend ' + graph['backend'] + ' on the ' + graph['dataset'] + ' dataset: '
+                     + str(breakdown['vertices']) + ' vertices, ' + str(breakdown['edges'])
+                     + ' edges, ' + str(breakdown['values']) + ' numbers in the time series')
+        for stage in graph['stages']:
+            lines.append('  ' + stage['stage'].ljust(36) + 'kept '
+                         + format_bytes(stage['allocated_bytes']).rjust(11) + '   peak '
+                         + format_bytes(stage['peak_bytes']).rjust(11))
+        for part in ['vertex_bytes', 'edge_bytes', 'time_series_bytes', 'graph_bytes']:
+            lines.append('  ' + part.ljust(36) + format_bytes(breakdown[part]).rjust(16))
+        lines.append('  ' + 'bytes per vertex / edge / number'.ljust(36)
+                     + (str(graph['bytes_per_vertex']) + ' / ' + str(graph['bytes_per_edge'])
+                        + ' / ' + str(graph['bytes_per_value'])).rjust(16))
+        lines.append('  ' + 'total / raw data'.ljust(36)
+                     + (format_bytes(graph['total_bytes']) + ' / '
+                        + format_bytes(graph['raw_bytes'])).rjust(22))
+        lines.append('  ' + 'interpreter overhead'.ljust(36)
+                     + (format_bytes(graph['overhead_bytes']) + ' ('
+                        + str(graph['overhead_ratio']) + 'x the raw data)').rjust(30))
+        for size, num_bytes in graph['projected_bytes'].items():
+            lines.append('  ' + ('projected for ' + size + ' countries').ljust(36)
+                         + format_bytes(num_bytes).rjust(16))
+
+    lines.append('Prediction DataFrame')
+    for prediction in report['predictions']:
+        lines.append('  ' + ('horizon ' + str(prediction['horizon'])).ljust(36)
+                     + format_bytes(prediction['pandas_bytes']).rjust(16) + '   '
+                     + str(prediction['bytes_per_row']) + ' bytes per row')
+
+    timelines = report['timelines']
+    lines.append('Policy levels over time: ' + str(timelines['daily_rows']) + ' daily rows, '
+                 + str(timelines['changes']) + ' changes of level')
+    for stage in timelines['stages']:
+        lines.append('  ' + stage['stage'].ljust(36) + 'kept '
+                     + format_bytes(stage['allocated_bytes']).rjust(11) + '   peak '
+                     + format_bytes(stage['peak_bytes']).rjust(11))
+    lines.append('  ' + 'arrays of the changes'.ljust(36)
+                 + format_bytes(timelines['array_bytes']).rjust(16))
+
+    return '\n'.join(lines)
+
+
+def add_report_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options of the memory report to parser (shared with cli.py memory)."""
+    parser.add_argument('--dataset', choices=['real', 'test'], default='real',
+                        help='the dataset to load the graph of')
+    parser.add_argument('--backends', nargs='*', choices=list(BACKENDS), default=list(BACKENDS),
+                        help='the backends to load the graph with (default: all)')
+    parser.add_argument('--horizons', type=int, nargs='*', default=HORIZONS,
+                        help='the horizons of the prediction DataFrames, in days')
+    parser.add_argument('--sizes', type=int, nargs='*', default=PROJECTED_SIZES,
+                        help='the numbers of countries to project the memory of the graph to')
+    parser.add_argument('--output', default=None, help='write the report to this json file')
+
+
+def report_from_arguments(arguments: argparse.Namespace) -> None:
+    """Print the memory report with the options added by add_report_arguments, and write it
+    to a json file if asked."""
+    report = get_memory_report(arguments.dataset, arguments.backends, arguments.horizons,
+                               arguments.sizes)
+    print(format_memory_report(report))
+
+    if arguments.output is not None:
+        with open(arguments.output, 'w') as file:
+            json.dump(report, file, indent=1)
+
+
+if __name__ == '__main__':
+    main_parser = argparse.ArgumentParser(description='Report the memory of the graph and '
+                                                      'the prediction DataFrame.')
+    add_report_arguments(main_parser)
+    report_from_arguments(main_parser.parse_args())
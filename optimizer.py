@@ -0,0 +1,217 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains functions that search every combination of the
+levels of the seven policies for the combinations with the fewest projected
+deaths (or cases) after a year.
+
+Instead of running the random traversals of get_total_average_deaths_growth for
+every combination, the expected rate of every (policy, level) is computed once.
+When no country has exactly the combination, its rate is the average of the
+rates of its policies, so the combinations can be enumerated in increasing order
+of that average without evaluating the rest of the search space.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import heapq
+from typing import Optional, Union
+
+import numpy as np
+
+from classes import WeightedGraph
+from computations import ALL_POLICIES, get_average, get_upper_limit
+from ensemble import get_rate_tables
+from predictions import WORLD_POPULATION, batch_prediction_columns
+
+
+def get_level_rates(graph: WeightedGraph, processes: Optional[int] = None,
+                    levels: Optional[list[tuple[str, int]]] = None) \
+        -> dict[tuple[str, str, int], float]:
+    """Return a mapping of (category, policy, level) to the expected daily new cases or
+    deaths rate of get_final_case_average and get_final_deaths_average, for every
+    (policy, level) in levels, or every level of every policy in ALL_POLICIES if levels is None.
+
+    The expected rate is the average of the rates of every possible start vertex, which are
+    computed across the given number of worker processes by ensemble.get_rate_tables.
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [0.1], [0.2], 10000)
+    >>> for policy in ALL_POLICIES:
+    ...     g.add_vertex_restrictions('c1', policy, 0)
+    >>> rates = get_level_rates(g, 1)
+    >>> rates[('deaths', 'stay-at-home', 0)] == rates[('deaths', 'stay-at-home', 3)]
+    True
+    >>> rates[('deaths', 'stay-at-home', 0)] == 0.2 / 10000
+    True
+    """
+    if levels is None:
+        levels = [(policy, level) for policy in ALL_POLICIES
+                  for level in range(get_upper_limit(policy))]
+
+    tables = get_rate_tables(graph, levels, processes)
+
+    return {key: float(tables[key].mean()) for key in tables}
+
+
+def get_exact_combinations(graph: WeightedGraph) -> dict[tuple[int, ...], list[str]]:
+    """Return a mapping of every combination of levels (in the order of ALL_POLICIES) that
+    some country has exactly, to the list of those countries. Countries with a policy that
+    has no data are left out.
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [0.1], [0.2], 10000)
+    >>> for policy in ALL_POLICIES:
+    ...     g.add_vertex_restrictions('c1', policy, 1)
+    >>> get_exact_combinations(g)
+    {(1, 1, 1, 1, 1, 1, 1): ['c1']}
+    """
+    vertices = graph.get_all_vertices()
+    combinations = {}
+
+    for country in vertices:
+        levels = tuple(vertices[country].restrictions_level[policy] for policy in ALL_POLICIES)
+        if all(isinstance(level, int) for level in levels):
+            combinations.setdefault(levels, []).append(country)
+
+    return combinations
+
+
+def find_best_policies(graph: WeightedGraph, num_results: int = 10, objective: str = 'deaths',
+                       level_rates: Optional[dict[tuple[str, str, int], float]] = None,
+                       processes: Optional[int] = None) -> list[dict[str, Union[dict, int]]]:
+    """Return the num_results combinations of the levels of every policy in ALL_POLICIES
+    with the fewest projected deaths (or cases, specified by the objective argument) after
+    365 days, ranked from the fewest. Each combination is returned as a dict of the form of
+    {'policies': {policy: level}, 'cases': projected cases, 'deaths': projected deaths}.
+
+    A combination that some country has exactly is scored by the exact average of those
+    countries, like get_total_average_deaths_growth. Every other combination is scored by the
+    average of the expected rates of its policy levels (refer to get_level_rates), so the
+    random traversals are replaced by their expected value. If level_rates is given, it is
+    used instead of computing the rates again.
+
+    The combinations that no country has are enumerated from the lowest average rate with a
+    priority queue, stopping as soon as num_results of them are found.
+
+    Preconditions:
+        - num_results > 0
+        - objective in ['cases', 'deaths']
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [0.1], [0.2], 10000)
+    >>> g.add_vertex('c2', [0.3], [0.1], 10000)
+    >>> for policy in ALL_POLICIES:
+    ...     g.add_vertex_restrictions('c1', policy, 0)
+    ...     g.add_vertex_restrictions('c2', policy, 1)
+    >>> g.find_and_add_edge('c1')
+    >>> best = find_best_policies(g, 2, 'deaths', processes=1)
+    >>> best[0]['policies']['stay-at-home'], best[0]['deaths']
+    (1, 27066000)
+    >>> len(best)
+    2
+    """
+    if level_rates is None:
+        level_rates = get_level_rates(graph, processes)
+
+    vertices = graph.get_all_vertices()
+    scored = []
+
+    for levels, countries in get_exact_combinations(graph).items():
+        rates = {}
+        for category, data in [('cases', 'new_cases'), ('deaths', 'new_deaths')]:
+            rates[category] = get_average([get_average(getattr(vertices[country], data))
+                                           / vertices[country].population
+                                           for country in countries])
+        scored.append((rates[objective], levels, rates['cases'], rates['deaths']))
+
+    exact = {levels for _, levels, _, _ in scored}
+    for levels in _enumerate_by_average_rate(level_rates, objective, exact, num_results):
+        rates = {category: get_average([level_rates[(category, policy, level)]
+                                        for policy, level in zip(ALL_POLICIES, levels)])
+                 for category in ['cases', 'deaths']}
+        scored.append((rates[objective], levels, rates['cases'], rates['deaths']))
+
+    scored.sort()
+    best = scored[:num_results]
+
+    daily_cases = np.rint(WORLD_POPULATION * np.array([item[2] for item in best]))
+    daily_deaths = np.rint(WORLD_POPULATION * np.array([item[3] for item in best]))
+    columns = batch_prediction_columns(daily_cases.astype(np.int64),
+                                       daily_deaths.astype(np.int64), 365)
+
+    return [{'policies': dict(zip(ALL_POLICIES, item[1])),
+             'cases': int(columns['Total_Cases'][-1, i]),
+             'deaths': int(columns['Total_Deaths'][-1, i])} for i, item in enumerate(best)]
+
+
+def _enumerate_by_average_rate(level_rates: dict[tuple[str, str, int], float], category: str,
+                               skipped: set[tuple[int, ...]], num_results: int) \
+        -> list[tuple[int, ...]]:
+    """Return the num_results combinations of levels (in the order of ALL_POLICIES) with the
+    lowest average rate of the given category, leaving out every combination in skipped.
+
+    The levels of each policy are sorted by rate, and the combinations are popped from a
+    priority queue keyed by their total rate. A popped combination only pushes the
+    combinations that move one policy to its next level, which can never have a lower total.
+
+    >>> rates = {('deaths', policy, level): level * (1 + i / 10)
+    ...          for i, policy in enumerate(ALL_POLICIES)
+    ...          for level in range(get_upper_limit(policy))}
+    >>> _enumerate_by_average_rate(rates, 'deaths', {(0, 0, 0, 0, 0, 0, 0)}, 2)
+    [(1, 0, 0, 0, 0, 0, 0), (0, 1, 0, 0, 0, 0, 0)]
+    """
+    sorted_levels = [sorted(range(get_upper_limit(policy)),
+                            key=lambda level, p=policy: level_rates[(category, p, level)])
+                     for policy in ALL_POLICIES]
+
+    def total(indices: tuple[int, ...]) -> float:
+        return sum(level_rates[(category, policy, sorted_levels[i][indices[i]])]
+                   for i, policy in enumerate(ALL_POLICIES))
+
+    start = (0,) * len(ALL_POLICIES)
+    queue = [(total(start), start)]
+    pushed = {start}
+    found = []
+
+    while queue != [] and len(found) < num_results:
+        _, indices = heapq.heappop(queue)
+        levels = tuple(sorted_levels[i][index] for i, index in enumerate(indices))
+        if levels not in skipped:
+            found.append(levels)
+
+        for i in range(len(indices)):
+            if indices[i] + 1 < len(sorted_levels[i]):
+                successor = indices[:i] + (indices[i] + 1,) + indices[i + 1:]
+                if successor not in pushed:
+                    pushed.add(successor)
+                    heapq.heappush(queue, (total(successor), successor))
+
+    return found
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['heapq', 'numpy', 'classes', 'computations', 'ensemble', 'predictions']
+    })
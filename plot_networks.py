@@ -18,14 +18,52 @@ are expressly prohibited.
 
 This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
 """
+import array
 import csv
+import functools
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional
 
 import networkx as nx
+import numpy as np
+import plotly.colors
 import plotly.graph_objects as go
 
+import instrumentation
 from classes import WeightedGraph
+from computations import ALL_POLICIES, get_upper_limit
+from export import output_figure
+from workers import map_with_graph
 
+# The version of the network renderer. Increase it whenever the figures drawn by
+# get_network_figure change, so that figures cached by an older version are not reused.
+RENDERER_VERSION = 1
 
+# The csv file of the central locations of the countries in the real datasets
+CENTROIDS_FILE = 'datasets/centroids.csv'
+
+# The colours of the first levels of a policy, in the form of (name, line colour, marker colour)
+LEVEL_COLOURS = [('BLACK', 'black', 'rgb(0, 0, 0)'), ('BLUE', 'blue', 'rgb(0, 0, 255)'),
+                 ('RED', 'red', 'rgb(255, 0, 0)'), ('GREEN', 'green', 'rgb(0, 255, 0)'),
+                 ('ORANGE', 'orange', 'rgb(255, 165, 0)'), ('YELLOW', 'yellow', 'rgb(255, 255, 0)')]
+
+# The horizontal positions of the columns of level annotations, two levels per column
+ANNOTATION_COLUMNS = [0, 0.3, 0.9]
+
+# The name of each policy in the title of its map
+POLICY_TITLES = {'face-covering-policies': 'Face Covering Policy',
+                 'public-campaigns-covid': 'COVID-19 Public Campaigns',
+                 'public-events-cancellation': 'Public Events Cancellations',
+                 'school-workplace-closures': 'Schools & Workplaces Closure',
+                 'stay-at-home': 'Stay At Home Order',
+                 'testing-policy': 'Testing Policy',
+                 'vaccination-policy': 'Vaccination Policy'}
+
+
+@instrumentation.timed
 def convert_policy_to_networkx(graph: WeightedGraph, policy: str, level: int) -> nx.Graph:
     """Convert a WeightedGraph with only edges corresponding to the policy and level
      to a weighted Networkx graph.
@@ -70,6 +108,141 @@ def convert_policy_to_networkx(graph: WeightedGraph, policy: str, level: int) ->
     return graph_nx
 
 
+@instrumentation.timed
+def convert_level_subgraph_to_networkx(graph: WeightedGraph, policy: str,
+                                      level: int) -> nx.Graph:
+    """Return the subgraph of graph induced by the countries with the given level of the policy,
+    as a Networkx graph whose edges keep their weights.
+
+    Unlike convert_policy_to_networkx, the countries are read from the (policy, level) index
+    of the graph instead of scanning every vertex, and every edge between two of them is kept.
+
+    Preconditions:
+        - policy in ['face-covering-policies', 'public-campaigns-covid',
+        'public-events-cancellation','school-workplace-closures', 'stay-at-home', 'testing-policy',
+         'vaccination-policy']
+        - 0 <= level <= 6
+
+    >>> g = WeightedGraph()
+    >>> for country in ['Country1', 'Country2', 'Country3']:
+    ...     g.add_vertex(country, [0.1], [0.1], 1000)
+    ...     g.add_vertex_restrictions(country, 'face-covering-policies', 3)
+    >>> g.find_and_add_edge('Country1')
+    >>> g.find_and_add_edge('Country2')
+    >>> n = convert_level_subgraph_to_networkx(g, 'face-covering-policies', 3)
+    >>> len(n.edges), n.edges['Country1', 'Country3']['weight'] == 1 / 7
+    (3, True)
+    """
+    countries = graph.get_countries_at_level(policy, level)
+    vertices = graph.get_all_vertices()
+    members = set(countries)
+
+    graph_nx = nx.Graph()
+    graph_nx.add_nodes_from(countries)
+    graph_nx.add_weighted_edges_from(
+        (country, neighbour.country_name, weight)
+        for country in countries
+        for neighbour, weight in vertices[country].similar_policies.items()
+        if neighbour.country_name in members and country < neighbour.country_name)
+
+    return graph_nx
+
+
+@instrumentation.timed
+def limit_edges(graph_nx: nx.Graph, edge_budget: int) -> nx.Graph:
+    """Return a copy of graph_nx (with all of its nodes) that keeps at most edge_budget of its
+    edges, chosen to show its structure with as few lines as possible.
+
+    The edges of a maximum spanning forest are kept first, so that every pair of connected
+    countries stays connected through their most similar neighbours when the budget allows it.
+    The rest of the budget goes to the highest-weight edges that are left. The forest is found
+    with Kruskal's algorithm, and ties are broken by the names of the countries.
+
+    Preconditions:
+        - edge_budget >= 0
+        - all('weight' in graph_nx.edges[edge] for edge in graph_nx.edges)
+
+    >>> n = nx.Graph()
+    >>> n.add_weighted_edges_from([('a', 'b', 3 / 7), ('b', 'c', 2 / 7), ('a', 'c', 1 / 7),
+    ...                            ('c', 'd', 1 / 7), ('b', 'd', 1 / 7)])
+    >>> sorted(limit_edges(n, 3).edges)
+    [('a', 'b'), ('b', 'c'), ('b', 'd')]
+    >>> sorted(limit_edges(n, 4).edges)
+    [('a', 'b'), ('a', 'c'), ('b', 'c'), ('b', 'd')]
+    >>> len(limit_edges(n, 0).nodes)
+    4
+    """
+    edges = sorted(graph_nx.edges(data='weight'),
+                   key=lambda edge: (-edge[2], min(edge[0], edge[1]), max(edge[0], edge[1])))
+    parents = {node: node for node in graph_nx.nodes}
+
+    def find(node: str) -> str:
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    forest = []
+    others = []
+    for edge in edges:
+        root1, root2 = find(edge[0]), find(edge[1])
+        if root1 != root2 and len(forest) < edge_budget:
+            parents[root1] = root2
+            forest.append(edge)
+        else:
+            others.append(edge)
+
+    limited = nx.Graph()
+    limited.add_nodes_from(graph_nx.nodes)
+    limited.add_weighted_edges_from(forest + others[:max(edge_budget - len(forest), 0)])
+
+    return limited
+
+
+@instrumentation.timed
+def convert_policy_levels_to_networkx(graph: WeightedGraph, policy: str,
+                                      num_levels: int) -> list[nx.Graph]:
+    """Return the graphs that convert_policy_to_networkx returns for every level of the policy
+    from 0 to num_levels - 1, in that order.
+
+    The vertices are grouped by their level in a single pass over the graph, instead of one
+    pass for each level.
+
+    Preconditions:
+        - num_levels >= 0
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('Country1', [0.1],[0.1],1000)
+    >>> g.add_vertex('Country2', [0.1],[0.1],1000)
+    >>> g.add_vertex_restrictions('Country1','face-covering-policies', 3)
+    >>> g.add_vertex_restrictions('Country2','face-covering-policies', 3)
+    >>> g.find_and_add_edge('Country1')
+    >>> [len(n.edges) for n in convert_policy_levels_to_networkx(g, 'face-covering-policies', 5)]
+    [0, 0, 0, 1, 0]
+    """
+    vertices = graph.get_all_vertices()
+    starts = {}
+
+    for vertex in vertices:
+        starts[vertices[vertex].restrictions_level[policy]] = vertices[vertex]
+
+    graphs = []
+    for level in range(num_levels):
+        graph_nx = nx.Graph()
+
+        if level in starts:
+            start = starts[level]
+            others = start.same_policy_level(policy)
+            if others == []:
+                graph_nx.add_node(start.country_name)
+            else:
+                nx.add_path(graph_nx, [start.country_name] + others)
+
+        graphs.append(graph_nx)
+
+    return graphs
+
+
 def find_centroids_location(country: str) -> tuple[float, float]:
     """Return the central location of the country in the form of
     (longitude, latitude).
@@ -78,356 +251,173 @@ def find_centroids_location(country: str) -> tuple[float, float]:
     input should have a return value. However, to satisy PyTA conditions,
     if the data is not in the file, the tuple (0.0, 0.0) will be returned.
 
+    The locations are looked up in the table returned by load_centroids, so the csv file
+    is only read once.
+
     Preconditions:
         - country is in datasets/centroids.csv file
 
     >>> find_centroids_location('Canada')
     (-98.30777028, 61.36206324)
     """
-    with open('datasets/centroids.csv') as file:
+    return load_centroids().get(country, (0.0, 0.0))
+
+
+@functools.lru_cache(maxsize=None)
+def load_centroids(filename: str = CENTROIDS_FILE) -> dict[str, tuple[float, float]]:
+    """Return a mapping of every country in the given centroids csv file to its central
+    location in the form of (longitude, latitude). If a country appears more than once, its
+    first location is kept.
+
+    The table is cached, so the file is only read the first time this function is called with
+    a given filename. The returned dict must not be mutated.
+
+    Preconditions:
+        - filename.endswith('.csv')
+
+    >>> load_centroids()['Canada']
+    (-98.30777028, 61.36206324)
+    >>> load_centroids() is load_centroids()
+    True
+    """
+    table = {}
+
+    with open(filename) as file:
         reader = csv.reader(file)
 
         next(reader)
 
         for row in reader:
-            if row[0] == country:
-                return (float(row[1]), float(row[2]))
+            if row[0] not in table:
+                table[row[0]] = (float(row[1]), float(row[2]))
 
-    return (0.0, 0.0)
+        instrumentation.count_file_read(filename, reader.line_num - 1)
 
+    return table
 
-def plot_face_masks(graphs: list[nx.Graph], messages: dict[int, str]) -> None:
-    """Display a world map showing how countries are connected based on the level of restriction
-    on a policy.
 
-    This function is specifically for face covering policies with five levels.
+def get_centroid_array(countries: list[str], centroids_file: str = CENTROIDS_FILE) \
+        -> np.ndarray:
+    """Return an array with one row of (longitude, latitude) for each country in countries,
+    looked up in the centroids csv file centroids_file (refer to load_centroids), or
+    (0.0, 0.0) for a country that is not in it.
 
-    Preconditions:
-        - len(graphs) == 5
+    >>> get_centroid_array(['Canada', 'Not a country']).tolist()
+    [[-98.30777028, 61.36206324], [0.0, 0.0]]
     """
-    fig = go.Figure()
+    table = load_centroids(centroids_file)
+    return np.array([table.get(country, (0.0, 0.0)) for country in countries],
+                    dtype=np.float64).reshape(len(countries), 2)
+
+
+def get_edge_coordinates(graph_nx: nx.Graph, centroids_file: str = CENTROIDS_FILE) \
+        -> tuple[np.ndarray, np.ndarray]:
+    """Return the longitudes and latitudes of every edge of graph_nx in the form of
+    (longitudes, latitudes), to be drawn as a single line trace. Each edge takes three
+    entries: its two end points followed by NaN, which breaks the line between two edges.
+    The countries are located with the centroids csv file centroids_file.
+
+    >>> g = nx.Graph()
+    >>> g.add_edge('Canada', 'Canada')
+    >>> longitudes, latitudes = get_edge_coordinates(g)
+    >>> longitudes.tolist()[:2], len(latitudes)
+    ([-98.30777028, -98.30777028], 3)
+    """
+    nodes = list(graph_nx.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    locations = get_centroid_array(nodes, centroids_file)
 
-    # Level 0
-    for edge in graphs[0].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='black'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[0].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(0, 0, 0)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
-
-    # Level 1
-    for edge in graphs[1].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='blue'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[1].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(0, 0, 255)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
-
-    # Level 2
-    for edge in graphs[2].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='red'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[2].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(255, 0, 0)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
-
-    # Level 3
-    for edge in graphs[3].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='green'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[3].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
+    edges = np.array([(index[u], index[v]) for u, v in graph_nx.edges],
+                     dtype=np.int64).reshape(-1, 2)
+
+    coordinates = np.full((len(edges), 3, 2), np.nan)
+    coordinates[:, 0] = locations[edges[:, 0]]
+    coordinates[:, 1] = locations[edges[:, 1]]
+
+    return (coordinates[:, :, 0].ravel(), coordinates[:, :, 1].ravel())
+
+
+def get_level_traces(graph_nx: nx.Graph, line_colour: str, marker_colour: str,
+                     centroids_file: str = CENTROIDS_FILE) -> list[go.Scattergeo]:
+    """Return the traces drawing one level of a policy on a world map: a single trace with
+    every edge of graph_nx as a line, and a single trace with every country as a marker,
+    located with the centroids csv file centroids_file.
+
+    >>> g = nx.Graph()
+    >>> g.add_edge('Canada', 'Mexico')
+    >>> traces = get_level_traces(g, 'black', 'rgb(0, 0, 0)')
+    >>> [trace.mode for trace in traces]
+    ['lines', 'markers']
+    """
+    longitudes, latitudes = get_edge_coordinates(graph_nx, centroids_file)
+    countries = list(graph_nx.nodes)
+    locations = get_centroid_array(countries, centroids_file)
+
+    return [
+        go.Scattergeo(
             locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(0, 255, 0)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
-
-    # Level 4
-    for edge in graphs[4].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='orange'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[4].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
+            lon=longitudes,
+            lat=latitudes,
+            mode='lines',
+            line=dict(width=1, color=line_colour),
+            opacity=0.2,
+        ),
+        go.Scattergeo(
             locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
+            lon=locations[:, 0],
+            lat=locations[:, 1],
             mode='markers',
             hoverinfo='text',
-            text=country,
+            text=countries,
             marker=dict(
                 size=5,
-                color='rgb(255, 165, 0)',
+                color=marker_colour,
                 line=dict(
                     width=3,
                     color='rgba(68, 68, 68, 0)'
                 )
-            )))
-
-    fig.update_layout(title_text='Global Comparison on the Similarities of COVID-19 Policies: '
-                                 'Face Covering Policy')
+            ))
+    ]
 
-    fig.update_layout(
-        showlegend=False,
-        geo=go.layout.Geo(
-            scope='world',
-            showland=True,
-            showcountries=True,
-            landcolor='rgb(243, 243, 243)',
-            countrycolor='rgb(204, 204, 204)',
-        ),
-        height=700,
-    )
 
-    fig.update_layout(
-        annotations=[
-            dict(text="BLACK - "
-                      "Level 0: " + messages[0] + " (Total " + str(len(graphs[0].nodes)) + ")", x=0,
-                 xref="paper", y=1.085, yref="paper", align="left", showarrow=False),
-            dict(text="BLUE - "
-                      "Level 1: " + messages[1] + " (Total " + str(len(graphs[1].nodes)) + ")", x=0,
-                 xref="paper", y=1.045, yref="paper", align="left", showarrow=False),
-            dict(text="RED - "
-                      "Level 2: " + messages[2] + " (Total " + str(len(graphs[2].nodes)) + ")",
-                 x=0.3, xref="paper", y=1.085, yref="paper", align="left", showarrow=False),
-            dict(text="GREEN - "
-                      "Level 3: " + messages[3] + " (Total " + str(len(graphs[3].nodes)) + ")",
-                 x=0.3, xref="paper", y=1.045, yref="paper", align="left", showarrow=False),
-            dict(text="ORANGE - "
-                      "Level 4: " + messages[4] + " (Total " + str(len(graphs[4].nodes)) + ")",
-                 x=0.9, xref="paper", y=1.085, yref="paper", align="left", showarrow=False)
-        ])
-
-    fig.show()
-
-
-def plot_three_levels(graphs: list[nx.Graph], policy: str, messages: dict[int, str]) -> None:
+def plot_policy_network(graphs: list[nx.Graph], policy: str, messages: dict[int, str],
+                        output_dir: Optional[str] = None, file_format: str = 'html') \
+        -> Optional[str]:
     """Display a world map showing how countries are connected based on the level of restriction
+    on a policy (refer to get_network_figure). If output_dir is given, write the map to a file in
+    output_dir instead and return its path (refer to export.output_figure).
+
+    Preconditions:
+        - len(graphs) == len(messages)
+        - file_format in export.FILE_FORMATS
+    """
+    return output_figure(get_network_figure(graphs, policy, messages), policy, output_dir,
+                         file_format)
+
+
+@instrumentation.timed
+def get_network_figure(graphs: list[nx.Graph], policy: str, messages: dict[int, str],
+                       centroids_file: str = CENTROIDS_FILE) -> go.Figure:
+    """Return a world map showing how countries are connected based on the level of restriction
     on a policy.
 
-    This function is specifically for policies with three levels, and
-    is similar to plot_face_masks.
+    graphs[i] is the graph of the countries with level i of the policy, and messages[i] is
+    the description of level i. Level i is drawn in the colour given by get_level_colour(i),
+    so any number of levels can be drawn. The countries are located with the centroids csv
+    file centroids_file.
 
     Preconditions:
-        - len(graphs) == 3
-        - policy in ['public-campaigns-covid', 'public-events-cancellation']
-        - len(messages) == 3
+        - len(graphs) == len(messages)
     """
     fig = go.Figure()
 
-    # Level 0
-    for edge in graphs[0].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='black'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[0].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(0, 0, 0)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
-
-    # Level 1
-    for edge in graphs[1].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='blue'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[1].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(0, 0, 255)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
-
-    # Level 2
-    for edge in graphs[2].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='red'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[2].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(255, 0, 0)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
+    for level in range(len(graphs)):
+        _, line_colour, marker_colour = get_level_colour(level)
+        fig.add_traces(get_level_traces(graphs[level], line_colour, marker_colour,
+                                        centroids_file))
 
-    if policy == 'public-campaigns-covid':
-        fig.update_layout(title_text='Global Comparison on the Similarities of COVID-19 Policies: '
-                                     'COVID-19 Public Campaigns')
-    else:
-        fig.update_layout(title_text='Global Comparison on the Similarities of COVID-19 Policies: '
-                                     'Public Events Cancellations')
+    fig.update_layout(title_text='Global Comparison on the Similarities of COVID-19 Policies: '
+                                 + POLICY_TITLES.get(policy, policy))
 
     fig.update_layout(
         showlegend=False,
@@ -441,498 +431,263 @@ def plot_three_levels(graphs: list[nx.Graph], policy: str, messages: dict[int, s
         height=700,
     )
 
-    fig.update_layout(
-        annotations=[
-            dict(text="BLACK - "
-                      "Level 0: " + messages[0] + " (Total " + str(len(graphs[0].nodes)) + ")", x=0,
-                 xref="paper", y=1.085, yref="paper", align="left", showarrow=False),
-            dict(text="BLUE - "
-                      "Level 1: " + messages[1] + " (Total " + str(len(graphs[1].nodes)) + ")", x=0,
-                 xref="paper", y=1.045, yref="paper", align="left", showarrow=False),
-            dict(text="RED - "
-                      "Level 2: " + messages[2] + " (Total " + str(len(graphs[2].nodes)) + ")",
-                 x=0.3, xref="paper", y=1.085, yref="paper", align="left", showarrow=False)
-        ])
-
-    fig.show()
-
-
-def plot_four_levels(graphs: list[nx.Graph], policy: str, messages: dict[int, str]) -> None:
-    """Display a world map showing how countries are connected based on the level of restriction
-    on a policy.
+    annotations = []
+    for level in range(len(graphs)):
+        column = level // 2
+        if column < len(ANNOTATION_COLUMNS):
+            x = ANNOTATION_COLUMNS[column]
+        else:
+            x = ANNOTATION_COLUMNS[-1] + 0.3 * (column - len(ANNOTATION_COLUMNS) + 1)
+
+        annotations.append(
+            dict(text=get_level_colour(level)[0] + " - Level " + str(level) + ": "
+                 + messages[level] + " (Total " + str(len(graphs[level].nodes)) + ")",
+                 x=x, xref="paper", y=[1.085, 1.045][level % 2], yref="paper", align="left",
+                 showarrow=False))
+
+    fig.update_layout(annotations=annotations)
+    instrumentation.count('plot_networks.traces_emitted', len(fig.data))
+
+    return fig
 
-    This function is specifically for policies with 4 levels, and
-    is similar to plot_face_masks.
+
+def get_level_colour(level: int) -> tuple[str, str, str]:
+    """Return the colour of the level of a policy in the form of
+    (name, line colour, marker colour). The first levels use LEVEL_COLOURS, and any further
+    levels cycle through the Dark24 palette of plotly.
+
+    >>> get_level_colour(1)
+    ('BLUE', 'blue', 'rgb(0, 0, 255)')
+    >>> get_level_colour(6)
+    ('#2E91E5', '#2E91E5', '#2E91E5')
+    """
+    if level < len(LEVEL_COLOURS):
+        return LEVEL_COLOURS[level]
+    else:
+        colour = plotly.colors.qualitative.Dark24[(level - len(LEVEL_COLOURS)) % 24]
+        return (colour, colour, colour)
+
+
+def visualise(policy: str, graph: WeightedGraph, output_dir: Optional[str] = None,
+              file_format: str = 'html', cache_dir: Optional[str] = None,
+              edge_budget: Optional[int] = None,
+              centroids_file: str = CENTROIDS_FILE) -> Optional[str]:
+    """Plot and show graphs of countries with the same level of policy. If output_dir is given,
+    write the graphs to a file in output_dir instead and return its path.
+
+    If edge_budget is given, each level is drawn with at most edge_budget of the weighted edges
+    between its countries instead of a chain (refer to get_policy_figure).
+
+    If cache_dir is given, the figure is read from cache_dir when it was cached for the same
+    graph, policy and RENDERER_VERSION, and is cached there otherwise (refer to
+    get_cached_figure).
+
+    The countries are located with the centroids csv file centroids_file, which is the one of
+    the datasets the graph was built from.
 
     Preconditions:
-        - len(graphs) == 4
-        - policy in ['school-workplace-closures', 'stay-at-home', 'testing-policy']
-        - len(messages) = 4
+        - policy in ['face-covering-policies', 'public-campaigns-covid',
+        'public-events-cancellation','school-workplace-closures', 'stay-at-home', 'testing-policy',
+         'vaccination-policy']
+        - file_format in export.FILE_FORMATS
+        - edge_budget is None or edge_budget >= 0
     """
-    fig = go.Figure()
+    if cache_dir is None:
+        fig = get_policy_figure(graph, policy, edge_budget, centroids_file)
+    else:
+        fig = get_cached_figure(graph, policy, cache_dir, edge_budget, centroids_file)
 
-    # Level 0
-    for edge in graphs[0].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='black'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[0].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(0, 0, 0)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
-
-    # Level 1
-    for edge in graphs[1].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='blue'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[1].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(0, 0, 255)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
-
-    # Level 2
-    for edge in graphs[2].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='red'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[2].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(255, 0, 0)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
-
-    # Level 3
-    for edge in graphs[3].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='green'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[3].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(0, 255, 0)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
+    return output_figure(fig, policy, output_dir, file_format)
 
-    if policy == 'school-workplace-closures':
-        fig.update_layout(title_text='Global Comparison on the Similarities of COVID-19 Policies: '
-                                     'Schools & Workplaces Closure')
-    elif policy == 'stay-at-home':
-        fig.update_layout(title_text='Global Comparison on the Similarities of COVID-19 Policies: '
-                                     'Stay At Home Order')
+
+def visualise_all(graph: WeightedGraph, policies: Optional[list[str]] = None,
+                  output_dir: Optional[str] = None, file_format: str = 'html',
+                  cache_dir: Optional[str] = None, processes: Optional[int] = None,
+                  edge_budget: Optional[int] = None,
+                  centroids_file: str = CENTROIDS_FILE) -> list[Optional[str]]:
+    """Plot and show the graphs of every policy in policies (every policy in ALL_POLICIES if
+    policies is None), like calling visualise on each of them in order. Return the list of
+    the paths written to output_dir, or of None if output_dir is None.
+
+    The figures are drawn at the same time across the given number of worker processes (all
+    CPUs if processes is None), which all read the same copy of graph (refer to
+    workers.map_with_graph). The figures are then shown or written in order by this process.
+    The countries are located with the centroids csv file centroids_file, which is the one of
+    the datasets the graph was built from.
+
+    Preconditions:
+        - policies is None or all(policy in ALL_POLICIES for policy in policies)
+        - file_format in export.FILE_FORMATS
+        - processes is None or processes >= 1
+        - edge_budget is None or edge_budget >= 0
+
+    >>> import tempfile
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('Canada', [0.1], [0.1], 1000)
+    >>> g.add_vertex_restrictions('Canada', 'stay-at-home', 2)
+    >>> g.add_vertex_restrictions('Canada', 'testing-policy', 1)
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     paths = visualise_all(g, ['stay-at-home', 'testing-policy'], directory, 'json', None, 2)
+    ...     [os.path.basename(path) for path in paths]
+    ['stay-at-home.json', 'testing-policy.json']
+    """
+    if policies is None:
+        policies = ALL_POLICIES
+
+    figures = map_with_graph(graph, _draw_policy_figure,
+                             [(policy, cache_dir, edge_budget, centroids_file)
+                              for policy in policies],
+                             processes)
+
+    return [output_figure(go.Figure(json.loads(figure), _validate=False), policy, output_dir,
+                          file_format) for policy, figure in zip(policies, figures)]
+
+
+def _draw_policy_figure(graph: WeightedGraph,
+                        task: tuple[str, Optional[str], Optional[int], str]) -> str:
+    """Return the json specification of the figure of a policy drawn from graph, where task is
+    in the form of (policy, cache_dir, edge_budget, centroids_file). The figure is read from or
+    written to cache_dir unless cache_dir is None (refer to get_cached_figure)."""
+    policy, cache_dir, edge_budget, centroids_file = task
+
+    if cache_dir is None:
+        fig = get_policy_figure(graph, policy, edge_budget, centroids_file)
     else:
-        fig.update_layout(title_text='Global Comparison on the Similarities of COVID-19 Policies: '
-                                     'Testing Policy')
+        fig = get_cached_figure(graph, policy, cache_dir, edge_budget, centroids_file)
 
-    fig.update_layout(
-        showlegend=False,
-        geo=go.layout.Geo(
-            scope='world',
-            showland=True,
-            showcountries=True,
-            landcolor='rgb(243, 243, 243)',
-            countrycolor='rgb(204, 204, 204)',
-        ),
-        height=700,
-    )
+    return fig.to_json()
 
-    fig.update_layout(
-        annotations=[
-            dict(text="BLACK - "
-                      "Level 0: " + messages[0] + " (Total " + str(len(graphs[0].nodes)) + ")", x=0,
-                 xref="paper", y=1.085, yref="paper", align="left", showarrow=False),
-            dict(text="BLUE - "
-                      "Level 1: " + messages[1] + " (Total " + str(len(graphs[1].nodes)) + ")", x=0,
-                 xref="paper", y=1.045, yref="paper", align="left", showarrow=False),
-            dict(text="RED - "
-                      "Level 2: " + messages[2] + " (Total " + str(len(graphs[2].nodes)) + ")",
-                 x=0.3, xref="paper", y=1.085, yref="paper", align="left", showarrow=False),
-            dict(text="GREEN - "
-                      "Level 3: " + messages[3] + " (Total " + str(len(graphs[3].nodes)) + ")",
-                 x=0.3, xref="paper", y=1.045, yref="paper", align="left", showarrow=False)
-        ])
-
-    fig.show()
-
-
-def plot_vaccination(graphs: list[nx.Graph], messages: dict[int, str]) -> None:
-    """Display a world map showing how countries are connected based on the level of restriction
-    on a policy.
 
-    This function is specifically for vaccination policy, with six levels, and it is
-    is similar to plot_face_masks.
+@instrumentation.timed
+def get_policy_figure(graph: WeightedGraph, policy: str, edge_budget: Optional[int] = None,
+                      centroids_file: str = CENTROIDS_FILE) -> go.Figure:
+    """Return the world map of the countries with the same level of policy, drawn from graph
+    with the countries located by the centroids csv file centroids_file.
+
+    If edge_budget is None, the countries of each level are joined in a chain (refer to
+    convert_policy_levels_to_networkx). Otherwise, each level is drawn with at most
+    edge_budget of the weighted edges between its countries (refer to limit_edges). The edges
+    are limited before any trace is built, so the size of the figure grows with the number of
+    countries rather than the number of edges.
 
     Preconditions:
-        - len(graphs) == 6
-        - len(messages) == 6
+        - policy in ['face-covering-policies', 'public-campaigns-covid',
+        'public-events-cancellation','school-workplace-closures', 'stay-at-home', 'testing-policy',
+         'vaccination-policy']
+        - edge_budget is None or edge_budget >= 0
+
+    >>> g = WeightedGraph()
+    >>> for country in ['Canada', 'France', 'Japan']:
+    ...     g.add_vertex(country, [0.1], [0.1], 1000)
+    ...     g.add_vertex_restrictions(country, 'stay-at-home', 2)
+    >>> for country in ['Canada', 'France', 'Japan']:
+    ...     g.find_and_add_edge(country)
+    >>> fig = get_policy_figure(g, 'stay-at-home', 1)
+    >>> len(fig.data[4].lon)  # One line: two ends and a gap
+    3
     """
-    fig = go.Figure()
+    if edge_budget is None:
+        graphs = convert_policy_levels_to_networkx(graph, policy, get_upper_limit(policy))
+    else:
+        graphs = [limit_edges(convert_level_subgraph_to_networkx(graph, policy, level),
+                              edge_budget) for level in range(get_upper_limit(policy))]
 
-    # Level 0
-    for edge in graphs[0].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='black'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[0].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(0, 0, 0)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
-
-    # Level 1
-    for edge in graphs[1].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='blue'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[1].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(0, 0, 255)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
-
-    # Level 2
-    for edge in graphs[2].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='red'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[2].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(255, 0, 0)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
-
-    # Level 3
-    for edge in graphs[3].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='green'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[3].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(0, 255, 0)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
-
-    # Level 4
-    for edge in graphs[4].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='orange'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[4].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(255, 165, 0)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
-
-    # Level 5
-    for edge in graphs[5].edges:
-        loc1 = find_centroids_location(edge[0])
-        loc2 = find_centroids_location(edge[1])
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='ISO-3',
-                lon=[loc1[0], loc2[0]],
-                lat=[loc1[1], loc2[1]],
-                mode='lines',
-                line=dict(width=1, color='yellow'),
-                opacity=0.2,
-            )
-        )
-
-    for country in graphs[5].nodes:
-        loc = find_centroids_location(country)
-        fig.add_trace(go.Scattergeo(
-            locationmode='ISO-3',
-            lon=[loc[0]],
-            lat=[loc[1]],
-            mode='markers',
-            hoverinfo='text',
-            text=country,
-            marker=dict(
-                size=5,
-                color='rgb(255, 255, 0)',
-                line=dict(
-                    width=3,
-                    color='rgba(68, 68, 68, 0)'
-                )
-            )))
+    return get_network_figure(graphs, policy, get_level_descriptions(policy), centroids_file)
 
-    fig.update_layout(title_text='Global Comparison on the Similarities of COVID-19 Policies: '
-                                 'Vaccination Policy')
 
-    fig.update_layout(
-        showlegend=False,
-        geo=go.layout.Geo(
-            scope='world',
-            showland=True,
-            showcountries=True,
-            landcolor='rgb(243, 243, 243)',
-            countrycolor='rgb(204, 204, 204)',
-        ),
-        height=700,
-    )
+@instrumentation.timed
+def get_cached_figure(graph: WeightedGraph, policy: str, cache_dir: str,
+                      edge_budget: Optional[int] = None,
+                      centroids_file: str = CENTROIDS_FILE) -> go.Figure:
+    """Return get_policy_figure(graph, policy, edge_budget, centroids_file), reading it from a
+    json file in cache_dir if it was cached before, or drawing and caching it otherwise.
 
-    fig.update_layout(
-        annotations=[
-            dict(text="BLACK - "
-                      "Level 0: " + messages[0] + " (Total " + str(len(graphs[0].nodes)) + ")", x=0,
-                 xref="paper", y=1.085, yref="paper", align="left", showarrow=False),
-            dict(text="BLUE - "
-                      "Level 1: " + messages[1] + " (Total " + str(len(graphs[1].nodes)) + ")", x=0,
-                 xref="paper", y=1.045, yref="paper", align="left", showarrow=False),
-            dict(text="RED - "
-                      "Level 2: " + messages[2] + " (Total " + str(len(graphs[2].nodes)) + ")",
-                 x=0.3, xref="paper", y=1.085, yref="paper", align="left", showarrow=False),
-            dict(text="GREEN - "
-                      "Level 3: " + messages[3] + " (Total " + str(len(graphs[3].nodes)) + ")",
-                 x=0.3, xref="paper", y=1.045, yref="paper", align="left", showarrow=False),
-            dict(text="ORANGE - "
-                      "Level 4: " + messages[4] + " (Total " + str(len(graphs[4].nodes)) + ")",
-                 x=0.9, xref="paper", y=1.085, yref="paper", align="left", showarrow=False),
-            dict(text="YELLOW - "
-                      "Level 5: " + messages[5] + " (Total " + str(len(graphs[4].nodes)) + ")",
-                 x=0.9, xref="paper", y=1.045, yref="paper", align="left", showarrow=False)
-        ])
-
-    fig.show()
-
-
-def visualise(policy: str, graph: WeightedGraph) -> None:
-    """Plot and show graphs of countries with the same level of policy.
+    The file is named after the policy, edge_budget, RENDERER_VERSION and
+    get_graph_fingerprint(graph), so a figure is only reused for a graph with the same
+    countries, policy levels and edges. Unless centroids_file is CENTROIDS_FILE, the name also
+    holds a hash of the locations in centroids_file. Reading a cached figure does not traverse
+    the graph.
 
     Preconditions:
         - policy in ['face-covering-policies', 'public-campaigns-covid',
         'public-events-cancellation','school-workplace-closures', 'stay-at-home', 'testing-policy',
          'vaccination-policy']
+        - edge_budget is None or edge_budget >= 0
+
+    >>> import tempfile
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('Canada', [0.1], [0.1], 1000)
+    >>> g.add_vertex_restrictions('Canada', 'stay-at-home', 2)
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     drawn = get_cached_figure(g, 'stay-at-home', directory)
+    ...     cached = get_cached_figure(g, 'stay-at-home', directory)
+    ...     len(os.listdir(directory)), json.loads(cached.to_json()) == json.loads(drawn.to_json())
+    (1, True)
     """
-    if policy == 'face-covering-policies':
-        lvl0 = convert_policy_to_networkx(graph, policy, 0)
-        lvl1 = convert_policy_to_networkx(graph, policy, 1)
-        lvl2 = convert_policy_to_networkx(graph, policy, 2)
-        lvl3 = convert_policy_to_networkx(graph, policy, 3)
-        lvl4 = convert_policy_to_networkx(graph, policy, 4)
-        graphs = [lvl0, lvl1, lvl2, lvl3, lvl4]
-        plot_face_masks(graphs, get_level_descriptions(policy))
-    elif policy in ['public-campaigns-covid', 'public-events-cancellation']:
-        lvl0 = convert_policy_to_networkx(graph, policy, 0)
-        lvl1 = convert_policy_to_networkx(graph, policy, 1)
-        lvl2 = convert_policy_to_networkx(graph, policy, 2)
-        graphs = [lvl0, lvl1, lvl2]
-        plot_three_levels(graphs, policy, get_level_descriptions(policy))
-    elif policy in ['school-workplace-closures', 'stay-at-home', 'testing-policy']:
-        lvl0 = convert_policy_to_networkx(graph, policy, 0)
-        lvl1 = convert_policy_to_networkx(graph, policy, 1)
-        lvl2 = convert_policy_to_networkx(graph, policy, 2)
-        lvl3 = convert_policy_to_networkx(graph, policy, 3)
-        graphs = [lvl0, lvl1, lvl2, lvl3]
-        plot_four_levels(graphs, policy, get_level_descriptions(policy))
+    if edge_budget is None:
+        name = policy
     else:
-        lvl0 = convert_policy_to_networkx(graph, policy, 0)
-        lvl1 = convert_policy_to_networkx(graph, policy, 1)
-        lvl2 = convert_policy_to_networkx(graph, policy, 2)
-        lvl3 = convert_policy_to_networkx(graph, policy, 3)
-        lvl4 = convert_policy_to_networkx(graph, policy, 4)
-        lvl5 = convert_policy_to_networkx(graph, policy, 5)
-        graphs = [lvl0, lvl1, lvl2, lvl3, lvl4, lvl5]
-        plot_vaccination(graphs, get_level_descriptions(policy))
+        name = policy + '-e' + str(edge_budget)
+
+    if centroids_file != CENTROIDS_FILE:
+        locations = sorted(load_centroids(centroids_file).items())
+        name += '-c' + hashlib.sha256(repr(locations).encode()).hexdigest()[:16]
+
+    path = os.path.join(cache_dir, name + '-v' + str(RENDERER_VERSION) + '-'
+                        + get_graph_fingerprint(graph) + '.json')
+
+    if os.path.exists(path):
+        instrumentation.count('plot_networks.figure_cache_hits')
+        # The figure was validated when it was drawn, so it is not validated again
+        with open(path) as file:
+            return go.Figure(json.load(file), _validate=False)
+
+    instrumentation.count('plot_networks.figure_cache_misses')
+    fig = get_policy_figure(graph, policy, edge_budget, centroids_file)
+
+    # Written to a temporary file of its own first, so that a figure being cached is never read
+    # halfway, even while other threads or processes cache the same figure
+    os.makedirs(cache_dir, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=cache_dir)
+    try:
+        with os.fdopen(descriptor, 'w') as file:
+            file.write(fig.to_json())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+    return fig
+
+
+@instrumentation.timed
+def get_graph_fingerprint(graph: WeightedGraph) -> str:
+    """Return a hash of the countries, policy levels and edges (with their weights) of graph.
+    Two graphs with the same networks of policies, built in the same order, have the same
+    fingerprint. The case and death counts are left out, as the maps do not show them.
+
+    >>> g1 = WeightedGraph()
+    >>> g1.add_vertex('Canada', [0.1], [0.1], 1000)
+    >>> g2 = WeightedGraph()
+    >>> g2.add_vertex('Canada', [0.5], [0.5], 2000)
+    >>> get_graph_fingerprint(g1) == get_graph_fingerprint(g2)
+    True
+    >>> g2.add_vertex_restrictions('Canada', 'stay-at-home', 2)
+    >>> get_graph_fingerprint(g1) == get_graph_fingerprint(g2)
+    False
+    """
+    vertices = graph.get_all_vertices()
+    digest = hashlib.sha256()
+
+    for country in vertices:
+        vertex = vertices[country]
+        digest.update(repr((country, vertex.restrictions_level)).encode())
+        digest.update('\0'.join(neighbour.country_name
+                                 for neighbour in vertex.similar_policies).encode())
+        digest.update(array.array('d', vertex.similar_policies.values()).tobytes())
+
+    return digest.hexdigest()[:16]
 
 
 def get_level_descriptions(policy: str) -> dict[int, str]:
@@ -999,7 +754,9 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 100,
-        'allowed-io': ['find_centroids_location'],
-        'extra-imports': ['classes', 'csv', 'networkx', 'plotly.graph_objects'],
+        'allowed-io': ['load_centroids', 'get_cached_figure'],
+        'extra-imports': ['array', 'classes', 'computations', 'csv', 'export', 'functools',
+                          'hashlib', 'instrumentation', 'json', 'networkx', 'numpy', 'os',
+                          'plotly.colors', 'plotly.graph_objects', 'tempfile', 'workers'],
         'disable': ['E1136'],
     })
@@ -0,0 +1,318 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains the functions that compute the predicted total cases
+and deaths of a simulation (refer to simulations.py) as numpy arrays.
+
+They only depend on numpy, so that the predictions can be computed without
+importing pandas or plotly.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import csv
+from typing import Iterator, Optional, Union
+
+import numpy as np
+
+from classes import WeightedGraph
+from computations import get_total_average_case_growth, get_total_average_deaths_growth
+
+# The total population on Earth in March 2020, around the time when the pandemic starts
+WORLD_POPULATION = 7800000000
+
+# The average time to death for coronavirus, in days
+DAYS_TO_DEATH = 19
+
+
+def get_daily_counts(graph: WeightedGraph, policies: dict[str, int]) -> tuple[int, int]:
+    """Return the number of new cases and new deaths every day in the form of
+    (daily cases, daily deaths) for the whole world population, based on the given policies.
+
+    This function makes use of get_total_average_case_growth and
+    get_total_average_deaths_growth.
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [100.0], [10.0], 1000000)
+    >>> g.add_vertex_restrictions('c1', 'face-covering-policies', 2)
+    >>> get_daily_counts(g, {'face-covering-policies': 2})
+    (780000, 78000)
+    """
+    average_daily_cases = get_total_average_case_growth(graph, policies)
+    daily_cases = round(WORLD_POPULATION * average_daily_cases)
+    average_daily_deaths = get_total_average_deaths_growth(graph, policies)
+    daily_deaths = round(WORLD_POPULATION * average_daily_deaths)
+
+    return (daily_cases, daily_deaths)
+
+
+def get_simulation_length(daily_deaths: int) -> int:
+    """Return the number of days it takes for the whole world population to die, given the
+    number of new deaths every day. The first deaths happen on day DAYS_TO_DEATH.
+
+    If daily_deaths is 0, the simulation never ends and a ValueError is raised.
+
+    >>> get_simulation_length(7800000000)
+    19
+    >>> get_simulation_length(3900000000)
+    20
+    >>> get_simulation_length(3900000001)
+    20
+    """
+    if daily_deaths <= 0:
+        raise ValueError('The simulation never ends when there are no daily deaths.')
+
+    return DAYS_TO_DEATH - 1 + -(-WORLD_POPULATION // daily_deaths)
+
+
+def prediction_columns(daily_cases: int, daily_deaths: int, horizon: Optional[int] = None,
+                       first_day: int = 1) -> dict[str, np.ndarray]:
+    """Return a mapping of the column names 'Day', 'Total_Cases' and 'Total_Deaths' to the
+    columns of the simulation, given the number of new cases and deaths every day.
+
+    Since the growth is linear, the cumulative counts are computed directly for every day:
+    the total cases on day d is d * daily_cases and the total deaths on day d is
+    (d - DAYS_TO_DEATH + 1) * daily_deaths, both capped at WORLD_POPULATION.
+
+    The columns start on first_day, and end on the day the whole world population has died
+    (refer to get_simulation_length), or on day horizon if that is earlier.
+
+    Preconditions:
+        - daily_cases >= 0
+        - daily_deaths >= 0
+        - horizon is None or horizon >= 0
+        - horizon is not None or daily_deaths > 0
+        - first_day >= 1
+
+    >>> columns = prediction_columns(3000000000, 4000000000)
+    >>> [int(n) for n in columns['Total_Cases'][-3:]]
+    [7800000000, 7800000000, 7800000000]
+    >>> [int(n) for n in columns['Total_Deaths'][-3:]]
+    [0, 4000000000, 7800000000]
+    >>> len(prediction_columns(10, 1, 365)['Day'])
+    365
+    >>> [int(n) for n in prediction_columns(10, 1, 21, 19)['Total_Deaths']]
+    [1, 2, 3]
+    """
+    if horizon is None:
+        last_day = get_simulation_length(daily_deaths)
+    elif daily_deaths > 0:
+        last_day = min(horizon, get_simulation_length(daily_deaths))
+    else:
+        last_day = horizon
+
+    days = np.arange(first_day, last_day + 1, dtype=np.int64)
+    death_days = np.maximum(days - (DAYS_TO_DEATH - 1), 0)
+
+    return {'Day': days,
+            'Total_Cases': cumulative_totals(days, daily_cases),
+            'Total_Deaths': cumulative_totals(death_days, daily_deaths)}
+
+
+def prediction_blocks(daily_cases: int, daily_deaths: int, block_size: int = 10000,
+                      horizon: Optional[int] = None,
+                      endless: bool = False) -> Iterator[dict[str, np.ndarray]]:
+    """Return an iterator over the columns of the simulation (refer to prediction_columns) in
+    consecutive blocks of at most block_size days each, so that only one block is held in
+    memory at a time.
+
+    When daily_deaths is 0 and horizon is None, the simulation never ends. Then a ValueError
+    is raised, unless endless is True: the blocks go on forever, and it is up to the consumer
+    to stop.
+
+    Preconditions:
+        - daily_cases >= 0
+        - daily_deaths >= 0
+        - block_size > 0
+        - horizon is None or horizon >= 0
+
+    >>> blocks = list(prediction_blocks(10, 1, 2, 5))
+    >>> [[int(day) for day in block['Day']] for block in blocks]
+    [[1, 2], [3, 4], [5]]
+    >>> blocks = prediction_blocks(10, 0, 1000, endless=True)
+    >>> int(next(blocks)['Total_Cases'][-1])
+    10000
+    >>> prediction_blocks(10, 0, 1000)
+    Traceback (most recent call last):
+    ValueError: The simulation never ends when there are no daily deaths and no horizon.
+    """
+    if daily_deaths > 0:
+        last_day = get_simulation_length(daily_deaths)
+        if horizon is not None:
+            last_day = min(horizon, last_day)
+    elif horizon is not None or endless:
+        last_day = horizon
+    else:
+        raise ValueError('The simulation never ends when there are no daily deaths and no '
+                         'horizon.')
+
+    return _generate_blocks(daily_cases, daily_deaths, block_size, last_day)
+
+
+def _generate_blocks(daily_cases: int, daily_deaths: int, block_size: int,
+                     last_day: Optional[int]) -> Iterator[dict[str, np.ndarray]]:
+    """Yield the blocks of prediction_blocks up to last_day, or forever if last_day is None."""
+    first_day = 1
+    while last_day is None or first_day <= last_day:
+        block_end = first_day + block_size - 1
+        if last_day is not None:
+            block_end = min(block_end, last_day)
+
+        yield prediction_columns(daily_cases, daily_deaths, block_end, first_day)
+        first_day = block_end + 1
+
+
+def iter_prediction_blocks(graph: WeightedGraph, policies: dict[str, int],
+                           block_size: int = 10000, horizon: Optional[int] = None) \
+        -> Iterator[dict[str, np.ndarray]]:
+    """Return an iterator over the predictions of create_predictions in blocks of at most
+    block_size days each, in the form of a mapping of the column names to the columns of that
+    block.
+
+    Peak memory only depends on block_size, not on how many days the simulation runs for.
+    Refer to prediction_blocks for more details. If the policies give no daily deaths and
+    horizon is None, the simulation never ends and a ValueError is raised.
+
+    Preconditions:
+        - block_size > 0
+        - horizon is None or horizon >= 0
+    """
+    daily_cases, daily_deaths = get_daily_counts(graph, policies)
+    return prediction_blocks(daily_cases, daily_deaths, block_size, horizon)
+
+
+def iter_predictions(graph: WeightedGraph, policies: dict[str, int],
+                     horizon: Optional[int] = None) -> Iterator[tuple[int, int, int]]:
+    """Return an iterator over the predictions of create_predictions one day at a time, in the
+    form of (day, total cases, total deaths).
+
+    If the policies give no daily deaths and horizon is None, the simulation never ends and a
+    ValueError is raised.
+
+    Preconditions:
+        - horizon is None or horizon >= 0
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [100.0], [10.0], 1000000)
+    >>> g.add_vertex_restrictions('c1', 'face-covering-policies', 2)
+    >>> rows = list(iter_predictions(g, {'face-covering-policies': 2}, 20))
+    >>> rows[-1]
+    (20, 15600000, 156000)
+    """
+    blocks = iter_prediction_blocks(graph, policies, horizon=horizon)
+
+    return (row for block in blocks
+            for row in zip(block['Day'].tolist(), block['Total_Cases'].tolist(),
+                           block['Total_Deaths'].tolist()))
+
+
+def write_predictions_csv(graph: WeightedGraph, policies: dict[str, int], filename: str,
+                          horizon: Optional[int] = None, block_size: int = 10000) -> None:
+    """Write the predictions of create_predictions to a csv file with the columns
+    Day, Total_Cases and Total_Deaths, one block of days at a time.
+
+    If the policies give no daily deaths and horizon is None, the simulation never ends, so a
+    ValueError is raised before the file is written.
+
+    Preconditions:
+        - filename.endswith('.csv')
+        - block_size > 0
+        - horizon is None or horizon >= 0
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [100.0], [0.0], 1000000)
+    >>> g.add_vertex_restrictions('c1', 'face-covering-policies', 2)
+    >>> write_predictions_csv(g, {'face-covering-policies': 2}, 'never-written.csv')
+    Traceback (most recent call last):
+    ValueError: The simulation never ends when there are no daily deaths and no horizon.
+    """
+    blocks = iter_prediction_blocks(graph, policies, block_size, horizon)
+
+    with open(filename, 'w', newline='') as output_file:
+        writer = csv.writer(output_file)
+        writer.writerow(['Day', 'Total_Cases', 'Total_Deaths'])
+
+        for block in blocks:
+            writer.writerows(zip(block['Day'].tolist(), block['Total_Cases'].tolist(),
+                                 block['Total_Deaths'].tolist()))
+
+
+def batch_prediction_columns(daily_cases: np.ndarray, daily_deaths: np.ndarray,
+                             horizon: int = 365) -> dict[str, np.ndarray]:
+    """Return the columns of many simulations at once, given the number of new cases and deaths
+    every day of each simulation. 'Day' maps to the days from 1 to horizon, while
+    'Total_Cases' and 'Total_Deaths' map to arrays with one row per day and one column per
+    simulation.
+
+    Unlike prediction_columns, every simulation runs for exactly horizon days. A simulation
+    in which the whole world population has died simply stays at WORLD_POPULATION.
+
+    Preconditions:
+        - daily_cases.shape == daily_deaths.shape
+        - daily_cases.ndim == 1
+        - all(n >= 0 for n in daily_cases)
+        - all(n >= 0 for n in daily_deaths)
+        - horizon >= 0
+
+    >>> columns = batch_prediction_columns(np.array([10, 20]), np.array([1, 2]), 20)
+    >>> columns['Total_Cases'].shape
+    (20, 2)
+    >>> columns['Total_Deaths'][-1].tolist()
+    [2, 4]
+    """
+    days = np.arange(1, horizon + 1, dtype=np.int64)
+    death_days = np.maximum(days - (DAYS_TO_DEATH - 1), 0)
+
+    return {'Day': days,
+            'Total_Cases': cumulative_totals(days[:, None], daily_cases[None, :]),
+            'Total_Deaths': cumulative_totals(death_days[:, None], daily_deaths[None, :])}
+
+
+def cumulative_totals(days: np.ndarray, daily_average: Union[int, np.ndarray],
+                      population: Union[int, np.ndarray] = WORLD_POPULATION) -> np.ndarray:
+    """Return the cumulative count after each number of days in days, given the daily average,
+    capped at population. days, daily_average and population are broadcast against each other.
+
+    The number of days is capped first so that the multiplication can never overflow.
+
+    >>> [int(n) for n in cumulative_totals(np.arange(4), 3000000000)]
+    [0, 3000000000, 6000000000, 7800000000]
+    >>> [int(n) for n in cumulative_totals(np.arange(3), 0)]
+    [0, 0, 0]
+    >>> cumulative_totals(np.arange(3), np.array([[4], [5]]), np.array([[6], [100]])).tolist()
+    [[0, 4, 6], [0, 5, 10]]
+    """
+    daily_average = np.asarray(daily_average, dtype=np.int64)
+    days_to_cap = np.where(daily_average > 0,
+                           -(-population // np.maximum(daily_average, 1)), 0)
+    totals = np.minimum(days, days_to_cap) * daily_average
+
+    return np.minimum(totals, population)
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['csv', 'numpy', 'classes', 'computations'],
+        'allowed-io': ['write_predictions_csv']
+    })
@@ -0,0 +1,75 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains the parsing of the query strings shared by the web servers
+(refer to dashboard.py and query_service.py).
+
+It imports nothing that draws figures, so a server that only answers simulation queries
+does not load plotly.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+from computations import ALL_POLICIES, get_upper_limit
+
+# The longest simulation, in days, that the servers compute
+MAX_HORIZON = 3650
+
+
+def parse_policies(query: dict[str, list[str]]) -> dict[str, int]:
+    """Return the policies and levels given in a parsed query string. Every parameter other
+    than horizon and edge_budget must be a policy in ALL_POLICIES with a valid level.
+
+    Raise ValueError if a policy or a level is not valid, or if no policy is given.
+
+    >>> parse_policies({'stay-at-home': ['1'], 'horizon': ['30']})
+    {'stay-at-home': 1}
+    >>> parse_policies({'stay-at-home': ['9']})
+    Traceback (most recent call last):
+    ValueError: stay-at-home must be a level between 0 and 3
+    """
+    policies = {}
+
+    for name in query:
+        if name in ['horizon', 'edge_budget']:
+            continue
+        if name not in ALL_POLICIES:
+            raise ValueError('unknown policy ' + name)
+
+        level = int(query[name][0])
+        if not 0 <= level < get_upper_limit(name):
+            raise ValueError(name + ' must be a level between 0 and '
+                             + str(get_upper_limit(name) - 1))
+        policies[name] = level
+
+    if policies == {}:
+        raise ValueError('no policy is given')
+
+    return policies
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['computations']
+    })
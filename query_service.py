@@ -0,0 +1,421 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains an asyncio web service that answers queries for the
+projected cases and deaths of a set of policies, so that other tools can use the
+simulations over HTTP.
+
+Identical queries that arrive while one of them is being computed share its answer, and
+distinct queries that arrive within BATCH_WINDOW seconds of each other are evaluated
+together in one batch (refer to sensitivity.get_scenario_rates and
+predictions.batch_prediction_columns). Batches are evaluated in a pool of worker processes,
+each with its own copy of the graph, so the event loop keeps accepting requests while a
+batch is computed.
+
+The service answers the following requests:
+    - /project   the projection of the policies in the query, e.g.
+                 /project?stay-at-home=1&testing-policy=2&horizon=365
+                 Add series=1 to also get the total cases and deaths of every day.
+    - /stats     the number of requests, coalesced requests and batches so far
+
+Run this module to serve the real datasets on http://127.0.0.1:8060, and run
+load_generator.py to measure its latency and throughput.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import argparse
+import asyncio
+import json
+import pickle
+import traceback
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
+
+import numpy as np
+
+from classes import WeightedGraph
+from optimizer import get_level_rates
+from predictions import WORLD_POPULATION, batch_prediction_columns
+from queries import MAX_HORIZON, parse_policies
+from sensitivity import get_scenario_rates
+
+# The number of seconds the first query of a batch waits for other queries to join it
+BATCH_WINDOW = 0.005
+
+# The most queries evaluated in one batch
+MAX_BATCH_SIZE = 256
+
+# A query in the form of (policies as sorted (policy, level) pairs, horizon, whether the
+# total cases and deaths of every day are wanted)
+Query = tuple[tuple[tuple[str, int], ...], int, bool]
+
+# The graph, and the expected rates of the policy levels and the rates of the countries
+# computed so far, in a worker process
+_service_graph = None
+_service_level_rates = {}
+_service_country_rates = {}
+
+
+def evaluate_batch(graph: WeightedGraph, queries: list[Query],
+                   level_rates: Optional[dict[tuple[str, str, int], float]] = None,
+                   country_rates: Optional[dict[str, tuple[float, float]]] = None) \
+        -> list[dict[str, Any]]:
+    """Return the answer to every query in queries, evaluated together in one batch.
+
+    Each answer holds the policies, the horizon, the daily new cases and deaths rates per
+    person, the daily new cases and deaths, and the total cases and deaths after horizon
+    days. If the query asks for it, the answer also holds the Day, Total_Cases and
+    Total_Deaths columns of every day, like simulations.create_predictions.
+
+    The rates are computed by sensitivity.get_scenario_rates, so a query that no country has
+    exactly uses the expected rates of its policy levels instead of random traversals.
+    level_rates and country_rates are passed on to it.
+
+    Preconditions:
+        - queries != []
+        - all(0 < len(query[0]) <= 7 and 1 <= query[1] for query in queries)
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [100.0], [10.0], 1000000)
+    >>> g.add_vertex_restrictions('c1', 'stay-at-home', 1)
+    >>> answers = evaluate_batch(g, [((('stay-at-home', 1),), 20, False),
+    ...                              ((('stay-at-home', 1),), 3, True)])
+    >>> answers[0]['total_cases'], answers[0]['total_deaths']
+    (15600000, 156000)
+    >>> answers[1]['Total_Cases']
+    [780000, 1560000, 2340000]
+    """
+    case_rates, death_rates = get_scenario_rates(graph, [dict(query[0]) for query in queries],
+                                                 1, level_rates, country_rates)
+    daily_cases = np.rint(WORLD_POPULATION * case_rates).astype(np.int64)
+    daily_deaths = np.rint(WORLD_POPULATION * death_rates).astype(np.int64)
+
+    columns = batch_prediction_columns(daily_cases, daily_deaths,
+                                       max(query[1] for query in queries))
+
+    answers = []
+    for i, (policies, horizon, series) in enumerate(queries):
+        answer = {'policies': dict(policies),
+                  'horizon': horizon,
+                  'case_rate': float(case_rates[i]),
+                  'death_rate': float(death_rates[i]),
+                  'daily_cases': int(daily_cases[i]),
+                  'daily_deaths': int(daily_deaths[i]),
+                  'total_cases': int(columns['Total_Cases'][horizon - 1, i]),
+                  'total_deaths': int(columns['Total_Deaths'][horizon - 1, i])}
+        if series:
+            answer['Day'] = columns['Day'][:horizon].tolist()
+            answer['Total_Cases'] = columns['Total_Cases'][:horizon, i].tolist()
+            answer['Total_Deaths'] = columns['Total_Deaths'][:horizon, i].tolist()
+        answers.append(answer)
+
+    return answers
+
+
+def _init_service_worker(graph: WeightedGraph,
+                         level_rates: dict[tuple[str, str, int], float]) -> None:
+    """Store graph and a copy of level_rates as the graph and the expected rates of the
+    policy levels of this worker process."""
+    global _service_graph, _service_level_rates, _service_country_rates
+    _service_graph = graph
+    _service_level_rates = dict(level_rates)
+    _service_country_rates = {}
+
+
+def _evaluate_in_worker(queries: list[Query]) -> list[dict[str, Any]]:
+    """Return evaluate_batch for the graph of this worker process. The expected rates of the
+    policy levels and the rates of the countries are kept between batches."""
+    return evaluate_batch(_service_graph, queries, _service_level_rates, _service_country_rates)
+
+
+class ProjectionBatcher:
+    """Answers projection queries by coalescing identical queries and evaluating distinct
+    queries in batches.
+
+    Instance Attributes:
+        - graph: The graph that the queries are answered from
+        - executor: The pool of worker processes that evaluates the batches, or None to
+                    evaluate them in the event loop
+        - batch_window: The number of seconds the first query of a batch waits for others
+        - max_batch_size: The most queries evaluated in one batch
+        - requests: The number of queries received so far
+        - coalesced: The number of queries that shared the answer of an identical query
+        - batches: The number of batches evaluated so far
+
+    Representation Invariants:
+        - self.batch_window >= 0
+        - self.max_batch_size >= 1
+        - self.coalesced <= self.requests
+    """
+    graph: WeightedGraph
+    executor: Optional[ProcessPoolExecutor]
+    batch_window: float
+    max_batch_size: int
+    requests: int
+    coalesced: int
+    batches: int
+
+    # Private Instance Attributes:
+    #     - _in_flight: The answer of every query that is waiting or being evaluated
+    #     - _queue: The queries waiting for the next batch
+    #     - _flush_handle: The scheduled evaluation of the next batch, or None
+    #     - _level_rates: The expected rates of the policy levels, when there is no executor
+    #     - _country_rates: The rates of the countries, when there is no executor
+    _in_flight: dict[Query, asyncio.Future]
+    _queue: list[Query]
+    _flush_handle: Optional[asyncio.TimerHandle]
+    _level_rates: dict[tuple[str, str, int], float]
+    _country_rates: dict[str, tuple[float, float]]
+
+    def __init__(self, graph: WeightedGraph, executor: Optional[ProcessPoolExecutor] = None,
+                 batch_window: float = BATCH_WINDOW,
+                 max_batch_size: int = MAX_BATCH_SIZE) -> None:
+        """Initialise a batcher answering queries from graph."""
+        self.graph = graph
+        self.executor = executor
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.requests = 0
+        self.coalesced = 0
+        self.batches = 0
+        self._in_flight = {}
+        self._queue = []
+        self._flush_handle = None
+        self._level_rates = {}
+        self._country_rates = {}
+
+    async def project(self, policies: dict[str, int], horizon: int = 365,
+                      series: bool = False) -> dict[str, Any]:
+        """Return the answer to the query for the policies (refer to evaluate_batch).
+
+        Preconditions:
+            - 0 < len(policies) <= 7
+            - 1 <= horizon
+
+        >>> g = WeightedGraph()
+        >>> g.add_vertex('c1', [100.0], [10.0], 1000000)
+        >>> g.add_vertex_restrictions('c1', 'stay-at-home', 1)
+        >>> batcher = ProjectionBatcher(g)
+        >>> async def three_queries() -> list:
+        ...     return await asyncio.gather(batcher.project({'stay-at-home': 1}, 20),
+        ...                                 batcher.project({'stay-at-home': 1}, 20),
+        ...                                 batcher.project({'stay-at-home': 2}, 20))
+        >>> [answer['total_deaths'] for answer in asyncio.run(three_queries())]
+        [156000, 156000, 156000]
+        >>> batcher.requests, batcher.coalesced, batcher.batches
+        (3, 1, 1)
+        """
+        query = (tuple(sorted(policies.items())), horizon, series)
+        self.requests += 1
+
+        if query in self._in_flight:
+            self.coalesced += 1
+        else:
+            self._in_flight[query] = asyncio.get_running_loop().create_future()
+            self._queue.append(query)
+
+            if len(self._queue) >= self.max_batch_size:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window,
+                                                                           self._flush)
+
+        # Shielded, so that a client that goes away does not cancel the answer of the others
+        return await asyncio.shield(self._in_flight[query])
+
+    def _flush(self) -> None:
+        """Start evaluating the queries waiting in the queue as one batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch = self._queue
+        self._queue = []
+        if batch != []:
+            self.batches += 1
+            asyncio.get_running_loop().create_task(self._evaluate(batch))
+
+    async def _evaluate(self, batch: list[Query]) -> None:
+        """Evaluate the batch and give every query in it its answer."""
+        try:
+            if self.executor is None:
+                answers = evaluate_batch(self.graph, batch, self._level_rates,
+                                         self._country_rates)
+            else:
+                answers = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, _evaluate_in_worker, batch)
+        except Exception as error:  # The error is given to every query of the batch instead
+            for query in batch:
+                self._in_flight.pop(query).set_exception(error)
+            return
+
+        for query, answer in zip(batch, answers):
+            self._in_flight.pop(query).set_result(answer)
+
+
+async def answer_request(batcher: ProjectionBatcher, target: str) -> tuple[int, dict]:
+    """Return the status code and the json body of the response to a GET request for target.
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [100.0], [10.0], 1000000)
+    >>> g.add_vertex_restrictions('c1', 'stay-at-home', 1)
+    >>> batcher = ProjectionBatcher(g)
+    >>> status, body = asyncio.run(answer_request(batcher, '/project?stay-at-home=1&horizon=20'))
+    >>> status, body['total_cases']
+    (200, 15600000)
+    >>> asyncio.run(answer_request(batcher, '/project?stay-at-home=7'))
+    (400, {'error': 'stay-at-home must be a level between 0 and 3'})
+    """
+    url = urllib.parse.urlsplit(target)
+    query = urllib.parse.parse_qs(url.query)
+
+    if url.path == '/stats':
+        return (200, {'requests': batcher.requests, 'coalesced': batcher.coalesced,
+                      'batches': batcher.batches})
+    elif url.path != '/project':
+        return (404, {'error': 'not found'})
+
+    try:
+        series = query.pop('series', ['0'])[0] == '1'
+        horizon = int(query.get('horizon', ['365'])[0])
+        if not 1 <= horizon <= MAX_HORIZON:
+            raise ValueError('horizon must be between 1 and ' + str(MAX_HORIZON))
+        policies = parse_policies(query)
+    except ValueError as error:
+        return (400, {'error': str(error)})
+
+    return (200, await batcher.project(policies, horizon, series))
+
+
+async def handle_connection(batcher: ProjectionBatcher, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+    """Answer the HTTP/1.1 GET requests sent on a connection, until the client closes it or
+    asks for it to be closed.
+
+    A request whose batch could not be evaluated, e.g. because a worker process failed, is
+    answered with status 500 and the error, rather than by closing the connection.
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [100.0], [10.0], 1000000)
+    >>> g.add_vertex_restrictions('c1', 'stay-at-home', 1)
+    >>> executor = ProcessPoolExecutor(1)
+    >>> executor.shutdown()  # Every batch given to it fails
+    >>> async def ask(batcher: ProjectionBatcher, target: str) -> bytes:
+    ...     server = await asyncio.start_server(
+    ...         lambda reader, writer: handle_connection(batcher, reader, writer), '127.0.0.1', 0)
+    ...     reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+    ...     writer.write(('GET ' + target + ' HTTP/1.1\\r\\nConnection: close\\r\\n'
+    ...                   '\\r\\n').encode())
+    ...     reply = await reader.read()
+    ...     writer.close()
+    ...     server.close()
+    ...     return reply
+    >>> reply = asyncio.run(ask(ProjectionBatcher(g, executor), '/project?stay-at-home=1'))
+    >>> reply.split(b'\\r\\n')[0], json.loads(reply.split(b'\\r\\n\\r\\n')[1])['error'][:12]
+    (b'HTTP/1.1 500 Internal Server Error', 'RuntimeError')
+    """
+    try:
+        while True:
+            request_line = await reader.readline()
+            if request_line == b'':
+                break
+
+            headers = {}
+            line = await reader.readline()
+            while line not in [b'\r\n', b'\n', b'']:
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip().lower()
+                line = await reader.readline()
+
+            parts = request_line.decode('latin-1').split()
+            if len(parts) != 3 or parts[0] != 'GET':
+                status, body = (405, {'error': 'only GET requests are answered'})
+            else:
+                try:
+                    status, body = await answer_request(batcher, parts[1])
+                except Exception as error:  # Answered, so the client is not left without one
+                    traceback.print_exc()
+                    status, body = (500, {'error': type(error).__name__ + ': ' + str(error)})
+
+            content = json.dumps(body).encode()
+            writer.write(('HTTP/1.1 ' + str(status) + ' ' + _REASONS[status] + '\r\n'
+                          'Content-Type: application/json\r\n'
+                          'Content-Length: ' + str(len(content)) + '\r\n\r\n').encode()
+                         + content)
+            await writer.drain()
+
+            if headers.get('connection') == 'close':
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+# The reason phrases of the status codes that the service responds with
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            500: 'Internal Server Error'}
+
+
+async def serve(graph: WeightedGraph, host: str = '127.0.0.1', port: int = 8060,
+                processes: Optional[int] = None, batch_window: float = BATCH_WINDOW,
+                level_rates: Optional[dict[tuple[str, str, int], float]] = None) -> None:
+    """Serve projection queries for graph on host and port until cancelled, evaluating the
+    batches across the given number of worker processes (all CPUs if processes is None).
+
+    Every worker starts with the expected rates of the policy levels in level_rates (refer to
+    optimizer.get_level_rates), and computes the rates of any other level the first time a
+    query needs it.
+
+    Preconditions:
+        - processes is None or processes >= 1
+        - batch_window >= 0
+    """
+    with ProcessPoolExecutor(processes, initializer=_init_service_worker,
+                             initargs=(graph, level_rates or {})) as executor:
+        # Start the workers before any connection is accepted, so that a worker forked from
+        # this process never inherits the socket of a connection and keeps it open
+        await asyncio.get_running_loop().run_in_executor(executor, int)
+
+        batcher = ProjectionBatcher(graph, executor, batch_window)
+        server = await asyncio.start_server(
+            lambda reader, writer: handle_connection(batcher, reader, writer), host, port)
+
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve projection queries over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8060)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--batch-window', type=float, default=BATCH_WINDOW)
+    parser.add_argument('--lazy', action='store_true',
+                        help='compute the rates of each policy level when first needed, '
+                             'instead of all of them before serving')
+    arguments = parser.parse_args()
+
+    with open('datasets/saved_graph', 'rb') as infile:
+        real_graph = pickle.load(infile)
+
+    if arguments.lazy:
+        real_level_rates = {}
+    else:
+        print('Computing the expected rates of every policy level...')
+        real_level_rates = get_level_rates(real_graph, arguments.processes)
+
+    print('Serving projections on http://' + arguments.host + ':' + str(arguments.port))
+    asyncio.run(serve(real_graph, arguments.host, arguments.port, arguments.processes,
+                      arguments.batch_window, real_level_rates))
@@ -0,0 +1,248 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains functions that measure how sensitive the projected
+cases and deaths of a set of policies are to each policy, by moving each policy
+one level down and one level up.
+
+Every neighbouring scenario is evaluated in one batch: the traversals of every
+(policy, level) involved are done once, and the countries with exactly the
+policies of each scenario are found from shared bitmaps.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from classes import WeightedGraph
+from computations import exact_policies_from_bitmaps, get_average, get_policy_bitmaps, \
+    get_upper_limit
+from export import get_scenario_name, output_figure
+from optimizer import get_level_rates
+from predictions import WORLD_POPULATION, batch_prediction_columns
+
+
+def get_neighbouring_scenarios(policies: dict[str, int]) -> list[tuple[str, int, dict[str, int]]]:
+    """Return every scenario that moves exactly one policy in policies one level down or up,
+    in the form of (policy, change, scenario), where change is -1 or 1. Levels below 0 or
+    above the maximum level of the policy are left out.
+
+    >>> get_neighbouring_scenarios({'public-events-cancellation': 2, 'stay-at-home': 0})
+    [('public-events-cancellation', -1, {'public-events-cancellation': 1, 'stay-at-home': 0}), \
+('stay-at-home', 1, {'public-events-cancellation': 2, 'stay-at-home': 1})]
+    """
+    scenarios = []
+
+    for policy in policies:
+        for change in [-1, 1]:
+            level = policies[policy] + change
+            if 0 <= level < get_upper_limit(policy):
+                scenarios.append((policy, change, {**policies, policy: level}))
+
+    return scenarios
+
+
+def get_scenario_rates(graph: WeightedGraph, scenarios: list[dict[str, int]],
+                       processes: Optional[int] = None,
+                       level_rates: Optional[dict[tuple[str, str, int], float]] = None,
+                       country_rates: Optional[dict[str, tuple[float, float]]] = None) \
+        -> tuple[np.ndarray, np.ndarray]:
+    """Return the daily new cases and deaths rates (per person) of every scenario, in the form
+    of (case rates, death rates).
+
+    A scenario that some country has exactly uses the exact averages of those countries, like
+    get_total_average_case_growth. Every other scenario uses the average of the expected rates
+    of its policy levels (refer to optimizer.get_level_rates), so the rates do not depend on
+    the random start vertices, and the traversals of a (policy, level) shared by many scenarios
+    are only done once.
+
+    If level_rates is given, the expected rates in it are used, and the rates of any other
+    level that is needed are computed and added to it, so that it can be passed again later.
+    In the same way, country_rates maps each country to its own (case rate, death rate), and
+    each country is only averaged once even when many scenarios match it exactly.
+
+    Preconditions:
+        - scenarios != []
+        - all(0 < len(policies) <= 7 for policies in scenarios)
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [100.0], [10.0], 1000000)
+    >>> g.add_vertex_restrictions('c1', 'stay-at-home', 1)
+    >>> rates = {}
+    >>> cases, deaths = get_scenario_rates(g, [{'stay-at-home': 1}, {'stay-at-home': 2}], 1, rates)
+    >>> cases.tolist(), sorted(rates)
+    ([0.0001, 0.0001], [('cases', 'stay-at-home', 2), ('deaths', 'stay-at-home', 2)])
+    """
+    countries, bitmaps = get_policy_bitmaps(graph)
+    matches = [exact_policies_from_bitmaps(countries, bitmaps, policies) for policies in scenarios]
+
+    if level_rates is None:
+        level_rates = {}
+    if country_rates is None:
+        country_rates = {}
+
+    levels = {(policy, policies[policy]) for policies, exact in zip(scenarios, matches)
+              if exact == [] for policy in policies
+              if ('cases', policy, policies[policy]) not in level_rates}
+    if levels != set():
+        level_rates.update(get_level_rates(graph, processes, sorted(levels)))
+
+    vertices = graph.get_all_vertices()
+    case_rates = []
+    death_rates = []
+    for policies, exact in zip(scenarios, matches):
+        if exact != []:
+            # The same averages as get_exact_case_average and get_exact_deaths_average
+            for country in exact:
+                if country not in country_rates:
+                    vertex = vertices[country]
+                    country_rates[country] = (get_average(vertex.new_cases) / vertex.population,
+                                              get_average(vertex.new_deaths) / vertex.population)
+            case_rates.append(get_average([country_rates[country][0] for country in exact]))
+            death_rates.append(get_average([country_rates[country][1] for country in exact]))
+        else:
+            case_rates.append(get_average([level_rates[('cases', policy, policies[policy])]
+                                           for policy in policies]))
+            death_rates.append(get_average([level_rates[('deaths', policy, policies[policy])]
+                                            for policy in policies]))
+
+    return (np.array(case_rates), np.array(death_rates))
+
+
+def project_scenarios(graph: WeightedGraph, scenarios: list[dict[str, int]],
+                      processes: Optional[int] = None, horizon: int = 365) \
+        -> tuple[np.ndarray, np.ndarray]:
+    """Return the projected total cases and deaths after horizon days for every scenario, in
+    the form of (cases, deaths). The daily rates of the scenarios are computed in one batch by
+    get_scenario_rates.
+
+    Preconditions:
+        - scenarios != []
+        - all(0 < len(policies) <= 7 for policies in scenarios)
+        - horizon >= 1
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [100.0], [10.0], 1000000)
+    >>> g.add_vertex_restrictions('c1', 'stay-at-home', 1)
+    >>> cases, deaths = project_scenarios(g, [{'stay-at-home': 1}, {'stay-at-home': 2}], 1, 20)
+    >>> cases.tolist(), deaths.tolist()
+    ([15600000, 15600000], [156000, 156000])
+    """
+    case_rates, death_rates = get_scenario_rates(graph, scenarios, processes)
+
+    columns = batch_prediction_columns(
+        np.rint(WORLD_POPULATION * case_rates).astype(np.int64),
+        np.rint(WORLD_POPULATION * death_rates).astype(np.int64), horizon)
+
+    return (columns['Total_Cases'][-1], columns['Total_Deaths'][-1])
+
+
+def sensitivity_analysis(graph: WeightedGraph, policies: dict[str, int],
+                         processes: Optional[int] = None) -> pd.DataFrame:
+    """Return the effect of moving each policy in policies one level down or up on the
+    projected cases and deaths after a year, in the form of a pandas dataframe with one row
+    per neighbouring scenario (refer to get_neighbouring_scenarios):
+
+    Policy       | Change | Level | Cases | Deaths | Cases_Difference | Deaths_Difference
+    -------------------------------------------------------------------------------------
+    stay-at-home | -1     | 0     | 1000  | 100    | 200              | -10
+
+    The differences are relative to the projections of policies themselves. Every scenario,
+    including policies, is projected in one batch by project_scenarios.
+
+    Preconditions:
+        - 0 < len(policies) <= 7
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [100.0], [10.0], 1000000)
+    >>> g.add_vertex('c2', [200.0], [10.0], 1000000)
+    >>> g.add_vertex_restrictions('c1', 'stay-at-home', 1)
+    >>> g.add_vertex_restrictions('c2', 'stay-at-home', 2)
+    >>> table = sensitivity_analysis(g, {'stay-at-home': 1}, 1)
+    >>> table[['Policy', 'Change', 'Level', 'Cases_Difference']].values.tolist()
+    [['stay-at-home', -1, 0, 0], ['stay-at-home', 1, 2, 284700000]]
+    """
+    neighbours = get_neighbouring_scenarios(policies)
+    cases, deaths = project_scenarios(graph, [policies] + [item[2] for item in neighbours],
+                                      processes)
+
+    return pd.DataFrame({
+        'Policy': [policy for policy, _, _ in neighbours],
+        'Change': [change for _, change, _ in neighbours],
+        'Level': [scenario[policy] for policy, _, scenario in neighbours],
+        'Cases': cases[1:],
+        'Deaths': deaths[1:],
+        'Cases_Difference': cases[1:] - cases[0],
+        'Deaths_Difference': deaths[1:] - deaths[0]
+    })
+
+
+def plot_tornado(graph: WeightedGraph, policies: dict[str, int], category: str = 'Deaths',
+                 processes: Optional[int] = None, output_dir: Optional[str] = None,
+                 file_format: str = 'html') -> Optional[str]:
+    """Plot the sensitivity analysis of policies (refer to sensitivity_analysis) to a tornado
+    chart: one horizontal bar for each policy moved one level down and one for each policy
+    moved one level up, showing the difference in the projected cases or deaths (specified by
+    the category argument). The policies with the largest effect are at the top.
+
+    If output_dir is given, write the chart to a file in output_dir instead of showing it, and
+    return its path (refer to export.output_figure).
+
+    Preconditions:
+        - 0 < len(policies) <= 7
+        - category in ['Cases', 'Deaths']
+        - file_format in export.FILE_FORMATS
+    """
+    table = sensitivity_analysis(graph, policies, processes)
+    difference = category + '_Difference'
+
+    effect = table.groupby('Policy')[difference].apply(lambda values: values.abs().max())
+    order = list(effect.sort_values().index)
+
+    fig = go.Figure()
+    for change, name, colour in [(-1, 'One Level Down', 'rgb(99, 110, 250)'),
+                                 (1, 'One Level Up', 'rgb(239, 85, 59)')]:
+        rows = table[table['Change'] == change]
+        fig.add_trace(go.Bar(x=rows[difference], y=rows['Policy'], orientation='h',
+                             name=name, marker_color=colour))
+
+    fig.update_layout(title='Change in Projected ' + category + ' After 1 Year When Moving '
+                            'Each Policy One Level',
+                      barmode='overlay',
+                      xaxis_title='Difference in Total Number of ' + category,
+                      yaxis=dict(categoryorder='array', categoryarray=order))
+
+    return output_figure(fig, get_scenario_name(policies, 'sensitivity'), output_dir,
+                         file_format)
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['numpy', 'pandas', 'plotly.graph_objects', 'classes', 'computations',
+                          'export', 'optimizer', 'predictions']
+    })
@@ -0,0 +1,456 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains a frozen, read-only snapshot of a WeightedGraph held in
+shared memory, for computations spread across worker processes.
+
+A worker process given a WeightedGraph receives a pickled copy of every vertex, with all
+the references between them. Instead, freeze_graph copies the graph once into a single
+block of shared memory, laid out as arrays:
+    - the vertex table: the name and population of each country,
+    - the level of each policy of each country,
+    - the edges in compressed sparse row (CSR) form, with their weights,
+    - the time series of new cases and deaths, one after the other.
+Another process attaches to the block by its name (refer to attach_graph) and reads the
+same memory, without copying it. A SharedGraph is pickled as its name only.
+
+The traversals of the computations module run directly against the arrays (refer to
+SharedGraph.get_start_growth_rate), and visit the vertices in the same order.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+from __future__ import annotations
+import statistics
+from multiprocessing import shared_memory
+from typing import Any, Optional
+
+import numpy as np
+
+import instrumentation
+from classes import WeightedGraph
+from computations import ALL_POLICIES, get_upper_limit
+
+# The version of the layout of the block, stored in its header
+LAYOUT_VERSION = 1
+
+# The number of int64 in the header of the block: the version of the layout, the number of
+# vertices, edges (counted at both ends), numbers of new cases and new deaths, and the bytes
+# of the names of the countries
+HEADER_LENGTH = 6
+
+# The level stored for a policy of a country with no known level
+NO_LEVEL = -1
+
+
+def _get_layout(header: list[int]) -> list[tuple[str, type, int]]:
+    """Return the (name, dtype, length) of each array in a block with the given header, in
+    the order they are stored.
+
+    >>> [(name, length) for name, _, length in _get_layout([1, 2, 2, 3, 3, 5])][:3]
+    [('populations', 2), ('levels', 14), ('indptr', 3)]
+    """
+    _, num_vertices, num_edges, num_cases, num_deaths, num_name_bytes = header
+
+    return [('populations', np.int64, num_vertices),
+            ('levels', np.int8, len(ALL_POLICIES) * num_vertices),
+            ('indptr', np.int64, num_vertices + 1),
+            ('indices', np.int32, num_edges),
+            ('weights', np.float64, num_edges),
+            ('case_rates', np.float64, num_vertices),
+            ('death_rates', np.float64, num_vertices),
+            ('case_offsets', np.int64, num_vertices + 1),
+            ('new_cases', np.float64, num_cases),
+            ('death_offsets', np.int64, num_vertices + 1),
+            ('new_deaths', np.float64, num_deaths),
+            ('name_offsets', np.int64, num_vertices + 1),
+            ('names', np.uint8, num_name_bytes)]
+
+
+def _get_offsets(header: list[int]) -> tuple[dict[str, int], int]:
+    """Return the byte offset of each array in a block with the given header, and the size of
+    the block. Every array starts at a multiple of 8 bytes."""
+    offsets = {}
+    position = HEADER_LENGTH * 8
+
+    for name, dtype, length in _get_layout(header):
+        offsets[name] = position
+        position += -(-length * np.dtype(dtype).itemsize // 8) * 8
+
+    return (offsets, position)
+
+
+class SharedGraph:
+    """A frozen, read-only snapshot of a WeightedGraph in a block of shared memory.
+
+    The i-th vertex is the i-th country of the graph, in the order of
+    WeightedGraph.get_all_vertices.
+
+    Instance Attributes:
+        - name: The name of the block of shared memory
+        - countries: The name of each country
+        - populations: The population of each country
+        - levels: The level of each policy of each country, where levels[p, i] is the level of
+                  ALL_POLICIES[p] of the i-th country, or NO_LEVEL if it is not known
+        - indptr: The neighbours of the i-th country are at indptr[i]:indptr[i + 1] in indices
+        - indices: The neighbours of each country, in the order of its similar_policies
+        - weights: The weight of the edge to each neighbour in indices
+        - case_rates: The average daily new cases of each country over its population
+        - death_rates: The average daily new deaths of each country over its population
+        - case_offsets: The new cases of the i-th country are at
+                        case_offsets[i]:case_offsets[i + 1] in new_cases
+        - new_cases: The new cases of every country, one after the other
+        - death_offsets: The new deaths of the i-th country are at
+                         death_offsets[i]:death_offsets[i + 1] in new_deaths
+        - new_deaths: The new deaths of every country, one after the other
+
+    Representation Invariants:
+        - len(self.countries) == len(self.populations) == len(self.indptr) - 1
+        - all(0 < weight <= 1 for weight in self.weights)
+    """
+    name: str
+    countries: list[str]
+    populations: np.ndarray
+    levels: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    weights: np.ndarray
+    case_rates: np.ndarray
+    death_rates: np.ndarray
+    case_offsets: np.ndarray
+    new_cases: np.ndarray
+    death_offsets: np.ndarray
+    new_deaths: np.ndarray
+
+    # Private Instance Attributes:
+    #     - _memory: The block of shared memory holding the arrays
+    #     - _index: Maps the name of each country to its index
+    _memory: shared_memory.SharedMemory
+    _index: dict[str, int]
+
+    def __init__(self, memory: shared_memory.SharedMemory) -> None:
+        """Initialise the snapshot held in memory, written by freeze_graph. The arrays are
+        views of memory, and cannot be modified.
+        """
+        self._memory = memory
+        self.name = memory.name
+
+        header = np.ndarray(HEADER_LENGTH, np.int64, memory.buf).tolist()
+        if header[0] != LAYOUT_VERSION:
+            raise ValueError(memory.name + ' does not hold a graph snapshot of version '
+                             + str(LAYOUT_VERSION))
+
+        offsets, _ = _get_offsets(header)
+        arrays = {}
+        for name, dtype, length in _get_layout(header):
+            arrays[name] = np.ndarray(length, dtype, memory.buf, offsets[name])
+            arrays[name].flags.writeable = False
+
+        self.populations = arrays['populations']
+        self.levels = arrays['levels'].reshape(len(ALL_POLICIES), header[1])
+        self.indptr = arrays['indptr']
+        self.indices = arrays['indices']
+        self.weights = arrays['weights']
+        self.case_rates = arrays['case_rates']
+        self.death_rates = arrays['death_rates']
+        self.case_offsets = arrays['case_offsets']
+        self.new_cases = arrays['new_cases']
+        self.death_offsets = arrays['death_offsets']
+        self.new_deaths = arrays['new_deaths']
+
+        names = arrays['names'].tobytes()
+        name_offsets = arrays['name_offsets'].tolist()
+        self.countries = [names[name_offsets[i]:name_offsets[i + 1]].decode()
+                          for i in range(header[1])]
+        self._index = {country: i for i, country in enumerate(self.countries)}
+
+    def __reduce__(self) -> tuple[Any, tuple[str]]:
+        """Pickle the snapshot as its name, so that it is attached to rather than copied."""
+        return (attach_graph, (self.name,))
+
+    def get_nbytes(self) -> int:
+        """Return the size of the block of shared memory in bytes."""
+        return self._memory.size
+
+    def get_neighbours(self, country: str) -> dict[str, float]:
+        """Return the neighbours of country and the weights of their edges, in the same order
+        as the similar_policies of its vertex.
+
+        Preconditions:
+            - country in self.countries
+        """
+        i = self._index[country]
+        start, end = self.indptr[i], self.indptr[i + 1]
+
+        return {self.countries[j]: weight for j, weight
+                in zip(self.indices[start:end].tolist(), self.weights[start:end].tolist())}
+
+    def get_time_series(self, country: str) -> tuple[np.ndarray, np.ndarray]:
+        """Return the daily new cases and new deaths of country, as read-only views of the
+        shared memory.
+
+        Preconditions:
+            - country in self.countries
+        """
+        i = self._index[country]
+
+        return (self.new_cases[self.case_offsets[i]:self.case_offsets[i + 1]],
+                self.new_deaths[self.death_offsets[i]:self.death_offsets[i + 1]])
+
+    def get_start_countries(self, policy: str, level: int) -> list[str]:
+        """Return the countries with the level of the policy, in the same order as
+        computations.get_start_countries.
+
+        Preconditions:
+            - policy in ALL_POLICIES
+        """
+        matches = np.flatnonzero(self.levels[ALL_POLICIES.index(policy)] == level)
+
+        return [self.countries[i] for i in matches.tolist()]
+
+    def get_start_growth_rate(self, category: str, policy: str, level: int,
+                              country: Optional[str]) -> float:
+        """Return the same rate as computations.get_start_growth_rate for the graph this is a
+        snapshot of, traversing the arrays instead of the vertices.
+
+        If country is None, the traversal starts from the last country with the level of the
+        policy. If no country has it, the rates of the nearest levels below and above are
+        averaged, as in computations._get_new_cases_special.
+
+        Preconditions:
+            - category in ['cases', 'deaths']
+            - policy in ALL_POLICIES
+            - country is None or country in self.countries
+
+        >>> g = WeightedGraph()
+        >>> g.add_vertex('c1', [0.1], [0.2], 10000)
+        >>> g.add_vertex('c2', [0.3], [0.2], 10000)
+        >>> g.add_vertex_restrictions('c1', 'face-covering-policies', 2)
+        >>> g.add_vertex_restrictions('c2', 'face-covering-policies', 2)
+        >>> g.find_and_add_edge('c1')
+        >>> shared = freeze_graph(g)
+        >>> shared.get_start_growth_rate('cases', 'face-covering-policies', 2, 'c1') \\
+        ...     == statistics.mean([0.3 / 10000 * 1 / 7, 0.1 / 10000])
+        True
+        >>> shared.get_start_growth_rate('deaths', 'face-covering-policies', 0, None) \\
+        ...     == statistics.mean([0.2 / 10000 * 1 / 7, 0.2 / 10000])
+        True
+        >>> shared.close()
+        >>> shared.unlink()
+        """
+        column = ALL_POLICIES.index(policy)
+
+        if country is not None:
+            start = self._index[country]
+        else:
+            matches = np.flatnonzero(self.levels[column] == level)
+            if len(matches) == 0:
+                return self._get_nearest_levels_rate(category, policy, level)
+            start = int(matches[-1])
+
+        rates = self.case_rates if category == 'cases' else self.death_rates
+        averages = self._traverse(start, column, level, rates)
+        averages.append(float(rates[start]))
+
+        return float(statistics.mean(averages))
+
+    def _traverse(self, start: int, column: int, level: int, rates: np.ndarray) -> list[float]:
+        """Return the rates collected by a depth-first traversal from the start vertex through
+        the vertices with the level of ALL_POLICIES[column], in the same order as
+        _WeightedVertex.get_neighbour_averages_cases. Each vertex reached contributes its rate
+        times the weight of the edge it was reached through.
+
+        The neighbours of the start vertex contribute their rate from rates, and every other
+        vertex its rate of new cases, as _WeightedVertex.get_neighbour_averages_deaths
+        continues the traversal with get_neighbour_averages_cases.
+        """
+        # Memoryviews of the arrays index to Python numbers, which is much faster than numpy
+        indptr, indices, weights = self.indptr.data, self.indices.data, self.weights.data
+        levels = self.levels[column].data
+        first_rates, case_rates = rates.data, self.case_rates.data
+
+        visited = {start}
+        averages = []
+        # The edges left to follow from each vertex being traversed, deepest last. Following an
+        # edge to a new vertex pauses the iterator of its vertex until the new one is done.
+        stack = [zip(indices[indptr[start]:indptr[start + 1]],
+                     weights[indptr[start]:indptr[start + 1]])]
+
+        while stack != []:
+            for neighbour, weight in stack[-1]:
+                if neighbour not in visited and levels[neighbour] == level:
+                    vertex_rates = first_rates if len(stack) == 1 else case_rates
+                    averages.append(vertex_rates[neighbour] * weight)
+                    visited.add(neighbour)
+                    stack.append(zip(indices[indptr[neighbour]:indptr[neighbour + 1]],
+                                     weights[indptr[neighbour]:indptr[neighbour + 1]]))
+                    break
+            else:
+                stack.pop()
+
+        instrumentation.observe('shared_graph.vertices_visited_per_traversal', len(visited))
+
+        return averages
+
+    def _get_nearest_levels_rate(self, category: str, policy: str, level: int) -> float:
+        """Return the average of the rates of the nearest levels of the policy below and above
+        level that some country has, or the rate of the only one of them that exists, as in
+        computations._get_new_cases_special."""
+        instrumentation.count('shared_graph.fallback_level_searches')
+        available = set(self.levels[ALL_POLICIES.index(policy)].tolist())
+
+        lower = level
+        while lower >= 0 and lower not in available:
+            lower -= 1
+
+        upper_limit = get_upper_limit(policy)
+
+        higher = level
+        while higher <= upper_limit and higher not in available:
+            higher += 1
+
+        if lower == -1:
+            return self.get_start_growth_rate(category, policy, higher, None)
+        elif higher > upper_limit:
+            return self.get_start_growth_rate(category, policy, lower, None)
+        else:
+            lower_bound = self.get_start_growth_rate(category, policy, lower, None)
+            upper_bound = self.get_start_growth_rate(category, policy, higher, None)
+            return float(statistics.mean([upper_bound, lower_bound]))
+
+    def close(self) -> None:
+        """Detach this process from the shared memory. The arrays cannot be used afterwards."""
+        for name in ['populations', 'levels', 'indptr', 'indices', 'weights', 'case_rates',
+                     'death_rates', 'case_offsets', 'new_cases', 'death_offsets', 'new_deaths']:
+            delattr(self, name)
+        self._memory.close()
+
+    def unlink(self) -> None:
+        """Free the shared memory once every process has closed it. Only the process that
+        froze the graph should call this."""
+        self._memory.unlink()
+
+
+@instrumentation.timed
+def freeze_graph(graph: WeightedGraph) -> SharedGraph:
+    """Return a snapshot of graph in a new block of shared memory. The process that calls this
+    owns the block, and should close and unlink the snapshot once it is no longer needed.
+
+    The average daily new cases and deaths of each country over its population are computed
+    once here, the same way as the traversals of the computations module compute them.
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [1.0, 3.0], [0.0, 1.0], 1000)
+    >>> g.add_vertex('c2', [2.0], [0.0], 1000)
+    >>> g.add_vertex_restrictions('c1', 'stay-at-home', 1)
+    >>> g.add_vertex_restrictions('c2', 'stay-at-home', 1)
+    >>> g.find_and_add_edge('c1')
+    >>> shared = freeze_graph(g)
+    >>> shared.countries, shared.get_neighbours('c1')
+    (['c1', 'c2'], {'c2': 0.14285714285714285})
+    >>> shared.get_time_series('c1')[0].tolist(), shared.levels[4].tolist()
+    ([1.0, 3.0], [1, 1])
+    >>> shared.close()
+    >>> shared.unlink()
+    """
+    vertices = graph.get_all_vertices()
+    countries = list(vertices)
+    index = {country: i for i, country in enumerate(countries)}
+    num_vertices = len(countries)
+
+    levels = np.full((len(ALL_POLICIES), num_vertices), NO_LEVEL, dtype=np.int8)
+    indptr, neighbours, weights = [0], [], []
+    case_offsets, death_offsets, name_offsets = [0], [0], [0]
+    case_rates, death_rates = [], []
+
+    for i, country in enumerate(countries):
+        vertex = vertices[country]
+
+        for p, policy in enumerate(ALL_POLICIES):
+            level = vertex.restrictions_level.get(policy, '')
+            if level != '':
+                levels[p, i] = level
+
+        neighbours.extend(index[neighbour.country_name] for neighbour in vertex.similar_policies)
+        weights.extend(vertex.similar_policies.values())
+        indptr.append(len(neighbours))
+
+        case_offsets.append(case_offsets[-1] + len(vertex.new_cases))
+        death_offsets.append(death_offsets[-1] + len(vertex.new_deaths))
+        name_offsets.append(name_offsets[-1] + len(country.encode()))
+        case_rates.append(float(statistics.mean(vertex.new_cases)) / vertex.population)
+        death_rates.append(float(statistics.mean(vertex.new_deaths)) / vertex.population)
+
+    names = ''.join(countries).encode()
+    header = [LAYOUT_VERSION, num_vertices, len(neighbours), case_offsets[-1],
+              death_offsets[-1], len(names)]
+    offsets, size = _get_offsets(header)
+
+    memory = shared_memory.SharedMemory(create=True, size=size)
+    np.ndarray(HEADER_LENGTH, np.int64, memory.buf)[:] = header
+
+    values = {'populations': [vertex.population for vertex in vertices.values()],
+              'levels': levels.ravel(),
+              'indptr': indptr,
+              'indices': neighbours,
+              'weights': weights,
+              'case_rates': case_rates,
+              'death_rates': death_rates,
+              'case_offsets': case_offsets,
+              'new_cases': [value for vertex in vertices.values() for value in vertex.new_cases],
+              'death_offsets': death_offsets,
+              'new_deaths': [value for vertex in vertices.values()
+                             for value in vertex.new_deaths],
+              'name_offsets': name_offsets,
+              'names': np.frombuffer(names, np.uint8)}
+
+    for name, dtype, length in _get_layout(header):
+        np.ndarray(length, dtype, memory.buf, offsets[name])[:] = values[name]
+
+    return SharedGraph(memory)
+
+
+def attach_graph(name: str) -> SharedGraph:
+    """Return the snapshot in the block of shared memory called name, written by freeze_graph
+    in this or another process. The arrays are read from the block without copying them.
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [0.1], [0.1], 10000)
+    >>> g.add_vertex('Curaçao', [0.1], [0.1], 10000)
+    >>> shared = freeze_graph(g)
+    >>> attached = attach_graph(shared.name)
+    >>> attached.countries, attached.populations.tolist()
+    (['c1', 'Curaçao'], [10000, 10000])
+    >>> attached.close()
+    >>> shared.close()
+    >>> shared.unlink()
+    """
+    return SharedGraph(shared_memory.SharedMemory(name))
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['statistics', 'multiprocessing', 'numpy', 'instrumentation',
+                          'classes', 'computations']
+    })
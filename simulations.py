@@ -19,14 +19,20 @@ are expressly prohibited.
 
 This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
 """
+from typing import Optional
+
 import pandas as pd
 import plotly.graph_objects as go
 
+import instrumentation
 from classes import WeightedGraph
-from computations import get_total_average_case_growth, get_total_average_deaths_growth
+from export import get_scenario_name, output_figure
+from predictions import get_daily_counts, prediction_columns
 
 
-def create_predictions(graph: WeightedGraph, policies: dict[str, int]) -> pd.DataFrame:
+@instrumentation.timed
+def create_predictions(graph: WeightedGraph, policies: dict[str, int],
+                       horizon: Optional[int] = None) -> pd.DataFrame:
     """Create predictions of the total number of daily cases and deaths based on
     the given policies. The result is returned in the form of a pandas dataframe:
 
@@ -44,45 +50,16 @@ def create_predictions(graph: WeightedGraph, policies: dict[str, int]) -> pd.Dat
     so the dataframe row ends as soon as all 7.8 billion people die. Note that this simulation
     only consider linear growth of number of cases and deaths, which may not be represent the
     real life accurately.
-    """
-    average_daily_cases = get_total_average_case_growth(graph, policies)
-    daily_cases = round(7800000000 * average_daily_cases)
-    average_daily_deaths = get_total_average_deaths_growth(graph, policies)
-    daily_deaths = round(7800000000 * average_daily_deaths)
-
-    num_pop_left = 7800000000
-    num_not_contracted = 7800000000
-
-    prediction = {'Day': [], 'Total_Cases': [], 'Total_Deaths': []}
-    day = 0
-
-    while num_pop_left > 0:
-        day += 1
-        prediction['Day'].append(day)
-
-        if num_not_contracted > 0:
-            cumulative_cases = cumulative_cases_deaths('cases', prediction, daily_cases)
-
-            if num_not_contracted <= daily_cases:
-                prediction['Total_Cases'].append(num_not_contracted + prediction['Total_Cases'][-1])
-                num_not_contracted -= num_not_contracted
-            else:
-                prediction['Total_Cases'].append(cumulative_cases)
-                num_not_contracted -= daily_cases
-        else:
-            prediction['Total_Cases'].append(prediction['Total_Cases'][-1])
 
-        if prediction['Day'][-1] >= 19:
-            cumulative_deaths = cumulative_cases_deaths('deaths', prediction, daily_deaths)
+    If horizon is given, only the first horizon days are computed (or fewer, if all 7.8 billion
+    people die before then). Refer to predictions.prediction_columns for how each column is
+    computed.
 
-            if num_pop_left < daily_deaths:
-                prediction['Total_Deaths'].append(num_pop_left + prediction['Total_Deaths'][-1])
-                num_pop_left -= num_pop_left
-            else:
-                prediction['Total_Deaths'].append(cumulative_deaths)
-                num_pop_left -= daily_deaths
-        else:
-            prediction['Total_Deaths'].append(0)
+    Preconditions:
+        - horizon is None or horizon >= 0
+    """
+    daily_cases, daily_deaths = get_daily_counts(graph, policies)
+    prediction = prediction_columns(daily_cases, daily_deaths, horizon)
 
     dataframe = pd.DataFrame(prediction, columns=['Day', 'Total_Cases', 'Total_Deaths'])
     return dataframe
@@ -118,23 +95,70 @@ def cumulative_cases_deaths(category: str, prediction: [str, list], daily_averag
             return daily_average + prediction['Total_Deaths'][-1]
 
 
-def plot_simulation(graph: WeightedGraph, policies: dict[str, int]) -> None:
-    """Plot the simulation to an animated line graph."""
-    data = create_predictions(graph, policies)
-    dataframe = data[data['Day'] < 366]
+def plot_simulation(graph: WeightedGraph, policies: dict[str, int], horizon: int = 365,
+                    animation: str = 'range', frame_stride: int = 1,
+                    output_dir: Optional[str] = None, file_format: str = 'html') \
+        -> Optional[str]:
+    """Plot the simulation for the given number of days to an animated line graph.
+
+    The animation argument chooses how the lines are animated (refer to get_animation_frames).
+    frame_stride is the number of days between two frames of the animation.
+
+    If output_dir is given, write the graph to a file in output_dir instead of showing it, and
+    return its path (refer to export.output_figure).
+
+    Preconditions:
+        - horizon >= 2
+        - animation in ['range', 'prefix']
+        - frame_stride >= 1
+        - file_format in export.FILE_FORMATS
+    """
+    dataframe = create_predictions(graph, policies, horizon)
+    fig = get_simulation_figure(dataframe, policies, horizon, animation, frame_stride)
+
+    return output_figure(fig, get_scenario_name(policies), output_dir, file_format)
+
+
+@instrumentation.timed
+def get_simulation_figure(dataframe: pd.DataFrame, policies: dict[str, int], horizon: int = 365,
+                          animation: str = 'range', frame_stride: int = 1) -> go.Figure:
+    """Return the animated line graph of the predictions in dataframe (refer to
+    create_predictions) for the simulation of the given policies for horizon days.
+
+    Preconditions:
+        - horizon >= 2
+        - len(dataframe) >= 1
+        - animation in ['range', 'prefix']
+        - frame_stride >= 1
+
+    >>> dataframe = pd.DataFrame(prediction_columns(10, 1, 30))
+    >>> fig = get_simulation_figure(dataframe, {'stay-at-home': 1}, 30)
+    >>> fig.layout.annotations[-2].text
+    '<b>Total Number of Cases After 30 Days: </b>300'
+    """
+    if horizon == 365:
+        period, title_period = '1 Year', 'a Year'
+    else:
+        period = title_period = str(horizon) + ' Days'
+
+    if animation == 'range':
+        init = len(dataframe)
+        x_range = [1, min(1 + frame_stride, len(dataframe))]
+    else:
+        init = 1
+        x_range = [1, horizon]
 
     fig = go.Figure(
         layout=go.Layout(
             updatemenus=[dict(type="buttons", direction="right", x=1.05, y=0.08), ],
-            xaxis=dict(range=[1, 365],
+            xaxis=dict(range=x_range,
                        autorange=False, tickwidth=2,
                        title_text="Day"),
-            yaxis=dict(range=[0, int(dataframe.loc[dataframe['Day'] == 365, 'Total_Cases'])],
+            yaxis=dict(range=[0, int(dataframe['Total_Cases'].iloc[-1])],
                        autorange=False,
                        title_text="Total Number of Cases/Deaths")
         ))
 
-    init = 1
     fig.add_trace(go.Scatter(x=dataframe.Day[:init], y=dataframe.Total_Cases[:init],
                              mode='lines',
                              name='Total Cases'))
@@ -142,12 +166,12 @@ def plot_simulation(graph: WeightedGraph, policies: dict[str, int]) -> None:
                              mode='lines',
                              name='Total Deaths'))
 
-    fig.update_layout(title='COVID-19 Simulation for a Year Based on Given Policies',
+    fig.update_layout(title='COVID-19 Simulation for ' + title_period + ' Based on Given Policies',
                       xaxis_title='Day',
                       yaxis_title='Total Number of Cases/Deaths')
 
-    num_cases = str(int(dataframe.loc[dataframe['Day'] == 365, 'Total_Cases']))
-    num_deaths = str(int(dataframe.loc[dataframe['Day'] == 365, 'Total_Deaths']))
+    num_cases = str(int(dataframe['Total_Cases'].iloc[-1]))
+    num_deaths = str(int(dataframe['Total_Deaths'].iloc[-1]))
 
     fig.update_layout(annotations=[
         dict(text=get_annotations(policies, 'face-covering-policies'), x=0, xref="paper",
@@ -164,20 +188,14 @@ def plot_simulation(graph: WeightedGraph, policies: dict[str, int]) -> None:
              y=1.045, yref="paper", align="left", showarrow=False),
         dict(text=get_annotations(policies, 'vaccination-policy'), x=0.8, xref="paper",
              y=1.075, yref="paper", align="left", showarrow=False),
-        dict(text='<b>Total Number of Cases After 1 Year: </b>' + num_cases, x=1.1, xref="paper",
-             y=1.075, yref="paper", align="left", showarrow=False),
-        dict(text='<b>Total Number of Deaths After 1 Year: </b>' + num_deaths, x=1.1, xref="paper",
-             y=1.045, yref="paper", align="left", showarrow=False)
+        dict(text='<b>Total Number of Cases After ' + period + ': </b>' + num_cases, x=1.1,
+             xref="paper", y=1.075, yref="paper", align="left", showarrow=False),
+        dict(text='<b>Total Number of Deaths After ' + period + ': </b>' + num_deaths, x=1.1,
+             xref="paper", y=1.045, yref="paper", align="left", showarrow=False)
     ])
 
     # Animation
-    fig.update(frames=[
-        go.Frame(
-            data=[
-                go.Scatter(x=dataframe.Day[:k], y=dataframe.Total_Cases[:k]),
-                go.Scatter(x=dataframe.Day[:k], y=dataframe.Total_Deaths[:k])]
-        )
-        for k in range(init, len(dataframe) + 1)])
+    fig.update(frames=get_animation_frames(dataframe, animation, frame_stride))
 
     fig.update_layout(
         updatemenus=[
@@ -188,7 +206,49 @@ def plot_simulation(graph: WeightedGraph, policies: dict[str, int]) -> None:
                          args=[None, {"frame": {"duration": 50}}])
                 ]))])
 
-    fig.show()
+    instrumentation.count('simulations.traces_emitted', len(fig.data))
+    instrumentation.count('simulations.frames_emitted', len(fig.frames))
+
+    return fig
+
+
+def get_animation_frames(dataframe: pd.DataFrame, animation: str,
+                         frame_stride: int = 1) -> list[go.Frame]:
+    """Return the frames animating the two lines of plot_simulation, with frame_stride days
+    between two frames. The last day always has a frame.
+
+    If animation is 'range', the lines already hold every day, and each frame only moves the
+    end of the x-axis range to its day, so the size of the frames grows linearly with the
+    number of days. If animation is 'prefix', each frame holds both lines up to its day,
+    so the size of the frames grows quadratically with the number of days.
+
+    Preconditions:
+        - len(dataframe) >= 1
+        - animation in ['range', 'prefix']
+        - frame_stride >= 1
+
+    >>> dataframe = pd.DataFrame(prediction_columns(10, 1, 7))
+    >>> frames = get_animation_frames(dataframe, 'range', 3)
+    >>> [frame.layout.xaxis.range for frame in frames]
+    [(1, 4), (1, 7)]
+    >>> frames = get_animation_frames(dataframe, 'prefix', 3)
+    >>> [len(frame.data[0].x) for frame in frames]
+    [1, 4, 7]
+    """
+    if animation == 'range':
+        days = list(range(1 + frame_stride, len(dataframe) + 1, frame_stride))
+    else:
+        days = list(range(1, len(dataframe) + 1, frame_stride))
+
+    if days == [] or days[-1] != len(dataframe):
+        days.append(len(dataframe))
+
+    if animation == 'range':
+        return [go.Frame(layout=dict(xaxis=dict(range=[1, k]))) for k in days]
+    else:
+        return [go.Frame(data=[go.Scatter(x=dataframe.Day[:k], y=dataframe.Total_Cases[:k]),
+                               go.Scatter(x=dataframe.Day[:k], y=dataframe.Total_Deaths[:k])])
+                for k in days]
 
 
 def get_annotations(policies: dict[str, int], policy: str) -> str:
@@ -226,5 +286,6 @@ if __name__ == '__main__':
     python_ta.check_all(config={
         'max-line-length': 100,
         'disable': ['E1136'],
-        'extra-imports': ['pandas', 'computations', 'classes', 'plotly.graph_objects']
+        'extra-imports': ['pandas', 'classes', 'export', 'instrumentation',
+                          'plotly.graph_objects', 'predictions']
     })
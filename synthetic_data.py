@@ -0,0 +1,249 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains a generator of synthetic datasets, to see how the program
+behaves with many more regions than the real datasets have. A dataset is written to a
+directory in the same layout as the datasets folder:
+    - main_data.csv, with the columns iso_code, location, date, new_cases, new_deaths and
+      population, read by init_graph.get_main_data and init_graph.get_population,
+    - a csv file for each policy, with the columns Entity, Code, Date and the level, read by
+      init_graph.get_policy_restrictions and init_graph.get_all_policy_restrictions,
+    - centroids.csv, with the columns name, Longitude and Latitude, read by
+      plot_networks.load_centroids.
+The graph of a dataset is loaded with init_graph.get_directory_graph(directory).
+
+For example, to write 10000 regions with 365 days each, where half of the regions have
+no stay-at-home requirements:
+    python synthetic_data.py cache/datasets/regions-10000 --regions 10000 --days 365 \
+        --levels stay-at-home=2,1,1,0
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import argparse
+import csv
+import datetime
+import os
+from typing import Optional
+
+import numpy as np
+
+from computations import ALL_POLICIES, get_upper_limit
+
+# The name of the column holding the level of each policy in its csv file
+POLICY_COLUMNS = {'face-covering-policies': 'facial_coverings',
+                  'public-campaigns-covid': 'public_information_campaigns',
+                  'public-events-cancellation': 'cancel_public_events',
+                  'school-workplace-closures': 'school_closures',
+                  'stay-at-home': 'stay_home_requirements',
+                  'testing-policy': 'testing_policy',
+                  'vaccination-policy': 'vaccination_policy'}
+
+# The first day of the generated datasets
+START_DATE = datetime.date(2020, 3, 1)
+
+
+def get_region_names(num_regions: int) -> list[tuple[str, str]]:
+    """Return the (code, name) of num_regions synthetic regions.
+
+    >>> get_region_names(2)
+    [('R000000', 'Region 0'), ('R000001', 'Region 1')]
+    """
+    return [('R' + str(i).zfill(6), 'Region ' + str(i)) for i in range(num_regions)]
+
+
+def get_level_weights(policy: str, weights: Optional[list[float]] = None) -> np.ndarray:
+    """Return the probabilities of each level of policy, proportional to weights (or all the
+    same if weights is None). If weights does not have a weight for every level, raise a
+    ValueError.
+
+    >>> get_level_weights('stay-at-home', [2, 1, 1, 0]).tolist()
+    [0.5, 0.25, 0.25, 0.0]
+    >>> get_level_weights('public-campaigns-covid').tolist()
+    [0.3333333333333333, 0.3333333333333333, 0.3333333333333333]
+    """
+    num_levels = get_upper_limit(policy)
+
+    if weights is None:
+        weights = [1] * num_levels
+    if len(weights) != num_levels or min(weights) < 0 or sum(weights) <= 0:
+        raise ValueError(policy + ' needs ' + str(num_levels)
+                         + ' non-negative weights, one for each level')
+
+    return np.array(weights, dtype=float) / sum(weights)
+
+
+def get_policy_timelines(rng: np.random.Generator, levels: np.ndarray, num_levels: int,
+                         num_days: int, level_changes: float) -> np.ndarray:
+    """Return the level of a policy of each region (a row) on each day (a column), where
+    levels[i] is the main level of region i.
+
+    Each region spends some stretches of days at a level next to its main level, about
+    level_changes stretches on average, which never add up to half of the days. So the
+    average level of each region still rounds to its main level, as computed by
+    init_graph.get_average_level.
+
+    >>> rng = np.random.default_rng(0)
+    >>> timelines = get_policy_timelines(rng, np.array([0, 2]), 3, 100, 3)
+    >>> timelines.shape, [round(float(row.mean())) for row in timelines]
+    ((2, 100), [0, 2])
+    """
+    timelines = np.repeat(levels[:, None], num_days, axis=1)
+    if level_changes <= 0 or num_days < 4:
+        return timelines
+
+    changes = rng.poisson(level_changes, len(levels))
+    for region in np.flatnonzero(changes):
+        # The stretches of a region together take fewer than half of the days
+        longest = max((num_days // 2 - 1) // changes[region], 1)
+        for _ in range(changes[region]):
+            length = int(rng.integers(1, longest + 1))
+            start = int(rng.integers(0, num_days - length + 1))
+            step = 1 if rng.random() < 0.5 else -1
+            if not 0 <= levels[region] + step < num_levels:
+                step = -step
+            if 0 <= levels[region] + step < num_levels:
+                timelines[region, start:start + length] = levels[region] + step
+
+    return timelines
+
+
+def generate_dataset(directory: str, num_regions: int = 1000, num_days: int = 365,
+                     level_weights: Optional[dict[str, list[float]]] = None, noise: float = 0.3,
+                     level_changes: float = 2.0, seed: int = 0) -> None:
+    """Write a synthetic dataset of num_regions regions, with num_days days of data each, to
+    directory (created if it does not exist).
+
+    Each region has a random population, a random daily rate of new cases and a random
+    fatality rate. Its daily new cases and deaths vary around its rates by the fraction
+    noise (so noise=0 gives the same numbers every day). Each region has a main level of
+    each policy, chosen with the probabilities given by level_weights[policy] (refer to
+    get_level_weights), with stretches of days at a neighbouring level (refer to
+    get_policy_timelines). The same seed always gives the same dataset.
+
+    Preconditions:
+        - num_regions >= 1
+        - num_days >= 1
+        - noise >= 0
+        - level_changes >= 0
+
+    >>> import tempfile
+    >>> import init_graph
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     generate_dataset(directory, 20, 30, {'stay-at-home': [0, 0, 1, 0]})
+    ...     g = init_graph.get_directory_graph(directory)
+    ...     sorted(os.listdir(directory))[:3]
+    ['centroids.csv', 'face-covering-policies.csv', 'main_data.csv']
+    >>> len(g.get_all_vertices()), len(g.get_all_vertices()['Region 0'].new_cases)
+    (20, 30)
+    >>> {v.restrictions_level['stay-at-home'] for v in g.get_all_vertices().values()}
+    {2}
+    """
+    rng = np.random.default_rng(seed)
+    regions = get_region_names(num_regions)
+    dates = [(START_DATE + datetime.timedelta(days=day)).isoformat()
+             for day in range(num_days)]
+    os.makedirs(directory, exist_ok=True)
+
+    populations = np.rint(10 ** rng.uniform(5, 8.5, num_regions))
+    case_rates = 10 ** rng.uniform(-5.5, -3.5, num_regions)
+    fatality_rates = rng.uniform(0.005, 0.03, num_regions)
+
+    def vary(rates: np.ndarray) -> np.ndarray:
+        return np.maximum(rates[:, None] * (1 + noise * rng.standard_normal((num_regions,
+                                                                             num_days))), 0)
+
+    cases = np.rint(vary(populations * case_rates))
+    deaths = np.rint(vary(fatality_rates) * cases)
+
+    with open(os.path.join(directory, 'main_data.csv'), 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['iso_code', 'location', 'date', 'new_cases', 'new_deaths',
+                         'population'])
+        for i, (code, name) in enumerate(regions):
+            population = repr(float(populations[i]))
+            writer.writerows([code, name, date, repr(new_cases), repr(new_deaths), population]
+                             for date, new_cases, new_deaths
+                             in zip(dates, cases[i].tolist(), deaths[i].tolist()))
+
+    for policy in ALL_POLICIES:
+        weights = None if level_weights is None else level_weights.get(policy)
+        probabilities = get_level_weights(policy, weights)
+        levels = rng.choice(len(probabilities), num_regions, p=probabilities)
+        timelines = get_policy_timelines(rng, levels, len(probabilities), num_days,
+                                         level_changes)
+
+        with open(os.path.join(directory, policy + '.csv'), 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['Entity', 'Code', 'Date', POLICY_COLUMNS[policy]])
+            for i, (code, name) in enumerate(regions):
+                writer.writerows([name, code, date, level]
+                                 for date, level in zip(dates, timelines[i].tolist()))
+
+    longitudes = rng.uniform(-180, 180, num_regions)
+    latitudes = np.degrees(np.arcsin(rng.uniform(np.sin(np.radians(-55)),
+                                                 np.sin(np.radians(70)), num_regions)))
+
+    with open(os.path.join(directory, 'centroids.csv'), 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['name', 'Longitude', 'Latitude'])
+        writer.writerows([name, round(float(longitudes[i]), 8), round(float(latitudes[i]), 8)]
+                         for i, (_, name) in enumerate(regions))
+
+
+def parse_level_weights(text: str) -> tuple[str, list[float]]:
+    """Return the (policy, weights) given in text in the form of policy=weight,weight,...
+
+    >>> parse_level_weights('stay-at-home=2,1,1,0')
+    ('stay-at-home', [2.0, 1.0, 1.0, 0.0])
+    """
+    policy, _, weights = text.partition('=')
+
+    if policy not in ALL_POLICIES:
+        raise argparse.ArgumentTypeError('unknown policy ' + policy)
+    try:
+        values = [float(weight) for weight in weights.split(',')]
+        get_level_weights(policy, values)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+    return (policy, values)
+
+
+def add_generator_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options of generate_dataset to parser (shared with cli.py generate)."""
+    parser.add_argument('directory', help='the directory to write the dataset to')
+    parser.add_argument('--regions', type=int, default=1000, help='the number of regions')
+    parser.add_argument('--days', type=int, default=365, help='the number of days of data')
+    parser.add_argument('--levels', type=parse_level_weights, action='append', default=[],
+                        metavar='POLICY=W0,W1,...',
+                        help='the relative weight of each level of a policy (repeatable; '
+                             'every level is equally likely by default)')
+    parser.add_argument('--noise', type=float, default=0.3,
+                        help='how much the daily numbers vary around the rates of a region')
+    parser.add_argument('--level-changes', type=float, default=2.0,
+                        help='the average number of stretches at a neighbouring level')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def generate_from_arguments(arguments: argparse.Namespace) -> None:
+    """Write the dataset with the options added by add_generator_arguments."""
+    generate_dataset(arguments.directory, arguments.regions, arguments.days,
+                     dict(arguments.levels), arguments.noise, arguments.level_changes,
+                     arguments.seed)
+    print('Wrote ' + str(arguments.regions) + ' regions to ' + arguments.directory)
+
+
+if __name__ == '__main__':
+    main_parser = argparse.ArgumentParser(description='Write a synthetic dataset.')
+    add_generator_arguments(main_parser)
+    generate_from_arguments(main_parser.parse_args())
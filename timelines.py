@@ -0,0 +1,269 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains the levels of the policies of every country over time, kept
+in run-length-encoded form.
+
+The csv file of a policy has a row for every country on every day, but the level of a
+country only changes a few times. So only the dates of the changes and the new levels are
+kept (refer to init_graph.get_policy_runs), in a few numpy arrays for each policy.
+
+The level of a country on a date is found by a binary search over the changes (refer to
+PolicyTimelines.level_at), and the levels of every country on a date are found at once as an
+array (refer to PolicyTimelines.levels_on). Unlike init_graph.get_policy_restrictions, which
+averages the levels over every day, this gives the levels at a point in time.
+
+For example:
+    >>> timelines = get_policy_timelines('datasets')
+    >>> timelines.level_at('Canada', 'stay-at-home', '2020-03-13')
+    0
+    >>> timelines.level_at('Canada', 'stay-at-home', '2020-03-14')
+    1
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import bisect
+from typing import Optional, Union
+
+import numpy as np
+
+import init_graph
+from computations import ALL_POLICIES
+
+# The level stored for the days on which the level of a country is not known
+NO_LEVEL = -1
+
+# The key of a change of level of the i-th country on the day with ordinal d is
+# i * 2 ** COUNTRY_SHIFT + d, so that the changes are sorted by country and then by date
+COUNTRY_SHIFT = 32
+
+
+class PolicyTimelines:
+    """The levels of policies of countries over time, in run-length-encoded form.
+
+    Instance Attributes:
+        - countries: The countries with the timeline of at least one policy, in the order
+                     they were first added
+        - policies: The policies with timelines, in the order they were added
+
+    Representation Invariants:
+        - all(policy in ALL_POLICIES for policy in self.policies)
+    """
+    countries: list[str]
+    policies: list[str]
+
+    # Private Instance Attributes:
+    #     - _index: Maps each country to its index in countries
+    #     - _keys: Maps each policy to the sorted keys of its changes of level (refer to
+    #              COUNTRY_SHIFT)
+    #     - _levels: Maps each policy to the level from each of its changes on, or NO_LEVEL if
+    #                the level is not known from then on
+    _index: dict[str, int]
+    _keys: dict[str, np.ndarray]
+    _levels: dict[str, np.ndarray]
+
+    def __init__(self) -> None:
+        """Initialise timelines without any policy."""
+        self.countries = []
+        self.policies = []
+        self._index = {}
+        self._keys = {}
+        self._levels = {}
+
+    def add_policy(self, policy: str,
+                   runs: dict[str, list[tuple[str, Union[int, str]]]]) -> None:
+        """Add the timelines of the countries for policy, in the form returned by
+        init_graph.get_policy_runs. Do nothing if the policy already has timelines.
+
+        Preconditions:
+            - policy in ALL_POLICIES
+
+        >>> timelines = PolicyTimelines()
+        >>> timelines.add_policy('stay-at-home', {'c1': [('2020-01-01', 2), ('2020-01-05', '')]})
+        >>> timelines.countries, timelines.get_changes('c1', 'stay-at-home')
+        (['c1'], [('2020-01-01', 2), ('2020-01-05', '')])
+        """
+        if policy in self._keys:
+            return
+
+        keys, levels = [], []
+        for country in runs:
+            if country not in self._index:
+                self._index[country] = len(self.countries)
+                self.countries.append(country)
+
+            start = self._index[country] << COUNTRY_SHIFT
+            for date, level in runs[country]:
+                keys.append(start + init_graph.get_ordinal(date))
+                levels.append(NO_LEVEL if level == '' else level)
+
+        keys = np.array(keys, dtype=np.int64)
+        order = np.argsort(keys, kind='stable')
+
+        self.policies.append(policy)
+        self._keys[policy] = keys[order]
+        self._levels[policy] = np.array(levels, dtype=np.int8)[order]
+
+    def level_at(self, country: str, policy: str, date: str) -> Union[int, str]:
+        """Return the level of the policy of country on date (in the form of YYYY-MM-DD), or ''
+        if it is not known, found by a binary search over the changes of level.
+
+        >>> timelines = get_policy_timelines('datasets', 'test-')
+        >>> timelines.level_at('Norway', 'stay-at-home', '2020-02-25')
+        3
+        >>> timelines.level_at('Norway', 'stay-at-home', '2020-02-26')
+        ''
+        >>> timelines.level_at('Random', 'stay-at-home', '2020-02-25')
+        ''
+        """
+        if country not in self._index or policy not in self._keys:
+            return ''
+
+        keys = self._keys[policy]
+        i = bisect.bisect_right(keys.data, (self._index[country] << COUNTRY_SHIFT)
+                                + init_graph.get_ordinal(date)) - 1
+
+        if i < 0 or keys[i] >> COUNTRY_SHIFT != self._index[country] \
+                or self._levels[policy][i] == NO_LEVEL:
+            return ''
+        else:
+            return int(self._levels[policy][i])
+
+    def levels_on(self, policy: str, date: str) -> np.ndarray:
+        """Return the level of the policy of every country on date (in the form of YYYY-MM-DD),
+        where the i-th level is the level of the i-th country in countries, or NO_LEVEL if it
+        is not known.
+
+        >>> timelines = get_policy_timelines('datasets', 'test-')
+        >>> timelines.levels_on('stay-at-home', '2020-02-24').tolist()
+        [0, 0, 1, 1, 3, 2, 1]
+        >>> timelines.levels_on('stay-at-home', '2020-01-01').tolist()
+        [-1, -1, -1, -1, -1, -1, -1]
+        """
+        levels = np.full(len(self.countries), NO_LEVEL, dtype=np.int8)
+        if policy not in self._keys:
+            return levels
+
+        keys = self._keys[policy]
+        countries = np.arange(len(self.countries), dtype=np.int64)
+        positions = np.searchsorted(keys, (countries << COUNTRY_SHIFT)
+                                    + init_graph.get_ordinal(date), side='right') - 1
+
+        # The change found for a country is that of the previous country if it has none yet
+        found = positions >= 0
+        found[found] = keys[positions[found]] >> COUNTRY_SHIFT == countries[found]
+        levels[found] = self._levels[policy][positions[found]]
+
+        return levels
+
+    def get_changes(self, country: str, policy: str) -> list[tuple[str, Union[int, str]]]:
+        """Return the changes of level of the policy of country, in the form returned by
+        init_graph.get_policy_runs, or [] if it has no timeline for the policy.
+
+        >>> timelines = get_policy_timelines('datasets', policies=['stay-at-home'])
+        >>> timelines.get_changes('Canada', 'stay-at-home')
+        [('2020-01-01', 0), ('2020-03-14', 1), ('2021-01-09', 2), ('2021-03-13', '')]
+        """
+        start, end = self._get_range(country, policy)
+        keys = self._keys[policy][start:end].tolist() if start < end else []
+        levels = self._levels[policy][start:end].tolist() if start < end else []
+
+        return [(init_graph.get_date(key & ((1 << COUNTRY_SHIFT) - 1)),
+                 '' if level == NO_LEVEL else level) for key, level in zip(keys, levels)]
+
+    def get_average_level(self, country: str, policy: str) -> Union[int, str]:
+        """Return the average level of the policy of country over every day it is known,
+        rounded by init_graph.round_level, or '' if it is never known. This is the
+        same level as init_graph.get_policy_restrictions reads from the daily rows.
+
+        >>> timelines = get_policy_timelines('datasets', policies=['stay-at-home'])
+        >>> timelines.get_average_level('Canada', 'stay-at-home')
+        1
+        """
+        start, end = self._get_range(country, policy)
+        keys = self._keys[policy][start:end].tolist() if start < end else []
+        levels = self._levels[policy][start:end].tolist() if start < end else []
+
+        total, days = 0, 0
+        for i in range(len(keys) - 1):
+            if levels[i] != NO_LEVEL:
+                total += levels[i] * (keys[i + 1] - keys[i])
+                days += keys[i + 1] - keys[i]
+
+        if days == 0:
+            return ''
+
+        return init_graph.round_level(total / days)
+
+    def _get_range(self, country: str, policy: str) -> tuple[int, int]:
+        """Return the start and end of the changes of the policy of country in its arrays, which
+        are the same if there are none."""
+        if country not in self._index or policy not in self._keys:
+            return (0, 0)
+
+        start = self._index[country] << COUNTRY_SHIFT
+        keys = self._keys[policy]
+
+        return (int(np.searchsorted(keys, start)),
+                int(np.searchsorted(keys, start + (1 << COUNTRY_SHIFT))))
+
+    def get_num_changes(self) -> int:
+        """Return the number of changes of level kept for every policy."""
+        return sum(len(keys) for keys in self._keys.values())
+
+    def get_nbytes(self) -> int:
+        """Return the bytes of the arrays of the changes of level of every policy."""
+        return sum(self._keys[policy].nbytes + self._levels[policy].nbytes
+                   for policy in self.policies)
+
+
+def get_policy_timelines(directory: str, prefix: str = '',
+                         policies: Optional[list[str]] = None) -> PolicyTimelines:
+    """Return the timelines of every policy in policies (every policy in ALL_POLICIES if
+    policies is None), read from the csv file named prefix + policy + '.csv' in directory.
+
+    Preconditions:
+        - policies is None or all(policy in ALL_POLICIES for policy in policies)
+        - all(os.path.exists(directory + '/' + prefix + policy + '.csv') for each policy)
+
+    >>> timelines = get_policy_timelines('datasets', 'test-')
+    >>> len(timelines.countries), timelines.get_num_changes()
+    (7, 98)
+    """
+    if policies is None:
+        policies = ALL_POLICIES
+
+    timelines = PolicyTimelines()
+    for policy in policies:
+        timelines.add_policy(policy, init_graph.get_policy_runs(directory + '/' + prefix + policy
+                                                                + '.csv'))
+
+    return timelines
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['bisect', 'numpy', 'init_graph', 'computations']
+    })
@@ -0,0 +1,160 @@
+"""CSC111 Project: Picturing the Power of Policy in a Pandemic
+
+Instructions (READ THIS FIRST!)
+===============================
+
+This Python module contains the helper functions used to spread independent
+computations on the WeightedGraph across worker processes.
+
+With map_with_graph, each worker receives the graph once when it starts, rather than once
+for every task. With map_with_shared_graph, the graph is frozen into shared memory instead
+(refer to shared_graph.py), and each worker attaches to it by name. Both work however the
+platform starts worker processes, and never start more workers than there are tasks or CPUs.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of TAs and
+instructors of CSC111 at the University of Toronto St. George campus.
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+
+This file is Copyright (c) 2021 Jia Hao Choo & Komal Saini.
+"""
+import multiprocessing
+import os
+from typing import Any, Callable, Optional
+
+from classes import WeightedGraph
+from shared_graph import SharedGraph, attach_graph, freeze_graph
+
+# The graph available to the functions run in a worker process
+_worker_graph = None
+
+
+def map_with_graph(graph: WeightedGraph, func: Callable[[WeightedGraph, Any], Any],
+                   tasks: list, processes: Optional[int] = None) -> list:
+    """Return the list of func(graph, task) for every task in tasks, in the same order,
+    computed across the given number of worker processes (all CPUs if processes is None),
+    capped by get_process_count.
+
+    If only one process is needed, everything is computed in this process.
+
+    Preconditions:
+        - func is a function defined at the top level of a module
+        - processes is None or processes >= 1
+
+    >>> map_with_graph(WeightedGraph(), _count_vertices_plus, [1, 2], 1)
+    [1, 2]
+    """
+    processes = get_process_count(processes, len(tasks))
+    if processes == 1:
+        return [func(graph, task) for task in tasks]
+
+    with multiprocessing.Pool(processes, initializer=_set_worker_graph,
+                              initargs=(graph,)) as pool:
+        return pool.map(_call_with_worker_graph, [(func, task) for task in tasks])
+
+
+def map_with_shared_graph(graph: WeightedGraph, func: Callable[[SharedGraph, Any], Any],
+                          tasks: list, processes: Optional[int] = None) -> list:
+    """Return the list of func(shared, task) for every task in tasks, in the same order,
+    where shared is a snapshot of graph in shared memory (refer to shared_graph.freeze_graph),
+    computed across the given number of worker processes (all CPUs if processes is None),
+    capped by get_process_count.
+
+    Only the name of the snapshot is sent to the workers, which read the arrays of the
+    snapshot without copying them. The snapshot is freed once every task is done.
+
+    If only one process is needed, everything is computed in this process.
+
+    Preconditions:
+        - func is a function defined at the top level of a module
+        - processes is None or processes >= 1
+
+    >>> g = WeightedGraph()
+    >>> g.add_vertex('c1', [0.1], [0.1], 10000)
+    >>> map_with_shared_graph(g, _count_shared_vertices_plus, [1, 2], 2)
+    [2, 3]
+    """
+    processes = get_process_count(processes, len(tasks))
+    shared = freeze_graph(graph)
+
+    try:
+        if processes == 1:
+            return [func(shared, task) for task in tasks]
+
+        with multiprocessing.Pool(processes, initializer=_attach_worker_graph,
+                                  initargs=(shared.name,)) as pool:
+            return pool.map(_call_with_worker_graph, [(func, task) for task in tasks])
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def get_process_count(processes: Optional[int], num_tasks: int) -> int:
+    """Return the number of worker processes to compute num_tasks tasks with: processes, or
+    the number of CPUs if processes is None, but no more than num_tasks or the number of CPUs,
+    and at least 1.
+
+    Preconditions:
+        - processes is None or processes >= 1
+        - num_tasks >= 0
+
+    >>> get_process_count(None, 1)
+    1
+    >>> get_process_count(4, 0)
+    1
+    """
+    return max(1, min(processes or os.cpu_count() or 1, num_tasks, os.cpu_count() or 1))
+
+
+def _set_worker_graph(graph: WeightedGraph) -> None:
+    """Store graph as the graph of this worker process."""
+    global _worker_graph
+    _worker_graph = graph
+
+
+def _attach_worker_graph(name: str) -> None:
+    """Attach to the snapshot in the block of shared memory called name, as the graph of this
+    worker process."""
+    global _worker_graph
+    _worker_graph = attach_graph(name)
+
+
+def _call_with_worker_graph(func_and_task: tuple[Callable[[Any, Any], Any], Any]) -> Any:
+    """Return func(graph, task) where graph is the graph of this worker process."""
+    func, task = func_and_task
+    return func(_worker_graph, task)
+
+
+def _count_vertices_plus(graph: WeightedGraph, number: int) -> int:
+    """Return the number of vertices in graph plus number. Used in doctests.
+
+    >>> _count_vertices_plus(WeightedGraph(), 3)
+    3
+    """
+    return len(graph.get_all_vertices()) + number
+
+
+def _count_shared_vertices_plus(shared: SharedGraph, number: int) -> int:
+    """Return the number of vertices in the snapshot shared plus number. Used in doctests."""
+    return len(shared.countries) + number
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136', 'W0603'],
+        'extra-imports': ['multiprocessing', 'os', 'classes', 'shared_graph']
+    })